@@ -1,10 +1,13 @@
 from django.contrib import admin
 from .models import Announcement
+from employees.admin_utils import ScalableAdminMixin
 
 @admin.register(Announcement)
-class AnnouncementAdmin(admin.ModelAdmin):
+class AnnouncementAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'created_by', 'created_at', 'visible_to')
     list_filter = ('visible_to', 'created_at')
+    list_select_related = ('created_by',)
+    date_hierarchy = 'created_at'
     search_fields = ('title', 'content', 'created_by__username')
     readonly_fields = ('created_at', 'updated_at')
     # Automatically set created_by to the current user when adding from admin
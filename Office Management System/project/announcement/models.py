@@ -22,6 +22,10 @@ class Announcement(models.Model):
 
     class Meta:
         ordering = ['-created_at'] # Order by most recent announcement
+        indexes = [
+            models.Index(fields=['visible_to', '-created_at'], name='announcement_visible_idx'),
+            models.Index(fields=['-created_at'], name='announcement_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.created_by.username}"
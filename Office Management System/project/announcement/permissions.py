@@ -0,0 +1,24 @@
+from django.db.models import Q
+
+from .models import Announcement
+from employees.permissions import NOTHING, is_admin, is_manager_or_admin
+
+# Object-level permission rules for this app's models, used by employees.permissions
+# (scope() and get_permitted_or_404()). Each rule returns the Q object of the rows a user
+# may access for an action ('view', 'edit' or 'delete').
+
+
+def announcement_rule(user, action):
+    if is_admin(user):
+        return Q()
+    if action == 'view':
+        audience = 'manager' if is_manager_or_admin(user) else 'employee'
+        return Q(visible_to__in=('all', audience))
+    if action == 'edit' and is_manager_or_admin(user):
+        return Q(created_by=user.pk)
+    return NOTHING
+
+
+PERMISSION_RULES = {
+    Announcement: announcement_rule,
+}
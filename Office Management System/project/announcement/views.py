@@ -1,35 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q # For complex queries
 from .models import Announcement
 from .forms import AnnouncementForm
-from employees.models import User # Import User model for role checks
-
-# Helper functions (copied from employees app for convenience, or you could put them in a common utility file)
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
-
-def is_employee(user):
-    return user.is_authenticated and user.role == 'Employee'
+from employees.permissions import get_permitted_or_404, is_admin, is_manager_or_admin, scope
 
 # --- Announcement Views ---
 
 @login_required
 def announcement_list(request):
-    # Filter announcements based on user's role
-    if is_admin(request.user):
-        announcements = Announcement.objects.all().order_by('-created_at')
-    elif is_manager_or_admin(request.user):
-        announcements = Announcement.objects.filter(
-            Q(visible_to='all') | Q(visible_to='manager')
-        ).order_by('-created_at')
-    else: # Employee
-        announcements = Announcement.objects.filter(
-            Q(visible_to='all') | Q(visible_to='employee')
-        ).order_by('-created_at')
+    # Admin sees everything, managers and employees what is addressed to them
+    announcements = scope(request, Announcement.objects.select_related('created_by')).order_by('-created_at')
 
     context = {
         'announcements': announcements,
@@ -55,11 +35,8 @@ def announcement_add(request):
 @login_required
 @user_passes_test(is_manager_or_admin) # Only managers/admins can edit announcements
 def announcement_edit(request, pk):
-    announcement = get_object_or_404(Announcement, pk=pk)
-
-    # Further permission check: Only the creator or an Admin can edit
-    if not (announcement.created_by == request.user or is_admin(request.user)):
-        return redirect('announcement_list') # Or render a permission denied page
+    # Only the creator or an Admin can edit; anything else is a 404
+    announcement = get_permitted_or_404(request, Announcement, 'edit', pk=pk)
 
     if request.method == 'POST':
         form = AnnouncementForm(request.POST, instance=announcement)
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from .models import Asset
+from employees.admin_utils import ScalableAdminMixin, UserAutocompleteAdminMixin, username_filter
 
 @admin.register(Asset)
-class AssetAdmin(admin.ModelAdmin):
+class AssetAdmin(ScalableAdminMixin, UserAutocompleteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'serial_number', 'assigned_to', 'status', 'purchase_date', 'created_at')
-    list_filter = ('status', 'assigned_to', 'purchase_date')
+    list_filter = ('status', username_filter('assigned_to', 'assignee'), 'purchase_date')
+    list_select_related = ('assigned_to',)
     search_fields = ('name', 'serial_number', 'description', 'assigned_to__username')
-    raw_id_fields = ('assigned_to',) 
+    user_autocomplete_fields = {'assigned_to': None} # No <select> of every user
     readonly_fields = ('created_at', 'updated_at')
@@ -1,6 +1,7 @@
 from django import forms
 from .models import Asset
 from employees.models import User # Import User model to filter choices
+from employees.widgets import UserAutocompleteInput
 
 class AssetForm(forms.ModelForm):
     class Meta:
@@ -9,11 +10,13 @@ class AssetForm(forms.ModelForm):
         widgets = {
             'purchase_date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
+            'assigned_to': UserAutocompleteInput(),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Filter assigned_to choices to only include active employees (or all users if preferred)
-        self.fields['assigned_to'].queryset = User.objects.filter(is_active=True).order_by('username')
+        # Validates the posted id only; the widget never lists the queryset
+        self.fields['assigned_to'].queryset = User.objects.filter(is_active=True)
         self.fields['assigned_to'].required = False # Make assigned_to optional in the form
 
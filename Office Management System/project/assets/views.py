@@ -3,17 +3,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Q # For complex queries
 from .models import Asset
 from .forms import AssetForm
-from employees.models import User # Import User model for role checks
-
-# Helper functions (copied from employees app for convenience, or you could put them in a common utility file)
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
-
-def is_employee(user):
-    return user.is_authenticated and user.role == 'Employee'
+from employees.permissions import is_admin, is_manager_or_admin
 
 # --- Asset Views ---
 
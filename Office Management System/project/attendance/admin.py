@@ -1,29 +1,45 @@
 from django.contrib import admin
-from .models import Attendance, LeaveRequest, PublicHoliday
+from .models import Attendance, AttendanceAnomaly, AttendanceSummary, LeaveBalance, LeaveLedgerEntry, LeaveRequest, PublicHoliday
 from django.utils import timezone
+from employees.admin_utils import ScalableAdminMixin, UserAutocompleteAdminMixin, username_filter
+from django.db import transaction
+from .leave_index import LEAVE_INDEX_VERSION
+from .ledger import sync_leave_requests
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'date', 'clock_in', 'clock_out', 'working_hours')
-    list_filter = ('date', 'user__username')
+    list_filter = ('date', username_filter('user', 'employee'))
+    list_select_related = ('user',)
+    date_hierarchy = 'date' # Drill-down walks attendance_date_user_idx
     search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
     readonly_fields = ('working_hours',) # working_hours is calculated automatically
 
 @admin.register(LeaveRequest)
-class LeaveRequestAdmin(admin.ModelAdmin):
+class LeaveRequestAdmin(ScalableAdminMixin, UserAutocompleteAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'start_date', 'end_date', 'status', 'requested_at', 'approved_by')
-    list_filter = ('status', 'start_date', 'end_date', 'user__username')
+    list_filter = ('status', 'start_date', 'end_date', username_filter('user', 'employee'))
+    list_select_related = ('user', 'approved_by')
+    date_hierarchy = 'start_date'
     search_fields = ('user__username', 'reason')
+    autocomplete_fields = ('user',)
     actions = ['approve_leave_requests', 'reject_leave_requests']
+    user_autocomplete_fields = {'approved_by': ('Admin', 'Manager')}
 
     # Custom admin actions for approving/rejecting leave requests
     def approve_leave_requests(self, request, queryset):
         # Only allow Admin or Manager to approve/reject
         if request.user.role in ['Admin', 'Manager']:
-            updated_count = queryset.filter(status='Pending').update(
-                status='Approved',
-                approved_by=request.user,
-                approval_date=timezone.now()
-            )
+            with transaction.atomic():
+                pending = list(queryset.filter(status='Pending').values_list('pk', flat=True))
+                updated_count = LeaveRequest.objects.filter(pk__in=pending).update(
+                    status='Approved',
+                    approved_by=request.user,
+                    approval_date=timezone.now()
+                )
+                # update() skips the model signals, so refresh the index and ledger here
+                sync_leave_requests(pending)
+            LEAVE_INDEX_VERSION.rotate_on_commit()
             self.message_user(request, f"{updated_count} leave requests approved.")
         else:
             self.message_user(request, "You do not have permission to approve leave requests.", level='error')
@@ -31,11 +47,16 @@ class LeaveRequestAdmin(admin.ModelAdmin):
 
     def reject_leave_requests(self, request, queryset):
         if request.user.role in ['Admin', 'Manager']:
-            updated_count = queryset.filter(status='Pending').update(
-                status='Rejected',
-                approved_by=request.user,
-                approval_date=timezone.now()
-            )
+            with transaction.atomic():
+                pending = list(queryset.filter(status='Pending').values_list('pk', flat=True))
+                updated_count = LeaveRequest.objects.filter(pk__in=pending).update(
+                    status='Rejected',
+                    approved_by=request.user,
+                    approval_date=timezone.now()
+                )
+                # update() skips the model signals, so refresh the index and ledger here
+                sync_leave_requests(pending)
+            LEAVE_INDEX_VERSION.rotate_on_commit()
             self.message_user(request, f"{updated_count} leave requests rejected.")
         else:
             self.message_user(request, "You do not have permission to reject leave requests.", level='error')
@@ -48,7 +69,8 @@ class LeaveRequestAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(user=request.user)
 
-    # Override formfield_for_foreignkey to limit approved_by choices to Managers/Admins
+    # Override formfield_for_foreignkey to limit approved_by to Managers/Admins (validation only;
+    # the autocomplete widget does not list the queryset)
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "approved_by":
             from employees.models import User # Import User model from employees app
@@ -61,3 +83,40 @@ class PublicHolidayAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_filter = ('date',)
 
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'total_hours', 'days_present', 'late_arrivals')
+    list_filter = ('period', username_filter('user', 'employee'))
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    readonly_fields = ('total_hours', 'days_present', 'late_arrivals', 'updated_at') # Maintained by attendance.rollups
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'entry_type', 'days', 'leave_request', 'reference', 'created_at')
+    list_filter = ('entry_type', username_filter('user', 'employee'))
+    list_select_related = ('user', 'leave_request__user')
+    search_fields = ('user__username', 'reference', 'note')
+
+    # The ledger is append-only; corrections are posted as new adjustment entries
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'balance', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    readonly_fields = ('balance', 'updated_at') # Maintained by attendance.ledger
+
+@admin.register(AttendanceAnomaly)
+class AttendanceAnomalyAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('attendance', 'kind', 'detected_at')
+    list_filter = ('kind', 'detected_at')
+    list_select_related = ('attendance__user',)
+    search_fields = ('attendance__user__username',)
+    raw_id_fields = ('attendance',)
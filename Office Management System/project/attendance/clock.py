@@ -0,0 +1,72 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DecimalField, F, FloatField, Value
+from django.db.models.functions import Cast, Extract
+
+from .models import Attendance
+from .punches import working_hours
+from .rollups import refresh_rollups
+
+# Clock-in/clock-out as conditional writes.
+# Each punch is a single UPDATE guarded by the state it expects (clock_in IS NULL, or
+# clock_out IS NULL), so two racing requests cannot both win and nothing is read first.
+# The unique (user, date) constraint arbitrates the INSERT of a day's first row.
+
+STATE_FIELDS = ('date', 'clock_in', 'clock_out', 'working_hours')
+
+
+def _hours_until(now):
+    # EXTRACT(EPOCH FROM now - clock_in) / 3600; the numeric(5, 2) cast rounds like
+    # Attendance.calculate_working_hours
+    seconds = Extract(Value(now) - F('clock_in'), 'epoch', output_field=FloatField())
+    return Cast(seconds / Value(3600.0), DecimalField(max_digits=5, decimal_places=2))
+
+
+def punch_in(user_id, today, now):
+    """Sets today's clock_in unless it is already set. Returns True if this punch won."""
+    pending = Attendance.objects.filter(user_id=user_id, date=today, clock_in__isnull=True)
+    if pending.update(clock_in=now):
+        return True
+    try:
+        with transaction.atomic():
+            # bulk_create is a plain INSERT: no save() override, no extra queries
+            Attendance.objects.bulk_create([Attendance(user_id=user_id, date=today, clock_in=now)])
+        return True
+    except IntegrityError:
+        # The row appeared in between; it only still needs a clock-in if it was created empty
+        return pending.update(clock_in=now) > 0
+
+
+def punch_out(user_id, today, now):
+    """Sets today's clock_out if clocked in and not yet out. Returns True if this punch won."""
+    open_row = Attendance.objects.filter(
+        user_id=user_id, date=today, clock_in__isnull=False, clock_out__isnull=True
+    )
+    if connection.vendor == 'postgresql':
+        return open_row.update(clock_out=now, working_hours=_hours_until(now)) > 0
+
+    # Elsewhere there is no portable interval-to-seconds in SQL. clock_out is still claimed
+    # atomically; the follow-up write only touches the row this request closed.
+    if not open_row.update(clock_out=now):
+        return False
+    closed = Attendance.objects.filter(user_id=user_id, date=today, clock_out=now)
+    clock_in = closed.values_list('clock_in', flat=True).first()
+    closed.update(working_hours=working_hours(clock_in, now))
+    return True
+
+
+def punch(user, action, today, now):
+    """
+    Applies a 'clock_in' or 'clock_out' punch and returns (accepted, state) where state is
+    a dict of today's STATE_FIELDS.
+    """
+    if action == 'clock_in':
+        accepted = punch_in(user.pk, today, now)
+    elif action == 'clock_out':
+        accepted = punch_out(user.pk, today, now)
+    else:
+        raise ValueError(f"Unknown punch action '{action}'.")
+
+    if accepted:
+        refresh_rollups([(user.pk, today)])
+    state = Attendance.objects.filter(user=user, date=today).values(*STATE_FIELDS).first()
+    return accepted, state or dict.fromkeys(STATE_FIELDS)
@@ -1,5 +1,7 @@
 from django import forms
 from .models import Attendance, LeaveRequest, PublicHoliday
+from .workdays import working_days
+from .leave_index import get_leave_index
 from django.utils import timezone
 
 class AttendanceForm(forms.ModelForm):
@@ -29,6 +31,10 @@ class LeaveRequestForm(forms.ModelForm):
             'end_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user # Requesting employee, used to check for overlapping leave
+
     def clean(self):
         cleaned_data = super().clean()
         start_date = cleaned_data.get('start_date')
@@ -39,9 +45,51 @@ class LeaveRequestForm(forms.ModelForm):
                 raise forms.ValidationError("Start date cannot be in the past.")
             if end_date < start_date:
                 raise forms.ValidationError("End date cannot be before start date.")
+            # Working days this request would use (weekends and public holidays are free)
+            self.leave_days = working_days([(None, start_date, end_date)], include_leave=False)[0]
+            if not self.leave_days:
+                raise forms.ValidationError("The selected dates do not include any working days.")
+            if self.user is not None:
+                overlaps = get_leave_index().overlaps_for_user(
+                    self.user.pk, start_date, end_date, exclude=self.instance.pk
+                )
+                if overlaps:
+                    first, last, _, _, status = overlaps[0]
+                    raise forms.ValidationError(
+                        f"This overlaps your {status.lower()} leave from {first:%b %d, %Y} to {last:%b %d, %Y}."
+                    )
         return cleaned_data
 
 class LeaveApprovalForm(forms.ModelForm):
     class Meta:
         model = LeaveRequest
         fields = ['status'] 
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('status') == 'Approved':
+            breaches = get_leave_index().capacity_breaches(self.instance)
+            if breaches:
+                day, out, limit = breaches[0]
+                raise forms.ValidationError(
+                    f"Approving this would put {out} people from the department on leave on "
+                    f"{day:%b %d, %Y} (limit {limit})."
+                )
+        return cleaned_data
+
+class AttendanceFilterForm(forms.Form):
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    user = forms.CharField(required=False, max_length=150, label='Employee username')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+
+        if date_from and date_to and date_to < date_from:
+            raise forms.ValidationError("End date cannot be before start date.")
+        return cleaned_data
+
+class ExportFilterForm(AttendanceFilterForm):
+    department = forms.CharField(required=False, max_length=100)
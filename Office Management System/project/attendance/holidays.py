@@ -0,0 +1,48 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from employees.versioning import VersionToken
+from .models import PublicHoliday
+
+# Process-local PublicHoliday calendar.
+# Holidays change a few times a year, so each worker keeps the whole table in memory and only
+# checks a shared version token in the cache. Saving or deleting a holiday replaces the token
+# (see attendance.signals), and every worker reloads on its next lookup.
+
+CALENDAR_VERSION = VersionToken('attendance:holiday_calendar:version')
+
+_lock = Lock()
+_loaded = {'version': None, 'calendar': None}
+
+
+class HolidayCalendar:
+    def __init__(self, holidays):
+        self.holidays = sorted(holidays, key=lambda holiday: holiday.date)
+        self.dates = [holiday.date for holiday in self.holidays] # sorted, for range lookups
+        self.date_set = frozenset(self.dates) # for membership tests
+
+    def is_holiday(self, day):
+        return day in self.date_set
+
+    def between(self, start, end):
+        """PublicHoliday objects dated within [start, end]."""
+        return self.holidays[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+
+    def dates_between(self, start, end):
+        return self.dates[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+
+
+def get_holiday_calendar():
+    version = CALENDAR_VERSION.current()
+    calendar = _loaded['calendar']
+    if calendar is not None and _loaded['version'] == version:
+        return calendar
+    with _lock:
+        if _loaded['calendar'] is None or _loaded['version'] != version:
+            _loaded['calendar'] = HolidayCalendar(PublicHoliday.objects.all())
+            _loaded['version'] = version
+        return _loaded['calendar']
+
+
+def is_holiday(day):
+    return get_holiday_calendar().is_holiday(day)
@@ -0,0 +1,157 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.utils import timezone
+
+from employees.versioning import VersionToken
+from .models import LeaveRequest
+
+# In-memory interval index over current and upcoming leave.
+# Approved and pending LeaveRequests that have not ended yet are loaded once per worker and
+# grouped by user and by department, each group sorted by start date. Overlap questions then
+# become a bisect plus a short scan instead of a query. Invalidation works like the holiday
+# calendar: writes replace a shared version token (attendance.signals, and the admin actions
+# that use queryset.update()), and the index is rebuilt lazily on the next lookup.
+
+LEAVE_INDEX_VERSION = VersionToken('attendance:leave_index:version')
+ACTIVE_STATUSES = ('Approved', 'Pending')
+
+_lock = Lock()
+_loaded = {'key': None, 'index': None}
+
+
+class IntervalGroup:
+    def __init__(self, intervals):
+        # intervals: (start, end, leave_id, user_id, status)
+        self.intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in self.intervals]
+        # Anything overlapping [s, e] must start on or after s - longest, which bounds the scan
+        self.longest = max(((end - start) for start, end, *_ in self.intervals), default=timedelta(0))
+
+    def overlapping(self, start, end):
+        lo = bisect_left(self.starts, start - self.longest)
+        hi = bisect_right(self.starts, end)
+        return [interval for interval in self.intervals[lo:hi] if interval[1] >= start]
+
+
+class LeaveIndex:
+    def __init__(self, leaves):
+        """leaves: iterable of (leave_id, user_id, department, start, end, status)."""
+        by_user = defaultdict(list)
+        by_department = defaultdict(list)
+        self.departments = {}
+        for leave_id, user_id, department, start, end, status in leaves:
+            interval = (start, end, leave_id, user_id, status)
+            by_user[user_id].append(interval)
+            if department:
+                by_department[department].append(interval)
+                self.departments[user_id] = department
+        self.by_user = {user_id: IntervalGroup(group) for user_id, group in by_user.items()}
+        self.by_department = {name: IntervalGroup(group) for name, group in by_department.items()}
+
+    def overlaps_for_user(self, user_id, start, end, exclude=None, statuses=ACTIVE_STATUSES):
+        """Leave of user_id overlapping [start, end] as (start, end, leave_id, user_id, status)."""
+        group = self.by_user.get(user_id)
+        if group is None:
+            return []
+        return [
+            interval for interval in group.overlapping(start, end)
+            if interval[2] != exclude and interval[4] in statuses
+        ]
+
+    def headcount_out(self, department, start, end, exclude=None, statuses=('Approved',)):
+        """
+        People from department on leave on each day of [start, end], as a list of
+        (date, count). Someone with two overlapping requests counts once.
+        """
+        days = (end - start).days + 1
+        if days <= 0:
+            return []
+        group = self.by_department.get(department)
+        per_user = defaultdict(list)
+        if group is not None:
+            for first, last, leave_id, user_id, status in group.overlapping(start, end):
+                if leave_id != exclude and status in statuses:
+                    per_user[user_id].append((max(first, start), min(last, end)))
+
+        # Difference array over the range, one +1/-1 pair per merged interval per user
+        delta = [0] * (days + 1)
+        for intervals in per_user.values():
+            intervals.sort()
+            merged_first, merged_last = intervals[0]
+            for first, last in intervals[1:] + [(None, None)]:
+                if first is not None and first <= merged_last + timedelta(days=1):
+                    merged_last = max(merged_last, last)
+                    continue
+                delta[(merged_first - start).days] += 1
+                delta[(merged_last - start).days + 1] -= 1
+                merged_first, merged_last = first, last
+
+        counts = []
+        running = 0
+        for offset in range(days):
+            running += delta[offset]
+            counts.append((start + timedelta(days=offset), running))
+        return counts
+
+    def capacity_breaches(self, leave_request, department=None):
+        """
+        Days on which approving leave_request would put its department over the capacity limit.
+        Returns a list of (date, people_out_including_this_request, limit).
+        """
+        department = department or self.departments.get(leave_request.user_id) or department_of(leave_request.user)
+        limit = capacity_limit(department)
+        if limit is None or not department:
+            return []
+        counts = self.headcount_out(
+            department, leave_request.start_date, leave_request.end_date, exclude=leave_request.pk
+        )
+        # The requester may already be out on some of those days through another request
+        already_out = set()
+        for first, last, *_ in self.overlaps_for_user(
+            leave_request.user_id, leave_request.start_date, leave_request.end_date,
+            exclude=leave_request.pk, statuses=('Approved',),
+        ):
+            day = max(first, leave_request.start_date)
+            while day <= min(last, leave_request.end_date):
+                already_out.add(day)
+                day += timedelta(days=1)
+        return [
+            (day, count + (day not in already_out), limit)
+            for day, count in counts
+            if count + (day not in already_out) > limit
+        ]
+
+
+def department_of(user):
+    profile = getattr(user, 'employee_profile', None) if user is not None else None
+    return profile.department if profile is not None else None
+
+
+def capacity_limit(department):
+    # LEAVE_DEPARTMENT_CAPACITY is either one number for every department or a
+    # {department: number} dict; None means no limit
+    limit = getattr(settings, 'LEAVE_DEPARTMENT_CAPACITY', None)
+    if isinstance(limit, dict):
+        return limit.get(department)
+    return limit
+
+
+def get_leave_index():
+    # The date is part of the key so leave that has ended drops out of the index each day
+    key = (LEAVE_INDEX_VERSION.current(), timezone.localdate())
+    if _loaded['index'] is not None and _loaded['key'] == key:
+        return _loaded['index']
+    with _lock:
+        if _loaded['index'] is None or _loaded['key'] != key:
+            leaves = LeaveRequest.objects.filter(
+                status__in=ACTIVE_STATUSES, end_date__gte=key[1]
+            ).values_list(
+                'pk', 'user_id', 'user__employee_profile__department', 'start_date', 'end_date', 'status'
+            )
+            _loaded['index'] = LeaveIndex(leaves)
+            _loaded['key'] = key
+        return _loaded['index']
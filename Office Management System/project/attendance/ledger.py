@@ -0,0 +1,116 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveRequest
+from .workdays import working_days
+
+# Leave balance ledger.
+# Every change to someone's leave is an appended LeaveLedgerEntry and the matching
+# LeaveBalance row is adjusted with an F() increment in the same transaction, so the
+# balance always equals the sum of the ledger without ever re-summing it.
+
+
+def post_entries(entries):
+    """Appends ledger entries and applies them to the balances atomically."""
+    entries = [entry for entry in entries if entry.days]
+    if not entries:
+        return []
+    deltas = defaultdict(Decimal)
+    for entry in entries:
+        deltas[entry.user_id] += entry.days
+
+    with transaction.atomic():
+        LeaveLedgerEntry.objects.bulk_create(entries)
+        LeaveBalance.objects.bulk_create(
+            [LeaveBalance(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+        )
+        for user_id, delta in deltas.items():
+            LeaveBalance.objects.filter(user_id=user_id).update(
+                balance=F('balance') + delta, updated_at=timezone.now()
+            )
+    return entries
+
+
+def sync_leave_requests(pks):
+    """
+    Brings the ledger in line with the current status of the given LeaveRequest ids: an approved request
+    carries a debit of its working days, anything else carries nothing. Whatever is missing
+    is posted as a debit or a reversal, so calling this twice changes nothing.
+    """
+    with transaction.atomic():
+        # Lock the requests so two approvals of the same request cannot both post a debit
+        leave_requests = list(
+            LeaveRequest.objects.select_for_update().filter(pk__in=list(pks))
+        )
+        if not leave_requests:
+            return []
+        posted = dict(
+            LeaveLedgerEntry.objects.filter(leave_request__in=leave_requests)
+            .order_by().values('leave_request').annotate(total=Sum('days'))
+            .values_list('leave_request', 'total')
+        )
+        approved = [leave for leave in leave_requests if leave.status == 'Approved']
+        lengths = dict(zip(
+            (leave.pk for leave in approved),
+            working_days(((leave.user_id, leave.start_date, leave.end_date) for leave in approved),
+                         include_leave=False),
+        ))
+
+        entries = []
+        for leave in leave_requests:
+            target = -Decimal(lengths.get(leave.pk, 0))
+            delta = target - (posted.get(leave.pk) or Decimal('0'))
+            if delta:
+                entries.append(LeaveLedgerEntry(
+                    user_id=leave.user_id,
+                    leave_request=leave,
+                    entry_type='debit' if delta < 0 else 'reversal',
+                    days=delta,
+                    note=f"{leave.start_date} to {leave.end_date} {leave.status.lower()}",
+                ))
+        return post_entries(entries)
+
+
+def release_leave_request(leave_request):
+    # Called before a request is deleted: give back whatever it had debited
+    posted = LeaveLedgerEntry.objects.filter(leave_request=leave_request).aggregate(total=Sum('days'))['total']
+    if posted:
+        post_entries([LeaveLedgerEntry(
+            user_id=leave_request.user_id,
+            leave_request=leave_request,
+            entry_type='reversal',
+            days=-posted,
+            note=f"{leave_request.start_date} to {leave_request.end_date} deleted",
+        )])
+
+
+def accrue(user_ids, days, reference, note=''):
+    """
+    Credits days to each user once per reference (e.g. 'accrual:2025-01').
+    Users who already have an entry with that reference are skipped. Returns the number credited.
+    """
+    days = Decimal(days)
+    with transaction.atomic():
+        done = set(LeaveLedgerEntry.objects.filter(
+            user_id__in=user_ids, reference=reference
+        ).values_list('user_id', flat=True))
+        entries = [
+            LeaveLedgerEntry(user_id=user_id, entry_type='accrual', days=days, reference=reference, note=note)
+            for user_id in user_ids if user_id not in done
+        ]
+        try:
+            with transaction.atomic():
+                post_entries(entries)
+        except IntegrityError:
+            # A concurrent run got there first; the unique reference kept it from double-crediting
+            return 0
+    return len(entries)
+
+
+def balance_for(user):
+    balance = LeaveBalance.objects.filter(user=user).values_list('balance', flat=True).first()
+    return balance if balance is not None else Decimal('0')
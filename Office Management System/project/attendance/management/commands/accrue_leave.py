@@ -0,0 +1,31 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.ledger import accrue
+from employees.models import User
+
+
+class Command(BaseCommand):
+    help = "Credit leave days to every active employee and manager, once per period."
+
+    def add_arguments(self, parser):
+        parser.add_argument('days', help="Days to credit to each person, e.g. 1.5")
+        parser.add_argument('--period', help="Period label used to avoid double accrual. Defaults to YYYY-MM.")
+
+    def handle(self, *args, **options):
+        try:
+            days = Decimal(options['days'])
+        except InvalidOperation:
+            raise CommandError(f"'{options['days']}' is not a number of days.")
+        period = options['period'] or timezone.localdate().strftime('%Y-%m')
+
+        user_ids = list(User.objects.filter(
+            is_active=True, role__in=['Employee', 'Manager']
+        ).values_list('pk', flat=True))
+        credited = accrue(user_ids, days, f"accrual:{period}", note=f"Accrual for {period}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Credited {days} days to {credited} people for {period} "
+            f"({len(user_ids) - credited} already credited)."
+        ))
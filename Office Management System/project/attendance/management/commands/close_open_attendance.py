@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from attendance.nightly import close_open_records, flag_anomalies, open_record_ids
+
+
+def _init_worker():
+    # Workers must open their own database connections, never reuse the parent's
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Close attendance records left without a clock-out and flag anomalies (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help="Day to process (YYYY-MM-DD). Defaults to yesterday.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes to close chunks in parallel, for large tenants.")
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        size = options['chunk_size']
+        pks = open_record_ids(day)
+        chunks = [pks[i:i + size] for i in range(0, len(pks), size)]
+
+        if options['workers'] > 1 and len(chunks) > 1:
+            connections.close_all() # Don't hand an open connection to forked workers
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                closed = sum(pool.map(close_open_records, chunks))
+        else:
+            closed = sum(close_open_records(chunk) for chunk in chunks)
+
+        flagged = flag_anomalies(day)
+        self.stdout.write(self.style.SUCCESS(
+            f"{day}: closed {closed} open records, wrote {flagged} anomaly flags."
+        ))
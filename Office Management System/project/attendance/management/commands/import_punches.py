@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.punches import PUNCH_FORMATS, PunchError, import_punches, read_punches
+
+
+class Command(BaseCommand):
+    help = "Import badge-reader punches from a CSV or JSONL file into Attendance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Punch file with username and timestamp per punch.")
+        parser.add_argument('--format', choices=PUNCH_FORMATS,
+                            help="File format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in PUNCH_FORMATS:
+            raise CommandError(f"Cannot tell the format of '{path}', pass --format.")
+
+        try:
+            # utf-8-sig drops a leading BOM, as the API does, so the CSV header stays intact
+            with open(path, newline='', encoding='utf-8-sig') as handle:
+                stats = import_punches(read_punches(handle, fmt), batch_size=options['batch_size'])
+        except (OSError, PunchError) as exc:
+            raise CommandError(str(exc))
+
+        for line_number, message in stats['errors']:
+            self.stderr.write(f"line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['punches']} punches into {stats['rows']} attendance rows "
+            f"({stats['skipped']} skipped)."
+        ))
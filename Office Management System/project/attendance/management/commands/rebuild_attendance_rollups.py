@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from attendance.models import Attendance
+from attendance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the daily/weekly/monthly attendance summary tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help="First month to rebuild (YYYY-MM-DD). Defaults to the oldest record.")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help="Last month to rebuild (YYYY-MM-DD). Defaults to the newest record.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+        date_from = options['date_from'] or bounds['first']
+        date_to = options['date_to'] or bounds['last']
+        if date_from is None or date_to is None:
+            self.stdout.write("No attendance records to summarise.")
+            return
+        if date_to < date_from:
+            raise CommandError("--to cannot be before --from.")
+
+        written = rebuild_rollups(date_from, date_to, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} summary rows from {date_from} to {date_to}."
+        ))
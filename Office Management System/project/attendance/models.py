@@ -14,8 +14,18 @@ class Attendance(models.Model):
     working_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
 
     class Meta:
-        unique_together = ('user', 'date') 
+        unique_together = ('user', 'date') # Also serves per-user history and date-range lookups
         ordering = ['-date', 'user__username'] # Order by most recent date
+        indexes = [
+            # Backs the manager history page: keyset scans walk dates newest first
+            models.Index(fields=['-date', 'user'], name='attendance_date_user_idx'),
+            # Partial index: only rows still waiting for a clock-out, for the nightly close job
+            models.Index(
+                fields=['date'],
+                condition=models.Q(clock_in__isnull=False, clock_out__isnull=True),
+                name='attendance_open_idx',
+            ),
+        ]
 
     def calculate_working_hours(self):
         if self.clock_in and self.clock_out:
@@ -27,10 +37,72 @@ class Attendance(models.Model):
     def save(self, *args, **kwargs):
         self.calculate_working_hours() # Calculate hours before saving
         super().save(*args, **kwargs)
+        from .rollups import refresh_rollups # Imported here to avoid a circular import
+        refresh_rollups([(self.user_id, self.date)])
+
+    def delete(self, *args, **kwargs):
+        key = (self.user_id, self.date)
+        result = super().delete(*args, **kwargs)
+        from .rollups import refresh_rollups
+        refresh_rollups([key])
+        return result
 
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
+# Problems found in an attendance record by the nightly close job (attendance.nightly)
+class AttendanceAnomaly(models.Model):
+    KIND_CHOICES = (
+        ('missing_punch', 'Missing clock-out (auto-closed)'),
+        ('long_shift', 'Shift longer than allowed'),
+        ('weekend_work', 'Worked on a non-working day'),
+    )
+    attendance = models.ForeignKey(
+        Attendance,
+        on_delete=models.CASCADE,
+        related_name='anomalies'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('attendance', 'kind') # Re-running the job never duplicates a flag
+        ordering = ['-detected_at']
+
+    def __str__(self):
+        return f"{self.attendance} - {self.get_kind_display()}"
+
+# Per-user attendance totals for a day, week (starting Monday) or calendar month.
+# Maintained by attendance.rollups so reports read summary rows instead of raw Attendance.
+class AttendanceSummary(models.Model):
+    PERIOD_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    days_present = models.PositiveIntegerField(default=0)
+    late_arrivals = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'period', 'period_start')
+        ordering = ['-period_start']
+        indexes = [
+            # Payroll queries select one period type over a date range for everyone
+            models.Index(fields=['period', 'period_start'], name='attendance_summary_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.period} of {self.period_start}"
+
 class LeaveRequest(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -56,9 +128,73 @@ class LeaveRequest(models.Model):
     )
     approval_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Date drill-down in the admin and overlap lookups by start date
+            models.Index(fields=['start_date'], name='leave_start_date_idx'),
+            models.Index(fields=['status', 'end_date'], name='leave_status_end_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.start_date} to {self.end_date} ({self.status})"
 
+# Append-only record of leave days granted and taken. Positive days add to the balance.
+# Written through attendance.ledger, which keeps LeaveBalance in step in the same transaction.
+class LeaveLedgerEntry(models.Model):
+    ENTRY_TYPE_CHOICES = (
+        ('accrual', 'Accrual'),
+        ('debit', 'Debit'),
+        ('reversal', 'Reversal'),
+        ('adjustment', 'Adjustment'),
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leave_ledger_entries'
+    )
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPE_CHOICES)
+    days = models.DecimalField(max_digits=6, decimal_places=2)
+    leave_request = models.ForeignKey(
+        LeaveRequest,
+        on_delete=models.SET_NULL, # Keep the history even if the request is removed
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    # Idempotency key for periodic entries, e.g. 'accrual:2025-01'
+    reference = models.CharField(max_length=50, blank=True, null=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'reference'],
+                condition=models.Q(reference__isnull=False),
+                name='leave_ledger_unique_reference',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='leave_ledger_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.entry_type} {self.days}"
+
+# Materialized sum of a user's ledger entries, so a balance is one indexed read
+class LeaveBalance(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leave_balance'
+    )
+    balance = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.balance} days"
+
 class PublicHoliday(models.Model):
     date = models.DateField(unique=True)
     name = models.CharField(max_length=200)
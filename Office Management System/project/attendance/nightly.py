@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Attendance, AttendanceAnomaly
+from .punches import working_hours
+from .rollups import refresh_rollups
+from .workdays import working_weekdays
+
+# Nightly clean-up of a day's attendance.
+# Rows that were clocked in but never clocked out are closed by policy and flagged, and
+# long shifts and non-working-day punches are flagged. Work is split into pk chunks that
+# commit on their own and only touch rows that are still open, so an interrupted run can
+# simply be started again.
+
+
+def auto_close_hours():
+    # Policy: a forgotten clock-out is assumed to end this many hours after clock-in
+    return getattr(settings, 'ATTENDANCE_AUTO_CLOSE_HOURS', 8)
+
+
+def max_shift_hours():
+    return getattr(settings, 'ATTENDANCE_MAX_SHIFT_HOURS', 16)
+
+
+def open_record_ids(day):
+    # Served by the attendance_open_idx partial index
+    return list(
+        Attendance.objects.filter(date=day, clock_in__isnull=False, clock_out__isnull=True)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def close_open_records(pks):
+    """Closes the given records that are still open. Returns how many were closed."""
+    shift = timedelta(hours=auto_close_hours())
+    with transaction.atomic():
+        rows = list(
+            Attendance.objects.select_for_update()
+            .filter(pk__in=pks, clock_in__isnull=False, clock_out__isnull=True)
+            .only('pk', 'user_id', 'date', 'clock_in')
+        )
+        for row in rows:
+            row.clock_out = row.clock_in + shift
+            row.working_hours = working_hours(row.clock_in, row.clock_out)
+        Attendance.objects.bulk_update(rows, ['clock_out', 'working_hours'])
+        AttendanceAnomaly.objects.bulk_create(
+            [AttendanceAnomaly(attendance_id=row.pk, kind='missing_punch') for row in rows],
+            ignore_conflicts=True,
+        )
+        refresh_rollups({(row.user_id, row.date) for row in rows})
+    return len(rows)
+
+
+def flag_anomalies(day):
+    """Flags long shifts and non-working-day punches for day. Returns the number of flags written."""
+    records = Attendance.objects.filter(date=day, clock_in__isnull=False)
+    flags = [
+        AttendanceAnomaly(attendance_id=pk, kind='long_shift')
+        for pk in records.filter(working_hours__gt=max_shift_hours()).values_list('pk', flat=True)
+    ]
+    if day.weekday() not in working_weekdays():
+        flags += [
+            AttendanceAnomaly(attendance_id=pk, kind='weekend_work')
+            for pk in records.values_list('pk', flat=True)
+        ]
+    AttendanceAnomaly.objects.bulk_create(flags, ignore_conflicts=True, batch_size=1000)
+    return len(flags)
@@ -0,0 +1,158 @@
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Attendance
+from .rollups import refresh_rollups
+from employees.models import User
+
+# Bulk import of badge-reader punches.
+# A punch file is folded into one Attendance row per (user, date): the earliest punch is the
+# clock-in and the latest the clock-out. Punches are processed in fixed-size batches, so memory
+# depends on the batch size and not on the size of the file.
+# batches(), skip_row() and MAX_REPORTED_ERRORS are shared with the project importer
+# (projects.transfer).
+
+PUNCH_FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 1000 # Keeps the error report bounded for badly broken files
+
+
+class PunchError(ValueError):
+    pass
+
+
+def read_punches(lines, fmt='csv'):
+    """
+    Yields (line_number, username, timestamp_string) from an iterable of text lines.
+    CSV files need a header with 'username' and 'timestamp' columns; JSONL lines are objects
+    with the same keys.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, (row.get('username') or '').strip(), (row.get('timestamp') or '').strip()
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict): # Unparsable, or JSON that is not an object
+                yield line_number, '', ''
+                continue
+            yield line_number, str(row.get('username', '')).strip(), str(row.get('timestamp', '')).strip()
+    else:
+        raise PunchError(f"Unknown punch format '{fmt}', expected one of {', '.join(PUNCH_FORMATS)}.")
+
+
+def parse_punch_time(value):
+    try:
+        timestamp = parse_datetime(value) if value else None
+    except ValueError: # Well formed but impossible, e.g. month 13
+        timestamp = None
+    if timestamp is None:
+        raise PunchError(f"Invalid timestamp '{value}'.")
+    if timezone.is_naive(timestamp):
+        # Badge readers report local wall-clock time
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def working_hours(clock_in, clock_out):
+    # Same rule as Attendance.calculate_working_hours, without needing a model instance
+    if clock_in and clock_out:
+        return round(Decimal((clock_out - clock_in).total_seconds()) / 3600, 2)
+    return None
+
+
+def batches(iterable, size):
+    """Yields lists of up to size items from iterable, reading only one list ahead."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _merge_batch(folded):
+    """
+    Merges {(user_id, date): [punch times]} into the stored rows with a single upsert.
+    Existing rows are locked first so concurrent imports of the same day cannot lose punches.
+    """
+    # user_id/date IN lists cover a superset of the keys; rows outside the batch are ignored
+    existing = Attendance.objects.select_for_update().filter(
+        user_id__in={user_id for user_id, _ in folded},
+        date__in={day for _, day in folded},
+    ).values_list('user_id', 'date', 'clock_in', 'clock_out')
+    for user_id, day, clock_in, clock_out in existing:
+        if (user_id, day) in folded:
+            folded[(user_id, day)].extend(t for t in (clock_in, clock_out) if t)
+
+    rows = []
+    for (user_id, day), times in folded.items():
+        clock_in, clock_out = min(times), max(times)
+        if clock_out == clock_in:
+            clock_out = None
+        rows.append(Attendance(
+            user_id=user_id, date=day, clock_in=clock_in, clock_out=clock_out,
+            working_hours=working_hours(clock_in, clock_out),
+        ))
+    Attendance.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=['clock_in', 'clock_out', 'working_hours'],
+    )
+
+
+def skip_row(stats, line_number, message):
+    # Counts a rejected input line; only the first MAX_REPORTED_ERRORS are reported
+    stats['skipped'] += 1
+    if len(stats['errors']) < MAX_REPORTED_ERRORS:
+        stats['errors'].append((line_number, message))
+
+
+def import_punches(punches, batch_size=5000):
+    """
+    Imports (line_number, username, timestamp) tuples as produced by read_punches.
+    Returns a dict with 'punches', 'rows' (attendance rows written), 'skipped' and 'errors',
+    a list of (line_number, message) for the first skipped punches.
+    """
+    user_ids = {} # username -> id, filled lazily; bounded by headcount
+    stats = {'punches': 0, 'rows': 0, 'skipped': 0, 'errors': []}
+
+    for batch in batches(punches, batch_size):
+        unknown = {username for _, username, _ in batch if username and username not in user_ids}
+        if unknown:
+            user_ids.update(dict.fromkeys(unknown)) # Remember misses so they are not looked up again
+            user_ids.update(User.objects.filter(username__in=unknown).values_list('username', 'id'))
+
+        folded = {}
+        for line_number, username, raw_time in batch:
+            user_id = user_ids.get(username)
+            if user_id is None:
+                skip_row(stats, line_number, f"Unknown user '{username}'.")
+                continue
+            try:
+                timestamp = parse_punch_time(raw_time)
+            except PunchError as exc:
+                skip_row(stats, line_number, str(exc))
+                continue
+            folded.setdefault((user_id, timezone.localdate(timestamp)), []).append(timestamp)
+            stats['punches'] += 1
+
+        if not folded:
+            continue
+        with transaction.atomic():
+            _merge_batch(folded)
+            refresh_rollups(folded.keys())
+        stats['rows'] += len(folded)
+    return stats
@@ -0,0 +1,207 @@
+import calendar
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import Attendance, AttendanceSummary
+
+# Keeps AttendanceSummary in step with Attendance.
+# Rather than applying +/- deltas (which drift if a write is ever missed), every
+# change recomputes only the day, week and month buckets it touches from the raw
+# rows of that user, which is a handful of indexed rows per bucket.
+
+PERIODS = ('day', 'week', 'month')
+SUMMARY_FIELDS = ['total_hours', 'days_present', 'late_arrivals', 'updated_at']
+
+
+def late_after():
+    # Clock-ins after this local time count as a late arrival
+    return getattr(settings, 'ATTENDANCE_LATE_AFTER', time(9, 15))
+
+
+def period_bounds(period, day):
+    if period == 'day':
+        return day, day
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    return start, day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _as_date(value):
+    # Attendance.date defaults to timezone.now, so unsaved instances may hold a datetime
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _is_late(clock_in, threshold):
+    if clock_in is None:
+        return False
+    if timezone.is_aware(clock_in):
+        clock_in = timezone.localtime(clock_in)
+    return clock_in.time() > threshold
+
+
+def _accumulate(rows, wanted=None):
+    """
+    Folds (user_id, date, clock_in, working_hours) rows into
+    {(user_id, period, period_start): [hours, days_present, late_arrivals]}.
+    """
+    threshold = late_after()
+    buckets = defaultdict(lambda: [Decimal('0'), 0, 0])
+    for user_id, day, clock_in, working_hours in rows:
+        present = clock_in is not None
+        late = _is_late(clock_in, threshold)
+        for period in PERIODS:
+            key = (user_id, period, period_bounds(period, day)[0])
+            if wanted is not None and key not in wanted:
+                continue
+            bucket = buckets[key]
+            bucket[0] += working_hours or 0
+            bucket[1] += present
+            bucket[2] += late
+    return buckets
+
+
+def _write(buckets, batch_size=1000):
+    summaries = [
+        AttendanceSummary(
+            user_id=user_id, period=period, period_start=start,
+            total_hours=hours, days_present=present, late_arrivals=late,
+        )
+        for (user_id, period, start), (hours, present, late) in buckets.items()
+    ]
+    AttendanceSummary.objects.bulk_create(
+        summaries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'period', 'period_start'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def _raw_rows(queryset):
+    return queryset.order_by().values_list('user_id', 'date', 'clock_in', 'working_hours')
+
+
+def refresh_rollups(keys):
+    """
+    Recomputes the summary buckets touched by the given (user_id, date) pairs.
+    Call this after any write that bypasses Attendance.save(), e.g. bulk_create or update().
+    """
+    wanted = set()
+    spans = defaultdict(set)
+    for user_id, day in keys:
+        day = _as_date(day)
+        lo, hi = day, day
+        for period in PERIODS:
+            start, end = period_bounds(period, day)
+            wanted.add((user_id, period, start))
+            lo, hi = min(lo, start), max(hi, end)
+        spans[(lo, hi)].add(user_id)
+    if not wanted:
+        return
+
+    with transaction.atomic():
+        buckets = {}
+        # Punches from one import usually share a day, so this is one query per distinct span
+        for (lo, hi), user_ids in spans.items():
+            rows = _raw_rows(Attendance.objects.filter(user_id__in=user_ids, date__range=(lo, hi)))
+            # A user's week or month may reach past this span when they have keys in several
+            # spans; only buckets lying wholly inside it were computed from all of their rows
+            buckets.update(
+                (key, value) for key, value in _accumulate(rows, wanted).items()
+                if lo <= key[2] and period_bounds(key[1], key[2])[1] <= hi
+            )
+        _write(buckets)
+
+        empty = wanted - buckets.keys()
+        if empty:
+            condition = Q()
+            for user_id, period, start in empty:
+                condition |= Q(user_id=user_id, period=period, period_start=start)
+            AttendanceSummary.objects.filter(condition).delete()
+
+
+def _months(date_from, date_to):
+    current = date_from.replace(day=1)
+    while current <= date_to:
+        yield current, period_bounds('month', current)[1]
+        current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def rebuild_rollups(date_from, date_to, batch_size=1000):
+    """
+    Rebuilds every summary bucket starting between date_from and date_to, one month at a time
+    so memory stays bounded by a month of buckets. Returns the number of buckets written.
+    """
+    written = 0
+    for month_start, month_end in _months(date_from, date_to):
+        # Weeks starting in this month may end in the next one, so read up to that Sunday
+        window_start = period_bounds('week', month_start)[0]
+        window_end = period_bounds('week', month_end)[1]
+        with transaction.atomic():
+            AttendanceSummary.objects.filter(
+                period_start__range=(month_start, month_end)
+            ).delete()
+            rows = _raw_rows(Attendance.objects.filter(date__range=(window_start, window_end)))
+            buckets = {
+                key: value
+                for key, value in _accumulate(rows.iterator(chunk_size=batch_size)).items()
+                if month_start <= key[2] <= month_end
+            }
+            _write(buckets, batch_size=batch_size)
+        written += len(buckets)
+    return written
+
+
+def _segments(date_from, date_to):
+    # Greedily covers [date_from, date_to] with the widest whole periods available
+    current = date_from
+    while current <= date_to:
+        month_end = period_bounds('month', current)[1]
+        if current.day == 1 and month_end <= date_to:
+            yield 'month', current
+            current = month_end + timedelta(days=1)
+        elif current.weekday() == 0 and current + timedelta(days=6) <= date_to:
+            yield 'week', current
+            current += timedelta(days=7)
+        else:
+            yield 'day', current
+            current += timedelta(days=1)
+
+
+def hours_between(date_from, date_to, users=None):
+    """
+    Per-user totals for a payroll period, read from summary rows.
+    Returns {user_id: {'total_hours': ..., 'days_present': ..., 'late_arrivals': ...}}.
+    """
+    starts = defaultdict(list)
+    for period, start in _segments(date_from, date_to):
+        starts[period].append(start)
+
+    condition = Q()
+    for period, period_starts in starts.items():
+        condition |= Q(period=period, period_start__in=period_starts)
+
+    summaries = AttendanceSummary.objects.filter(condition)
+    if users is not None:
+        summaries = summaries.filter(user__in=users)
+    totals = summaries.order_by().values('user_id').annotate(
+        total_hours=Sum('total_hours'),
+        days_present=Sum('days_present'),
+        late_arrivals=Sum('late_arrivals'),
+    )
+    return {
+        row['user_id']: {
+            'total_hours': row['total_hours'],
+            'days_present': row['days_present'],
+            'late_arrivals': row['late_arrivals'],
+        }
+        for row in totals
+    }
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .holidays import CALENDAR_VERSION
+from .leave_index import LEAVE_INDEX_VERSION
+from .ledger import release_leave_request, sync_leave_requests
+from .models import LeaveRequest, PublicHoliday
+
+
+@receiver([post_save, post_delete], sender=PublicHoliday)
+def holiday_changed(sender, **kwargs):
+    CALENDAR_VERSION.rotate_on_commit()
+
+
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def leave_request_changed(sender, **kwargs):
+    LEAVE_INDEX_VERSION.rotate_on_commit()
+
+
+@receiver(post_save, sender=LeaveRequest)
+def update_leave_ledger(sender, instance, **kwargs):
+    # Debits on approval and reverses on rejection; a no-op while the request is pending
+    sync_leave_requests([instance.pk])
+
+
+@receiver(pre_delete, sender=LeaveRequest)
+def release_leave_ledger(sender, instance, **kwargs):
+    release_leave_request(instance)
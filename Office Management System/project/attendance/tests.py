@@ -0,0 +1,420 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from employees.models import EmployeeProfile, User
+from employees.testing import raw_cursor
+from .clock import punch, punch_in
+from .holidays import CALENDAR_VERSION, get_holiday_calendar, is_holiday
+from .leave_index import LEAVE_INDEX_VERSION, get_leave_index
+from .ledger import accrue, balance_for
+from .models import Attendance, AttendanceAnomaly, AttendanceSummary, LeaveLedgerEntry, LeaveRequest, PublicHoliday
+from .punches import read_punches
+from .rollups import rebuild_rollups, refresh_rollups
+from .workdays import annotate_leave_days, working_days
+
+
+def summaries(user):
+    return {
+        (row.period, row.period_start): (row.total_hours, row.days_present)
+        for row in AttendanceSummary.objects.filter(user=user)
+    }
+
+
+class RollupTests(TestCase):
+    DAYS = [date(2025, 1, 6), date(2025, 1, 27), date(2025, 1, 28), date(2025, 1, 30), date(2025, 2, 1)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('worker', password='x')
+        # bulk_create skips Attendance.save(), as the importers and the close job do
+        Attendance.objects.bulk_create([
+            Attendance(
+                user=cls.user, date=day, working_hours=Decimal('8'),
+                clock_in=datetime.combine(day, time(8), tzinfo=dt_timezone.utc),
+            )
+            for day in cls.DAYS
+        ])
+
+    def test_refresh_over_two_periods_keeps_whole_buckets(self):
+        # Jan 30 and Feb 1 give different spans; the January month is only whole in the first
+        refresh_rollups([(self.user.pk, date(2025, 1, 30)), (self.user.pk, date(2025, 2, 1))])
+        rows = summaries(self.user)
+        self.assertEqual(rows[('month', date(2025, 1, 1))], (Decimal('32'), 4))
+        self.assertEqual(rows[('month', date(2025, 2, 1))], (Decimal('8'), 1))
+        self.assertEqual(rows[('week', date(2025, 1, 27))], (Decimal('32'), 4))
+        self.assertEqual(rows[('day', date(2025, 1, 30))], (Decimal('8'), 1))
+
+    def test_refresh_matches_a_full_rebuild(self):
+        refresh_rollups([(self.user.pk, day) for day in self.DAYS])
+        refreshed = summaries(self.user)
+        AttendanceSummary.objects.all().delete()
+        rebuild_rollups(date(2024, 12, 1), date(2025, 2, 28))
+        self.assertEqual(refreshed, summaries(self.user))
+
+    def test_refresh_removes_emptied_buckets(self):
+        refresh_rollups([(self.user.pk, date(2025, 2, 1))])
+        Attendance.objects.filter(date=date(2025, 2, 1)).delete() # QuerySet.delete() skips the model
+        refresh_rollups([(self.user.pk, date(2025, 2, 1))])
+        rows = summaries(self.user)
+        self.assertNotIn(('month', date(2025, 2, 1)), rows)
+        self.assertEqual(rows[('week', date(2025, 1, 27))], (Decimal('24'), 3))
+
+
+class AttendanceHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='x', role='Manager')
+        Attendance.objects.bulk_create([
+            Attendance(user=cls.manager, date=date(2025, 1, day)) for day in range(1, 4)
+        ])
+
+    def test_tampered_cursor_serves_the_first_page(self):
+        self.client.force_login(self.manager)
+        for values in (['garbage', 'x'], [5, 'manager'], ['2025-01-02', ['x']]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('attendance_history'), {'cursor': raw_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['attendances']), 3)
+
+
+class PunchReaderTests(TestCase):
+    def test_jsonl_lines_that_are_not_objects_are_bad_lines(self):
+        lines = ['[1, 2]\n', '"x"\n', 'null\n', '{"username": "a", "timestamp": "2025-01-02T08:00:00"}\n']
+        self.assertEqual(list(read_punches(lines, 'jsonl')), [
+            (1, '', ''), (2, '', ''), (3, '', ''), (4, 'a', '2025-01-02T08:00:00'),
+        ])
+
+    def test_import_api_reports_non_object_lines(self):
+        manager = User.objects.create_user('boss', password='x', role='Manager')
+        self.client.force_login(manager)
+        upload = SimpleUploadedFile('punches.jsonl', b'[1, 2]\n"x"\n')
+        response = self.client.post(reverse('import_punches_api'), {'file': upload, 'format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([error['line'] for error in response.json()['errors']], [1, 2])
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('payroll', password='x', role='Manager')
+
+    def test_invalid_filters_are_rejected(self):
+        self.client.force_login(self.manager)
+        for url in (reverse('export_attendance'), reverse('export_leave')):
+            for params in ({'date_from': '2025-02-01', 'date_to': '2025-01-01'}, {'date_from': 'yesterday'}):
+                with self.subTest(url=url, params=params):
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('errors', response.json())
+
+    def test_unfiltered_export_streams_csv(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('export_attendance'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/csv')
+
+
+class ClockPunchTests(TestCase):
+    DAY = date(2025, 1, 6)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('puncher', password='x')
+
+    def at(self, hour, minute=0):
+        return datetime.combine(self.DAY, time(hour, minute), tzinfo=dt_timezone.utc)
+
+    def test_duplicate_punches_keep_the_first(self):
+        self.assertTrue(punch(self.user, 'clock_in', self.DAY, self.at(8))[0])
+        accepted, state = punch(self.user, 'clock_in', self.DAY, self.at(9))
+        self.assertFalse(accepted)
+        self.assertEqual(state['clock_in'], self.at(8))
+        self.assertTrue(punch(self.user, 'clock_out', self.DAY, self.at(16, 30))[0])
+        accepted, state = punch(self.user, 'clock_out', self.DAY, self.at(17))
+        self.assertFalse(accepted)
+        self.assertEqual((state['clock_out'], state['working_hours']), (self.at(16, 30), Decimal('8.50')))
+        self.assertEqual(summaries(self.user)[('day', self.DAY)], (Decimal('8.50'), 1))
+
+    def test_clock_out_without_clock_in_is_rejected(self):
+        accepted, state = punch(self.user, 'clock_out', self.DAY, self.at(17))
+        self.assertFalse(accepted)
+        self.assertEqual(state, {'date': None, 'clock_in': None, 'clock_out': None, 'working_hours': None})
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_clock_in_that_loses_the_insert_race(self):
+        # Another request inserted the day's row first; only an empty row still takes the clock-in
+        Attendance.objects.bulk_create([Attendance(user=self.user, date=self.DAY, clock_in=self.at(8))])
+        self.assertFalse(punch_in(self.user.pk, self.DAY, self.at(8, 1)))
+        Attendance.objects.update(clock_in=None)
+        self.assertTrue(punch_in(self.user.pk, self.DAY, self.at(8, 2)))
+        self.assertEqual(Attendance.objects.get().clock_in, self.at(8, 2))
+
+    def test_api_answers_a_lost_punch_with_409(self):
+        self.client.force_login(self.user)
+        statuses = [self.client.post(reverse('clock_api'), {'action': 'clock_in'}).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 409])
+        self.assertEqual(self.client.post(reverse('clock_api'), {'action': 'nap'}).status_code, 400)
+
+
+class WorkingDayTests(TestCase):
+    # Monday 6 to Sunday 19 January 2025: ten weekdays
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='x')
+        PublicHoliday.objects.create(date=date(2025, 1, 8), name='Midweek')
+        PublicHoliday.objects.create(date=date(2025, 1, 11), name='On a Saturday')
+
+    def setUp(self):
+        CALENDAR_VERSION.rotate() # The calendar is process-local and outlives each test's rollback
+
+    def leave(self, start, end, status='Approved'):
+        return LeaveRequest.objects.create(user=self.user, start_date=start, end_date=end, reason='-', status=status)
+
+    def test_weekends_and_holidays_are_not_counted(self):
+        self.assertEqual(working_days([
+            (self.user.pk, date(2025, 1, 6), date(2025, 1, 19)),
+            (self.user.pk, date(2025, 1, 11), date(2025, 1, 12)), # a weekend with a holiday on it
+            (self.user.pk, date(2025, 1, 8), date(2025, 1, 8)),
+            (self.user.pk, date(2025, 1, 12), date(2025, 1, 13)),
+            (self.user.pk, date(2025, 1, 10), date(2025, 1, 9)),
+        ], include_leave=False), [9, 0, 0, 1, 0])
+
+    def test_approved_leave_is_subtracted_once(self):
+        self.leave(date(2025, 1, 9), date(2025, 1, 10))
+        self.leave(date(2025, 1, 10), date(2025, 1, 14)) # overlaps the first request
+        self.leave(date(2025, 1, 17), date(2025, 1, 17), status='Pending')
+        other = User.objects.create_user('bystander', password='x')
+        self.assertEqual(working_days([
+            (self.user.pk, date(2025, 1, 6), date(2025, 1, 19)),
+            (self.user.pk, date(2025, 1, 13), date(2025, 1, 19)),
+            (other.pk, date(2025, 1, 6), date(2025, 1, 19)),
+        ]), [5, 3, 9])
+
+    def test_leave_days_count_working_days_only(self):
+        leave = self.leave(date(2025, 1, 7), date(2025, 1, 13))
+        self.assertEqual(annotate_leave_days([leave])[0].leave_days, 4)
+
+
+class HolidayCalendarTests(TestCase):
+    DAY = date(2025, 12, 25)
+
+    def setUp(self):
+        CALENDAR_VERSION.rotate()
+
+    def test_calendar_is_served_from_memory(self):
+        get_holiday_calendar()
+        with self.assertNumQueries(0):
+            self.assertFalse(is_holiday(self.DAY))
+
+    def test_writes_reload_the_calendar_after_commit(self):
+        self.assertFalse(is_holiday(self.DAY))
+        with self.captureOnCommitCallbacks(execute=True):
+            holiday = PublicHoliday.objects.create(date=self.DAY, name='Christmas')
+            self.assertFalse(is_holiday(self.DAY)) # Not yet committed, so still the old calendar
+        self.assertTrue(is_holiday(self.DAY))
+        with self.captureOnCommitCallbacks(execute=True):
+            holiday.date = date(2025, 12, 26)
+            holiday.save()
+        self.assertEqual((is_holiday(self.DAY), is_holiday(date(2025, 12, 26))), (False, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            holiday.delete()
+        self.assertFalse(is_holiday(date(2025, 12, 26)))
+
+
+class LeaveIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('head', password='x', role='Admin')
+        cls.users = []
+        for username in ('ana', 'ben'):
+            user = User.objects.create_user(username, password='x')
+            EmployeeProfile.objects.create(user=user, department='Ops', designation='-', join_date=date(2024, 1, 1))
+            cls.users.append(user)
+
+    def setUp(self):
+        LEAVE_INDEX_VERSION.rotate() # The index is process-local and outlives each test's rollback
+        self.start = timezone.localdate() + timedelta(days=7) # Leave that has ended is not indexed
+
+    def leave(self, user, days, status='Pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LeaveRequest.objects.create(
+                user=user, start_date=self.start, end_date=self.start + timedelta(days=days - 1), reason='-', status=status,
+            )
+
+    def overlaps(self, user):
+        return [interval[2] for interval in get_leave_index().overlaps_for_user(user.pk, self.start, self.start)]
+
+    def test_saved_and_deleted_leave_is_reindexed_after_commit(self):
+        ana = self.users[0]
+        self.assertEqual(self.overlaps(ana), [])
+        leave = self.leave(ana, 2)
+        self.assertEqual(self.overlaps(ana), [leave.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.status = 'Rejected'
+            leave.save()
+        self.assertEqual(self.overlaps(ana), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.status = 'Pending'
+            leave.save()
+            self.assertEqual(self.overlaps(ana), []) # Not yet committed, so still the old index
+        self.assertEqual(self.overlaps(ana), [leave.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.delete()
+        self.assertEqual(self.overlaps(ana), [])
+
+    @override_settings(LEAVE_DEPARTMENT_CAPACITY=1)
+    def test_admin_approval_updates_department_capacity(self):
+        ana, ben = self.users
+        first = self.leave(ana, 3)
+        second = self.leave(ben, 2)
+        self.assertEqual(get_leave_index().capacity_breaches(second), [])
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:attendance_leaverequest_changelist'), {
+                'action': 'approve_leave_requests', '_selected_action': [first.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        # update() sends no post_save; the action rotates the token itself
+        breaches = get_leave_index().capacity_breaches(LeaveRequest.objects.get(pk=second.pk))
+        self.assertEqual(breaches, [(self.start, 2, 1), (self.start + timedelta(days=1), 2, 1)])
+
+
+class LeaveLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', password='x')
+
+    def setUp(self):
+        CALENDAR_VERSION.rotate()
+        accrue([self.user.pk], 20, 'accrual:2025-01')
+
+    def assertBalance(self, expected):
+        self.assertEqual(balance_for(self.user), Decimal(expected))
+        self.assertEqual(sum(LeaveLedgerEntry.objects.filter(user=self.user).values_list('days', flat=True)), Decimal(expected))
+
+    def test_balance_follows_approval_edit_and_rejection(self):
+        # Monday 6 to Friday 10 January 2025
+        leave = LeaveRequest.objects.create(
+            user=self.user, start_date=date(2025, 1, 6), end_date=date(2025, 1, 10), reason='-',
+        )
+        self.assertBalance(20)
+        leave.status = 'Approved'
+        leave.save()
+        self.assertBalance(15)
+        leave.save() # Saving again posts nothing
+        self.assertBalance(15)
+        leave.end_date = date(2025, 1, 13) # Through the weekend to Monday
+        leave.save()
+        self.assertBalance(14)
+        leave.status = 'Rejected'
+        leave.save()
+        self.assertBalance(20)
+        self.assertEqual(LeaveLedgerEntry.objects.filter(leave_request=leave).count(), 3)
+
+    def test_deleting_approved_leave_gives_the_days_back(self):
+        leave = LeaveRequest.objects.create(
+            user=self.user, start_date=date(2025, 1, 6), end_date=date(2025, 1, 7), reason='-', status='Approved',
+        )
+        self.assertBalance(18)
+        leave.delete()
+        self.assertBalance(20)
+
+    def test_accrual_is_credited_once_per_reference(self):
+        self.assertEqual(accrue([self.user.pk], 20, 'accrual:2025-01'), 0)
+        self.assertEqual(accrue([self.user.pk], 2, 'accrual:2025-02'), 1)
+        self.assertBalance(22)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('head', password='x', role='Admin')
+
+    def add_rows(self, count):
+        first = User.objects.count()
+        users = User.objects.bulk_create([User(username=f'clerk{first + i}') for i in range(count)])
+        Attendance.objects.bulk_create([Attendance(user=user, date=date(2025, 1, 6)) for user in users])
+        LeaveRequest.objects.bulk_create([
+            LeaveRequest(user=user, approved_by=self.admin, start_date=date(2025, 1, 6), end_date=date(2025, 1, 6), reason='-')
+            for user in users
+        ])
+
+    def queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_query_count_does_not_grow_with_the_table(self):
+        self.client.force_login(self.admin)
+        for name in ('attendance_attendance', 'attendance_leaverequest'):
+            with self.subTest(changelist=name):
+                url = reverse(f'admin:{name}_changelist')
+                self.add_rows(2)
+                few = self.queries(url)
+                self.add_rows(20)
+                self.assertEqual(self.queries(url), few)
+
+    def test_username_filter_narrows_the_list(self):
+        self.add_rows(3)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:attendance_attendance_changelist'), {'user__username': 'clerk2'})
+        self.assertEqual([row.user.username for row in response.context['cl'].result_list], ['clerk2'])
+
+
+class NightlyCloseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'shift{i}') for i in range(3)])
+
+    def punch(self, user, day, clock_in, clock_out=None):
+        def at(hour):
+            return datetime.combine(day, time(hour), tzinfo=dt_timezone.utc) if hour is not None else None
+        return Attendance.objects.create(user=user, date=day, clock_in=at(clock_in), clock_out=at(clock_out))
+
+    def close(self, day):
+        out = StringIO()
+        call_command('close_open_attendance', date=day, chunk_size=1, stdout=out)
+        return out.getvalue()
+
+    def anomalies(self):
+        return sorted(AttendanceAnomaly.objects.values_list('attendance__user__username', 'kind'))
+
+    def test_open_records_are_closed_by_policy(self):
+        day = date(2025, 1, 6) # A Monday
+        first = self.punch(self.users[0], day, 9)
+        second = self.punch(self.users[1], day, 7)
+        done = self.punch(self.users[2], day, 8, 12)
+        self.punch(self.users[0], day + timedelta(days=1), 9) # Another day is left alone
+        self.assertIn('closed 2 open records', self.close(day))
+        first.refresh_from_db()
+        self.assertEqual((first.clock_out.hour, first.working_hours), (17, Decimal('8.00')))
+        second.refresh_from_db()
+        self.assertEqual(second.clock_out.hour, 15)
+        done.refresh_from_db()
+        self.assertEqual(done.working_hours, Decimal('4.00'))
+        self.assertEqual(self.anomalies(), [('shift0', 'missing_punch'), ('shift1', 'missing_punch')])
+        self.assertEqual(summaries(self.users[0])[('day', day)], (Decimal('8.00'), 1))
+        self.assertEqual(Attendance.objects.filter(clock_out__isnull=True).count(), 1)
+        # A second run finds nothing left to close and adds no duplicate flags
+        self.assertIn('closed 0 open records', self.close(day))
+        self.assertEqual(len(self.anomalies()), 2)
+
+    @override_settings(ATTENDANCE_MAX_SHIFT_HOURS=10)
+    def test_long_shifts_and_weekend_work_are_flagged(self):
+        day = date(2025, 1, 11) # A Saturday
+        self.punch(self.users[0], day, 6, 18)
+        self.punch(self.users[1], day, 9, 12)
+        self.close(day)
+        self.assertEqual(self.anomalies(), [
+            ('shift0', 'long_shift'), ('shift0', 'weekend_work'), ('shift1', 'weekend_work'),
+        ])
@@ -3,9 +3,13 @@ from . import views
 
 urlpatterns = [
     path('clock-in-out/', views.clock_in_out, name='clock_in_out'),
+    path('clock/', views.clock_api, name='clock_api'),
     path('history/', views.attendance_history, name='attendance_history'),
+    path('punches/import/', views.import_punches_api, name='import_punches_api'),
     path('leave/request/', views.request_leave, name='request_leave'),
     path('leave/list/', views.leave_list, name='leave_list'),
     path('leave/approve/<int:pk>/', views.approve_reject_leave, name='approve_reject_leave'),
+    path('export/attendance/', views.export_attendance, name='export_attendance'),
+    path('export/leave/', views.export_leave, name='export_leave'),
     path('holidays/', views.public_holidays_list, name='public_holidays_list'),
 ]
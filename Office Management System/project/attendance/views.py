@@ -1,21 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Sum, F, ExpressionWrapper, fields
 from datetime import timedelta
 from .models import Attendance, LeaveRequest, PublicHoliday
-from .forms import AttendanceForm, LeaveRequestForm, LeaveApprovalForm
-from employees.models import User # Import User model for role checks
-
-# Helper functions (copied from employees app for convenience, or you could put them in a common utility file)
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
-
-def is_employee(user):
-    return user.is_authenticated and user.role == 'Employee'
+from .forms import AttendanceForm, LeaveRequestForm, LeaveApprovalForm, AttendanceFilterForm, ExportFilterForm
+from .exports import ATTENDANCE_COLUMNS, LEAVE_COLUMNS, attendance_export_rows, leave_export_rows, stream_csv
+from employees.permissions import is_admin, is_manager_or_admin, is_employee
+from .clock import punch
+from .workdays import annotate_leave_days
+from .holidays import get_holiday_calendar
+from .leave_index import department_of, get_leave_index
+from .ledger import balance_for
+from .punches import PUNCH_FORMATS, PunchError, import_punches, read_punches
+from employees.pagination import keyset_page
+
+ATTENDANCE_PAGE_SIZE = 50
 
 # --- Attendance Views ---
 
@@ -23,31 +26,18 @@ def is_employee(user):
 @user_passes_test(is_employee) # Only employees can clock in/out
 def clock_in_out(request):
     today = timezone.localdate()
-    # Try to get today's attendance record for the current user
-    attendance, created = Attendance.objects.get_or_create(user=request.user, date=today)
 
     if request.method == 'POST':
+        # Conditional write; a repeated or out-of-order click is simply not accepted
         if 'clock_in' in request.POST:
-            if not attendance.clock_in:
-                attendance.clock_in = timezone.now()
-                attendance.save()
-                # Redirect to prevent resubmission on refresh
-                return redirect('clock_in_out')
-            else:
-                # You might want to add a message here that user is already clocked in
-                pass
+            punch(request.user, 'clock_in', today, timezone.now())
         elif 'clock_out' in request.POST:
-            if attendance.clock_in and not attendance.clock_out:
-                attendance.clock_out = timezone.now()
-                attendance.save()
-                # Redirect to prevent resubmission on refresh
-                return redirect('clock_in_out')
-            elif not attendance.clock_in:
-                # User tried to clock out without clocking in
-                pass
-            else:
-                # User already clocked out
-                pass
+            punch(request.user, 'clock_out', today, timezone.now())
+        # Redirect to prevent resubmission on refresh
+        return redirect('clock_in_out')
+
+    # Try to get today's attendance record for the current user
+    attendance, created = Attendance.objects.get_or_create(user=request.user, date=today)
 
     context = {
         'attendance': attendance,
@@ -56,22 +46,78 @@ def clock_in_out(request):
     }
     return render(request, 'attendance/clock_in_out.html', context)
 
+@login_required
+@user_passes_test(is_employee)
+@require_POST
+def clock_api(request):
+    # Lightweight punch endpoint for the morning rush: no form, no template, one conditional write
+    action = request.POST.get('action')
+    if action not in ('clock_in', 'clock_out'):
+        return JsonResponse({'error': "action must be 'clock_in' or 'clock_out'."}, status=400)
+
+    accepted, state = punch(request.user, action, timezone.localdate(), timezone.now())
+    return JsonResponse({'action': action, 'accepted': accepted, **state}, status=200 if accepted else 409)
+
 @login_required
 @user_passes_test(lambda u: is_admin(u) or is_manager_or_admin(u) or is_employee(u))
 def attendance_history(request):
+    filter_form = AttendanceFilterForm(request.GET or None)
+    filters = filter_form.cleaned_data if filter_form.is_valid() else {}
+
     if is_admin(request.user) or is_manager_or_admin(request.user):
-        # Admin/Manager sees all attendance records
-        attendances = Attendance.objects.select_related('user').all().order_by('-date', 'user__username')
+        # Admin/Manager sees all attendance records, optionally narrowed to one employee
+        attendances = Attendance.objects.select_related('user')
+        if filters.get('user'):
+            attendances = attendances.filter(user__username=filters['user'])
+        # Matches Meta.ordering; (date, user) is unique so the key is a total order
+        keys = [('date', True), ('user__username', False)]
     else:
         # Employee sees only their own attendance records
-        attendances = Attendance.objects.filter(user=request.user).order_by('-date')
+        attendances = Attendance.objects.filter(user=request.user)
+        keys = [('date', True)]
+
+    if filters.get('date_from'):
+        attendances = attendances.filter(date__gte=filters['date_from'])
+    if filters.get('date_to'):
+        attendances = attendances.filter(date__lte=filters['date_to'])
+
+    attendances, next_cursor = keyset_page(
+        attendances, keys, cursor=request.GET.get('cursor'), page_size=ATTENDANCE_PAGE_SIZE
+    )
 
+    # Keep the active filters on the "next page" link
+    query = request.GET.copy()
+    query.pop('cursor', None)
     context = {
         'attendances': attendances,
+        'filter_form': filter_form,
+        'next_cursor': next_cursor,
+        'filter_query': query.urlencode(),
+        'is_paginated': 'cursor' in request.GET,
         'is_manager_or_admin': is_manager_or_admin(request.user) # For template logic
     }
     return render(request, 'attendance/attendance_history.html', context)
 
+@login_required
+@user_passes_test(is_manager_or_admin) # Only managers/admins can load badge-reader files
+@require_POST
+def import_punches_api(request):
+    upload = request.FILES.get('file')
+    fmt = request.POST.get('format', 'csv')
+    if upload is None:
+        return JsonResponse({'error': "Upload the punch file as 'file'."}, status=400)
+    if fmt not in PUNCH_FORMATS:
+        return JsonResponse({'error': f"Format must be one of {', '.join(PUNCH_FORMATS)}."}, status=400)
+
+    # Iterating the upload yields lines, so the file is never read into memory at once
+    lines = (line.decode('utf-8-sig') for line in upload)
+    try:
+        stats = import_punches(read_punches(lines, fmt))
+    except (PunchError, UnicodeDecodeError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    stats['errors'] = [{'line': line, 'message': message} for line, message in stats['errors']]
+    return JsonResponse(stats)
+
 
 # --- Leave Views ---
 
@@ -79,15 +125,15 @@ def attendance_history(request):
 @user_passes_test(is_employee) # Only employees can request leave
 def request_leave(request):
     if request.method == 'POST':
-        form = LeaveRequestForm(request.POST)
+        form = LeaveRequestForm(request.POST, user=request.user)
         if form.is_valid():
             leave_request = form.save(commit=False)
             leave_request.user = request.user
             leave_request.save()
             return redirect('leave_list') # Redirect to view all leave requests
     else:
-        form = LeaveRequestForm()
-    context = {'form': form, 'form_title': 'Request New Leave'}
+        form = LeaveRequestForm(user=request.user)
+    context = {'form': form, 'form_title': 'Request New Leave', 'leave_balance': balance_for(request.user)}
     return render(request, 'attendance/leave_request_form.html', context)
 
 @login_required
@@ -99,9 +145,11 @@ def leave_list(request):
     else:
         # Employee sees only their own leave requests
         leave_requests = LeaveRequest.objects.filter(user=request.user).order_by('-requested_at')
+    leave_requests = annotate_leave_days(leave_requests)
 
     context = {
         'leave_requests': leave_requests,
+        'leave_balance': balance_for(request.user),
         'is_manager_or_admin': is_manager_or_admin(request.user) # For template logic
     }
     return render(request, 'attendance/leave_list.html', context)
@@ -109,29 +157,63 @@ def leave_list(request):
 @login_required
 @user_passes_test(is_manager_or_admin) # Only managers/admins can approve/reject
 def approve_reject_leave(request, pk):
-    leave_request = get_object_or_404(LeaveRequest, pk=pk)
+    leave_request = get_object_or_404(LeaveRequest.objects.select_related('user__employee_profile'), pk=pk)
 
     if request.method == 'POST':
         form = LeaveApprovalForm(request.POST, instance=leave_request)
         if form.is_valid():
             leave_request.approved_by = request.user
             leave_request.approval_date = timezone.now()
-            form.save()
+            with transaction.atomic(): # Status change and ledger debit commit together
+                form.save()
             return redirect('leave_list')
     else:
         form = LeaveApprovalForm(instance=leave_request)
+    annotate_leave_days([leave_request])
 
+    # Overlap and team capacity, answered from the in-memory leave index
+    leave_index = get_leave_index()
+    department = department_of(leave_request.user)
     context = {
         'leave_request': leave_request,
+        'department': department,
+        'overlapping_leaves': leave_index.overlaps_for_user(
+            leave_request.user_id, leave_request.start_date, leave_request.end_date, exclude=leave_request.pk
+        ),
+        'department_out': leave_index.headcount_out(
+            department, leave_request.start_date, leave_request.end_date, exclude=leave_request.pk
+        ) if department else [],
+        'capacity_breaches': leave_index.capacity_breaches(leave_request, department),
         'form': form,
         'form_title': f"Review Leave Request by {leave_request.user.username}"
     }
     return render(request, 'attendance/leave_detail.html', context)
 
+# --- Export Views ---
+
+@login_required
+@user_passes_test(is_manager_or_admin) # Payroll exports are for managers/admins
+def export_attendance(request):
+    form = ExportFilterForm(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        # Never fall back to exporting everything when the requested filter is wrong
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    filters = form.cleaned_data if form.is_bound else {}
+    return stream_csv('attendance.csv', ATTENDANCE_COLUMNS, attendance_export_rows(filters))
+
+@login_required
+@user_passes_test(is_manager_or_admin)
+def export_leave(request):
+    form = ExportFilterForm(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    filters = form.cleaned_data if form.is_bound else {}
+    return stream_csv('leave_requests.csv', LEAVE_COLUMNS, leave_export_rows(filters))
+
 # --- Public Holiday Views ---
 
 @login_required
 def public_holidays_list(request):
-    holidays = PublicHoliday.objects.all().order_by('date')
+    holidays = get_holiday_calendar().holidays # Served from memory; no query unless holidays changed
     context = {'holidays': holidays}
     return render(request, 'attendance/public_holidays_list.html', context)
@@ -0,0 +1,134 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+
+from .holidays import get_holiday_calendar
+from .models import LeaveRequest
+
+# Working-day arithmetic for leave, project timelines and payroll.
+# A working day is a weekday in settings.WORKING_WEEKDAYS (Monday=0, default Monday-Friday)
+# that is not a PublicHoliday. The engine answers many (user, start, end) ranges at once:
+# it takes holidays from the cached holiday calendar, loads approved leave for the whole
+# span in one query, builds a prefix-sum table over that span, and then counts each range
+# in O(log n), like numpy.busday_count over a precomputed calendar but without NumPy.
+# All ranges are inclusive of both end dates, matching LeaveRequest.
+
+
+def working_weekdays():
+    return frozenset(getattr(settings, 'WORKING_WEEKDAYS', (0, 1, 2, 3, 4)))
+
+
+def _merge(intervals):
+    # Overlapping or adjacent leave requests count once
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class WorkingDayCalendar:
+    def __init__(self, first_day, last_day, holidays=None, leaves=None):
+        """
+        holidays: iterable of dates. leaves: {user_id: [(start, end), ...]} of approved leave.
+        Only dates between first_day and last_day can be counted.
+        """
+        self.first_day = first_day
+        self.last_day = last_day
+        weekdays = working_weekdays()
+        holidays = set(holidays or ())
+
+        # prefix[i] = working days in [first_day, first_day + i)
+        self.prefix = [0]
+        day = first_day
+        while day <= last_day:
+            self.prefix.append(self.prefix[-1] + (day.weekday() in weekdays and day not in holidays))
+            day += timedelta(days=1)
+
+        # Per user: disjoint leave intervals with a running total of their working days
+        self.leaves = {}
+        for user_id, intervals in (leaves or {}).items():
+            merged = _merge(
+                (max(start, first_day), min(end, last_day))
+                for start, end in intervals if start <= last_day and end >= first_day
+            )
+            totals = [0]
+            for start, end in merged:
+                totals.append(totals[-1] + self.count(start, end))
+            self.leaves[user_id] = ([s for s, _ in merged], [e for _, e in merged], totals)
+
+    def count(self, start, end):
+        """Working days in [start, end], ignoring leave."""
+        if end < start:
+            return 0
+        lo = max((start - self.first_day).days, 0)
+        hi = min((end - self.first_day).days + 1, len(self.prefix) - 1)
+        return self.prefix[hi] - self.prefix[lo] if hi > lo else 0
+
+    def leave_count(self, user_id, start, end):
+        """Working days in [start, end] on which user_id is on approved leave."""
+        if user_id not in self.leaves or end < start:
+            return 0
+        starts, ends, totals = self.leaves[user_id]
+        first = bisect_left(ends, start) # first interval ending on or after start
+        last = bisect_right(starts, end) - 1 # last interval starting on or before end
+        if first > last:
+            return 0
+        total = totals[last + 1] - totals[first]
+        # Trim the parts of the boundary intervals that fall outside the range
+        total -= self.count(starts[first], start - timedelta(days=1))
+        total -= self.count(end + timedelta(days=1), ends[last])
+        return total
+
+    def working_days(self, user_id, start, end):
+        return self.count(start, end) - self.leave_count(user_id, start, end)
+
+
+def load_calendar(first_day, last_day, user_ids=(), include_leave=True):
+    """Builds a WorkingDayCalendar for the span; holidays come from the in-process cache."""
+    holidays = get_holiday_calendar().dates_between(first_day, last_day)
+    leaves = defaultdict(list)
+    if include_leave and user_ids:
+        approved = LeaveRequest.objects.filter(
+            user_id__in=set(user_ids), status='Approved',
+            start_date__lte=last_day, end_date__gte=first_day,
+        ).values_list('user_id', 'start_date', 'end_date')
+        for user_id, start, end in approved:
+            leaves[user_id].append((start, end))
+    return WorkingDayCalendar(first_day, last_day, holidays, leaves)
+
+
+def working_days(ranges, include_leave=True):
+    """
+    Counts working days for a batch of (user_id, start, end) ranges in one call.
+    With include_leave the user's approved leave is subtracted as well.
+    Returns a list of counts in the same order.
+    """
+    ranges = list(ranges)
+    if not ranges:
+        return []
+    first_day = min(start for _, start, _ in ranges)
+    last_day = max(end for _, _, end in ranges)
+    calendar = load_calendar(first_day, last_day, {user_id for user_id, _, _ in ranges}, include_leave)
+    if include_leave:
+        return [calendar.working_days(user_id, start, end) for user_id, start, end in ranges]
+    return [calendar.count(start, end) for _, start, end in ranges]
+
+
+def annotate_leave_days(leave_requests):
+    """
+    Sets .leave_days (working days the request covers) on each LeaveRequest in one batch.
+    Other leave is not subtracted, so approved requests still report their own length.
+    """
+    leave_requests = list(leave_requests)
+    counts = working_days(
+        ((leave.user_id, leave.start_date, leave.end_date) for leave in leave_requests),
+        include_leave=False,
+    )
+    for leave, days in zip(leave_requests, counts):
+        leave.leave_days = days
+    return leave_requests
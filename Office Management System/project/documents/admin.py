@@ -1,15 +1,47 @@
 from django.contrib import admin
-from .models import Document
+from .models import Blob, Document, DocumentPreview, UploadSession
+from employees.admin_utils import ScalableAdminMixin
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'uploaded_by', 'uploaded_at', 'department', 'access_level')
     list_filter = ('department', 'access_level', 'uploaded_at')
+    list_select_related = ('uploaded_by',)
+    date_hierarchy = 'uploaded_at'
     search_fields = ('title', 'uploaded_by__username', 'department')
     readonly_fields = ('uploaded_at',)
 
+    def get_queryset(self, request):
+        # The extracted text is only needed by the search index, not by the changelist
+        return super().get_queryset(request).defer('content')
+
     # Automatically set uploaded_by to the current user when adding from admin
     def save_model(self, request, obj, form, change):
         if not change: # Only on creation
             obj.uploaded_by = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(Blob)
+class BlobAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'size', 'ref_count', 'created_at') # Maintained by documents.blobs
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('filename', 'user', 'received', 'size', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('filename', 'title', 'user__username')
+    readonly_fields = ('token', 'received', 'sha256', 'created_at', 'updated_at')
+
+@admin.register(DocumentPreview)
+class DocumentPreviewAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('blob', 'status', 'kind', 'page_count', 'has_thumbnail', 'attempts', 'updated_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('blob',)
+    readonly_fields = ('blob', 'kind', 'page_count', 'width', 'height', 'has_thumbnail', 'error', 'attempts', 'updated_at') # Written by render_previews
+    actions = ['requeue']
+
+    @admin.action(description="Render the selected previews again")
+    def requeue(self, request, queryset):
+        queryset.update(status='pending', attempts=0)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
+
+    def ready(self):
+        from . import signals # Registers the preview queue receiver
+        from .search import create_search_index
+        # Raw SQL like the task search index, so it is created after migrate
+        post_migrate.connect(create_search_index, sender=self, dispatch_uid='documents_document_search_index')
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import Blob, Document
+from .storage import blob_digest, thumbnail_name
+
+# Reference counts for content-addressed document files (see documents.storage).
+# Document.save() and the post_delete receiver in documents.signals (which also runs for bulk
+# and cascading deletes) call these in the writing transaction, so a count always matches the
+# Document rows that point at the blob. The file itself is only removed after commit, once
+# no Blob row or Document refers to it any more.
+
+
+def acquire_blob(name, storage):
+    """Counts one more Document using the stored file name."""
+    digest = blob_digest(name)
+    if digest is None:
+        return
+    Blob.objects.bulk_create([Blob(sha256=digest, size=storage.size(name))], ignore_conflicts=True)
+    Blob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(name, storage):
+    """
+    Counts one Document fewer using the stored file name and deletes the file with the last one.
+    Files from before the blob store are deleted once no Document refers to them.
+    """
+    if not name:
+        return
+    digest = blob_digest(name)
+    if digest is not None:
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                Blob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+
+    def delete_file():
+        # Checked again after commit: an identical upload may have taken the file in the meantime
+        if digest is not None and Blob.objects.filter(sha256=digest).exists():
+            return
+        if not Document.objects.filter(file=name).exists():
+            storage.delete(name)
+            storage.delete(thumbnail_name(name)) # Nothing to delete for files that never got one
+
+    transaction.on_commit(delete_file)
@@ -0,0 +1,159 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# File delivery for document downloads.
+# Django checks permissions and then either hands the transfer to the front-end server or
+# streams the file itself, chosen by settings.DOCUMENT_DELIVERY:
+#   'x-accel-redirect': nginx. The response carries only an X-Accel-Redirect header pointing
+#                       at an internal location (DOCUMENT_ACCEL_PREFIX) aliased to MEDIA_ROOT;
+#                       nginx sends the bytes, Range requests included, and the worker is free.
+#   'x-sendfile':       Apache mod_xsendfile / lighttpd, same idea with the absolute path.
+#   'python' (default): streamed by the worker, with single-range Range/If-Range support so
+#                       interrupted downloads resume. The file is exposed as file_to_stream, so
+#                       servers whose wsgi.file_wrapper uses sendfile (gunicorn, mod_wsgi) copy
+#                       it with os.sendfile, bounded by Content-Length, without touching Python.
+#
+# nginx example:
+#   location /protected-media/ { internal; alias /path/to/MEDIA_ROOT/; }
+
+DELIVERY_MODES = ('python', 'x-accel-redirect', 'x-sendfile')
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def delivery_mode():
+    mode = getattr(settings, 'DOCUMENT_DELIVERY', 'python')
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"Invalid DOCUMENT_DELIVERY '{mode}', expected one of {', '.join(DELIVERY_MODES)}.")
+    return mode
+
+
+def accel_prefix():
+    return getattr(settings, 'DOCUMENT_ACCEL_PREFIX', '/protected-media/')
+
+
+class RangeFile:
+    """
+    Reads one byte range of a file. fileno() and the OS file offset are those of the range
+    start, so a sendfile-capable wsgi.file_wrapper can send the range without reading it;
+    everything else iterates read(), which stops at the end of the range.
+    """
+
+    def __init__(self, path, start, length):
+        self.file = open(path, 'rb', buffering=0) # Unbuffered: the OS offset is the real position
+        self.file.seek(start)
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=BLOCK_SIZE):
+        if self.remaining <= 0:
+            return b''
+        data = self.file.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(BLOCK_SIZE)
+            if not data:
+                return
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) inclusive for a single 'bytes=' range, None to send the whole file
+    (no header, or a form not supported such as several ranges), or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first: # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _validators(stat):
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return etag, http_date(stat.st_mtime)
+
+
+def _range_applies(request, etag, last_modified):
+    # If-Range: resume only if the file is still the one the client has the first part of
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == parse_http_date_safe(last_modified)
+
+
+def _stream(request, path, stat, content_type):
+    etag, last_modified = _validators(stat)
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and _range_applies(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = max(end - start + 1, 0)
+    body = RangeFile(path, start, length)
+    response = StreamingHttpResponse(body, status=206 if byte_range else 200, content_type=content_type)
+    # Picked up by Django's WSGI handler and given to wsgi.file_wrapper when the server has one
+    response.file_to_stream = body
+    response.block_size = BLOCK_SIZE
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def serve_file(request, storage, name, filename, as_attachment=True):
+    """Response for the stored file name, delivered as settings.DOCUMENT_DELIVERY says."""
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    mode = delivery_mode()
+    if mode == 'python':
+        response = _stream(request, path, stat, content_type)
+    else:
+        # No body: the front-end server fills it in and answers Range/conditional requests itself
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = accel_prefix() + quote(name.replace(os.sep, '/'))
+        else:
+            response['X-Sendfile'] = path
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
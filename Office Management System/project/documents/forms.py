@@ -1,5 +1,8 @@
+import re
+
 from django import forms
-from .models import Document
+from django.conf import settings
+from .models import Document, UploadSession
 
 class DocumentForm(forms.ModelForm):
     class Meta:
@@ -8,3 +11,26 @@ class DocumentForm(forms.ModelForm):
         widgets = {
             'file': forms.FileInput(), # Ensures a file input widget is used
         }
+
+class UploadSessionForm(forms.ModelForm):
+    # Starts a chunked upload; the file itself follows in chunks
+    class Meta:
+        model = UploadSession
+        fields = ['title', 'department', 'access_level', 'filename', 'size', 'sha256']
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        max_size = getattr(settings, 'DOCUMENT_UPLOAD_MAX_SIZE', 5 * 1024 ** 3)
+        if size <= 0 or size > max_size:
+            raise forms.ValidationError(f"Size must be between 1 and {max_size} bytes.")
+        return size
+
+    def clean_sha256(self):
+        sha256 = self.cleaned_data['sha256'].lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', sha256):
+            raise forms.ValidationError("Enter the SHA-256 of the file as 64 hex digits.")
+        return sha256
+
+class DocumentSearchForm(forms.Form):
+    q = forms.CharField(max_length=200, label='Search')
+    department = forms.ChoiceField(choices=(('', 'All departments'),) + Document.DEPARTMENT_CHOICES, required=False)
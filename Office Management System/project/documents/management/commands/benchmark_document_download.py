@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from documents.delivery import DELIVERY_MODES, serve_file
+from documents.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Read-only benchmark of document downloads: for each delivery mode, the time a worker "
+        "spends on one download, from building the response to handing over the last byte. "
+        "With X-Accel-Redirect/X-Sendfile this should be near zero whatever the file size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--document', type=int, help="Document id. Defaults to the largest file found among recent uploads.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _pick(self, pk):
+        if pk is not None:
+            document = Document.objects.filter(pk=pk).first()
+            if document is None:
+                raise CommandError(f"No document {pk}.")
+            return document
+        documents = [document for document in Document.objects.all()[:200] if document.file and document.file.storage.exists(document.file.name)]
+        if not documents:
+            raise CommandError("No document with a stored file to download.")
+        return max(documents, key=lambda document: document.file.size)
+
+    def handle(self, *args, **options):
+        document = self._pick(options['document'])
+        size = document.file.size
+        self.stdout.write(f"Document {document.pk} '{document.filename()}', {size / 1024 / 1024:.2f} MB")
+        factory = RequestFactory()
+
+        for mode in DELIVERY_MODES:
+            timings = []
+            with override_settings(DOCUMENT_DELIVERY=mode):
+                for _ in range(options['repeat']):
+                    request = factory.get('/')
+                    started = perf_counter()
+                    response = serve_file(request, document.file.storage, document.file.name, document.filename())
+                    # Drain the body as the WSGI server would; offloaded responses have none
+                    sent = sum(len(chunk) for chunk in (response.streaming_content if response.streaming else [response.content]))
+                    response.close()
+                    timings.append((perf_counter() - started) * 1000)
+            ordered = sorted(timings)
+            self.stdout.write(
+                f"{mode:>16}: median {ordered[len(ordered) // 2]:.3f} ms, worst {ordered[-1]:.3f} ms per download, "
+                f"{sent} bytes through Python"
+            )
+
+        with override_settings(DOCUMENT_DELIVERY='python'):
+            request = factory.get('/', HTTP_RANGE=f'bytes={size // 2}-')
+            response = serve_file(request, document.file.storage, document.file.name, document.filename())
+            response.close()
+            self.stdout.write(f"Range resume from the middle: {response.status_code} {response['Content-Range']}")
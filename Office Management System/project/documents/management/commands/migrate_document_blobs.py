@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from documents.models import Document
+from documents.storage import BLOB_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        "Move document files stored before the content-addressed store (e.g. media/documents/) "
+        "into blobs/, storing duplicates once. Safe to rerun; converted documents are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the documents that would be converted.")
+
+    def handle(self, *args, **options):
+        legacy = Document.objects.exclude(file='').exclude(file__startswith=f"{BLOB_DIR}/").order_by('pk')
+        storage = Document._meta.get_field('file').storage
+        converted = missing = 0
+        for document in legacy.iterator():
+            old_name = document.file.name
+            if not storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f"Document {document.pk}: file '{old_name}' not found, left as is.")
+                continue
+            if options['dry_run']:
+                converted += 1
+                self.stdout.write(f"Document {document.pk}: {old_name}")
+                continue
+            document.original_filename = document.filename()
+            with storage.open(old_name, 'rb') as handle:
+                # Hashed while it is copied; a file already in the store is not copied again
+                document.file.name = storage.save(old_name, handle)
+            # save() counts the blob and deletes the old file once nothing refers to it
+            document.save(update_fields=['file', 'original_filename'])
+            converted += 1
+
+        verb = "Would convert" if options['dry_run'] else "Converted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {converted} documents ({missing} with missing files)."))
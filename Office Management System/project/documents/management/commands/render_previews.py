@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from documents.models import Document
+from documents.previews import CLAIM_BATCH, enqueue_missing_previews, render_batch, render_isolated, requeue_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Render document thumbnails and page metadata queued by uploads, in a pool of worker "
+        "processes. Runs until the queue is empty, or keeps polling with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Rendering processes.")
+        parser.add_argument('--batch-size', type=int, default=CLAIM_BATCH, help="Jobs claimed at a time.")
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for new jobs.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop.")
+        parser.add_argument('--backfill', action='store_true', help="First queue every stored file without a preview.")
+        parser.add_argument('--all', action='store_true',
+                            help="First queue every preview again, e.g. to extract text with newly installed renderers.")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f"Queued {enqueue_missing_previews()} previews.")
+        if options['all']:
+            self.stdout.write(f"Queued {requeue_all()} previews again.")
+        storage = Document._meta.get_field('file').storage
+        done = failed = 0
+        # The renderers need no Django setup or database connection, so workers start bare
+        pool = ProcessPoolExecutor(max_workers=options['workers'])
+        try:
+            while True:
+                batch_done, batch_failed, lost = render_batch(pool, storage, options['batch_size'])
+                if lost:
+                    # A worker died and took the pool with it; start a new one and find the culprit
+                    self.stderr.write(f"Worker pool broke; retrying {len(lost)} previews one at a time.")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=options['workers'])
+                    lost_done, lost_failed = render_isolated(storage, lost)
+                    batch_done += lost_done
+                    batch_failed += lost_failed
+                done += batch_done
+                failed += batch_failed
+                if batch_done or batch_failed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} previews ({failed} failed)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from documents.uploads import session_hours, sweep_uploads
+
+
+class Command(BaseCommand):
+    help = "Remove chunked uploads that stopped receiving chunks, with their part files and leftover temp files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int,
+                            help="Idle hours before an upload is removed. Defaults to DOCUMENT_UPLOAD_SESSION_HOURS.")
+
+    def handle(self, *args, **options):
+        hours = session_hours() if options['hours'] is None else options['hours']
+        sessions, files = sweep_uploads(hours)
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {sessions} uploads idle for over {hours} hours and {files} stale files."
+        ))
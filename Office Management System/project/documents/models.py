@@ -1,7 +1,53 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings # To refer to the AUTH_USER_MODEL
 from django.utils import timezone
 import os 
+import uuid
+from .storage import ContentAddressedStorage, blob_digest
+
+class Blob(models.Model):
+    # One stored file, shared by every Document with the same content (see documents.blobs)
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} documents)"
+
+class DocumentPreview(models.Model):
+    # Thumbnail and metadata of a blob, rendered by the render_previews workers (see documents.previews)
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    blob = models.OneToOneField(
+        Blob,
+        on_delete=models.CASCADE,
+        related_name='preview'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    kind = models.CharField(max_length=10, blank=True) # pdf, image, docx, notebook, text or other
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    # First page (PDF, in points) or image size (in pixels)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    has_thumbnail = models.BooleanField(default=False)
+    error = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending jobs
+            models.Index(fields=['status', 'updated_at'], name='preview_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Preview of {self.blob.sha256[:12]} ({self.status})"
+
 class Document(models.Model):
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -9,8 +55,12 @@ class Document(models.Model):
         related_name='uploaded_documents'
     )
     title = models.CharField(max_length=255)
-    # FileField stores the file path relative to MEDIA_ROOT
-    file = models.FileField(upload_to='documents/') # Files will be stored in MEDIA_ROOT/documents/
+    # FileField stores the file path relative to MEDIA_ROOT; the content-addressed storage puts
+    # each distinct file once under MEDIA_ROOT/blobs/ whatever the upload was called
+    file = models.FileField(upload_to='documents/', storage=ContentAddressedStorage())
+    original_filename = models.CharField(max_length=255, blank=True) # Name the file was uploaded as
+    # Text of the file for document search, filled in by the render_previews workers
+    content = models.TextField(blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     DEPARTMENT_CHOICES = (
@@ -31,9 +81,63 @@ class Document(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at'] # Order by most recent document
+        indexes = [
+            models.Index(fields=['-uploaded_at'], name='document_uploaded_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.department})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'file' in field_names:
+            # Remembered so replacing the file releases the old blob
+            instance._loaded_file_name = instance.__dict__.get('file')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.file and blob_digest(self.file.name) is None:
+            # A new upload still carries its own name; the storage renames it to the hash
+            self.original_filename = os.path.basename(self.file.name)
+            self.content = '' # The old file's text; the new one is extracted after upload
+        from .blobs import acquire_blob, release_blob # Imported here to avoid a circular import
+        old_name = getattr(self, '_loaded_file_name', None)
+        # A row loaded without its file column cannot tell whether the file changed
+        tracked = self._state.adding or hasattr(self, '_loaded_file_name')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if tracked and self.file.name != old_name:
+                acquire_blob(self.file.name, self.file.storage)
+                release_blob(old_name, self.file.storage)
+        self._loaded_file_name = self.file.name
+
     def filename(self):
-        return os.path.basename(self.file.name)
+        return self.original_filename or os.path.basename(self.file.name)
+
+class UploadSession(models.Model):
+    # A chunked upload in progress; becomes a Document when finalized (see documents.uploads)
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    title = models.CharField(max_length=255)
+    department = models.CharField(max_length=50, choices=Document.DEPARTMENT_CHOICES, default='General')
+    access_level = models.CharField(max_length=10, choices=Document.ACCESS_LEVEL_CHOICES, default='public')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64) # Checked against the assembled file at finalize
+    received = models.BigIntegerField(default=0) # Bytes stored so far; the next chunk starts here
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper looks for sessions that stopped receiving chunks
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
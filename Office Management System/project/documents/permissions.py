@@ -0,0 +1,24 @@
+from django.db.models import Q
+
+from .models import Document
+from employees.permissions import NOTHING, is_admin, is_manager_or_admin, user_department
+
+# Object-level permission rules for this app's models, used by employees.permissions
+# (scope() and get_permitted_or_404()). Each rule returns the Q object of the rows a user
+# may access for an action ('view', 'edit' or 'delete').
+
+
+def document_rule(user, action):
+    if is_admin(user):
+        return Q()
+    if action == 'view':
+        # Public documents, plus private ones of the user's own department
+        return Q(access_level='public') | Q(access_level='private', department=user_department(user))
+    if action == 'edit' and is_manager_or_admin(user):
+        return Q(uploaded_by=user.pk)
+    return NOTHING
+
+
+PERMISSION_RULES = {
+    Document: document_rule,
+}
@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Blob, Document, DocumentPreview
+from .rendering import TEXT_EXTRACTORS, render_preview
+from .storage import blob_digest, blob_name, thumbnail_name
+
+# Document preview job queue.
+# Saving a Document queues a DocumentPreview row for its blob (see documents.signals); the
+# render_previews command claims pending rows and renders them in a process pool, so no
+# request ever waits on rendering. Previews belong to the blob, so identical uploads share
+# one, and the thumbnail sits next to the blob file and goes with it. Thumbnail URLs contain
+# the blob hash, so they never change meaning and are served with a long max-age.
+# A renderer that kills its worker (a crash inside PyMuPDF, the OOM killer) breaks the whole
+# pool; the jobs it took down are then retried one per fresh process, so only the file that
+# crashes is charged the attempt.
+# The same job extracts the file's text into Document.content of every document using the
+# blob, which the search index picks up (see documents.search).
+
+CLAIM_BATCH = 20
+MAX_ATTEMPTS = 3
+# A running job older than this lost its worker and is handed out again
+STALE_AFTER = timedelta(minutes=30)
+
+
+def enqueue_previews(digests):
+    """Queues a preview for each blob hash that has none yet."""
+    blob_ids = Blob.objects.filter(sha256__in=list(digests), preview__isnull=True).values_list('pk', flat=True)
+    return len(DocumentPreview.objects.bulk_create(
+        [DocumentPreview(blob_id=blob_id) for blob_id in blob_ids], ignore_conflicts=True,
+    ))
+
+
+def enqueue_missing_previews(batch_size=1000):
+    """Queues previews for every blob without one, e.g. files stored before previews existed."""
+    queued = 0
+    while True:
+        digests = list(Blob.objects.filter(preview__isnull=True).values_list('sha256', flat=True)[:batch_size])
+        if not digests:
+            return queued
+        queued += enqueue_previews(digests)
+
+
+def claim_jobs(limit=CLAIM_BATCH):
+    """Marks up to limit pending previews as running and returns (preview id, sha256) pairs."""
+    now = timezone.now()
+    DocumentPreview.objects.filter(status='running', updated_at__lt=now - STALE_AFTER).update(
+        status='pending', updated_at=now,
+    )
+    with transaction.atomic():
+        # skip_locked lets several workers claim side by side on PostgreSQL
+        jobs = list(
+            DocumentPreview.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('updated_at')
+            .values_list('pk', 'blob__sha256')[:limit]
+        )
+        DocumentPreview.objects.filter(pk__in=[pk for pk, _ in jobs]).update(
+            status='running', attempts=F('attempts') + 1, updated_at=now,
+        )
+    return jobs
+
+
+def _finish(preview_id, digest, result=None, error=None):
+    if error is None:
+        text = result.pop('text')
+        with transaction.atomic():
+            DocumentPreview.objects.filter(pk=preview_id).update(
+                status='done', error='', updated_at=timezone.now(), **result,
+            )
+            Document.objects.filter(file=blob_name(digest)).update(content=text)
+        return
+    preview = DocumentPreview.objects.filter(pk=preview_id).values('attempts').first()
+    if preview is None: # The blob went away meanwhile
+        return
+    DocumentPreview.objects.filter(pk=preview_id).update(
+        status='failed' if preview['attempts'] >= MAX_ATTEMPTS else 'pending',
+        error=f"{type(error).__name__}: {error}"[:255],
+        updated_at=timezone.now(),
+    )
+
+
+def render_jobs(pool, storage, jobs):
+    """
+    Renders claimed (preview id, sha256) jobs on pool and stores the results.
+    Returns (done, failed, lost): lost are the jobs still claimed because the pool broke under
+    them, which says nothing about their own files. A pool running a single job is not lost:
+    that job broke it and is charged.
+    """
+    futures = {}
+    lost = []
+    for job in jobs:
+        name = blob_name(job[1])
+        try:
+            futures[pool.submit(render_preview, storage.path(name), storage.path(thumbnail_name(name)))] = job
+        except BrokenProcessPool: # Broken by a job submitted before this one
+            lost.append(job)
+
+    done = failed = 0
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except BrokenProcessPool as exc:
+            if len(jobs) > 1:
+                lost.append(futures[future])
+                continue
+            _finish(*futures[future], error=exc)
+            failed += 1
+        except Exception as exc: # Anything the file makes the renderer raise
+            _finish(*futures[future], error=exc)
+            failed += 1
+        else:
+            _finish(*futures[future], result=result)
+            done += 1
+    return done, failed, lost
+
+
+def render_batch(pool, storage, limit=CLAIM_BATCH):
+    """Claims a batch of previews and renders it on pool. Returns (done, failed, lost) as render_jobs."""
+    return render_jobs(pool, storage, claim_jobs(limit))
+
+
+def render_isolated(storage, jobs):
+    """Renders jobs lost with a broken pool, each in a process of its own. Returns (done, failed)."""
+    done = failed = 0
+    for job in jobs:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            job_done, job_failed, _ = render_jobs(pool, storage, [job])
+        done += job_done
+        failed += job_failed
+    return done, failed
+
+
+def share_content(document):
+    """
+    Gives a document the extracted text of another document with the same file, for uploads
+    of content whose preview was rendered before and so is not queued again. When no other
+    document has the text, a rendered preview of a kind that has text is queued again.
+    """
+    sibling = (
+        Document.objects.filter(file=document.file.name).exclude(pk=document.pk).exclude(content='')
+        .values_list('content', flat=True).first()
+    )
+    if sibling is not None:
+        Document.objects.filter(pk=document.pk, content='').update(content=sibling)
+        return
+    # Pending and running previews will fill in the new document when they finish anyway
+    DocumentPreview.objects.filter(
+        blob__sha256=blob_digest(document.file.name), status='done', kind__in=list(TEXT_EXTRACTORS),
+    ).update(status='pending', attempts=0, updated_at=timezone.now())
+
+
+def requeue_all():
+    """Queues every preview to be rendered again, e.g. after installing PyMuPDF or Pillow."""
+    return DocumentPreview.objects.exclude(status='pending').update(status='pending', attempts=0, updated_at=timezone.now())
+
+
+def previews_for(documents):
+    """Sets .preview (a done DocumentPreview or None) on each document with one query."""
+    documents = list(documents)
+    digests = {blob_digest(document.file.name) for document in documents} - {None}
+    previews = {
+        preview.blob.sha256: preview
+        for preview in DocumentPreview.objects.filter(blob__sha256__in=digests, status='done').select_related('blob')
+    }
+    for document in documents:
+        document.preview = previews.get(blob_digest(document.file.name))
+    return documents
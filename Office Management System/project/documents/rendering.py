@@ -0,0 +1,181 @@
+import json
+import mmap
+import os
+import re
+import zipfile
+
+# Preview rendering for the render_previews worker processes.
+# Pure functions of a file path with no Django or database access, so they run in a process
+# pool without any setup. Metadata comes from the file itself; thumbnails need the optional
+# PyMuPDF (PDF first page) and Pillow (images) packages and are skipped when those are missing.
+# The text for document search is extracted in the same pass; PDF text also needs PyMuPDF.
+
+THUMBNAIL_SIZE = 240 # Longest side, in pixels
+PDF_PAGE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+PDF_MEDIA_BOX_RE = re.compile(rb'/MediaBox\s*\[\s*(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s*\]')
+DOCX_PAGES_RE = re.compile(rb'<Pages>(\d+)</Pages>')
+DOCX_TEXT_RE = re.compile(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>|</w:p>')
+MAX_TEXT_CHARS = 500000 # Indexed per document; keeps one huge file from bloating the index
+IMAGE_SIGNATURES = (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff', b'GIF87a', b'GIF89a', b'BM')
+
+
+def sniff(path):
+    """The kind of a file from its content; blobs carry no extension."""
+    with open(path, 'rb') as handle:
+        head = handle.read(4096)
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP'):
+        return 'image'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                return 'docx' if 'word/document.xml' in archive.namelist() else 'other'
+        except zipfile.BadZipFile:
+            return 'other'
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if exc.start < len(head) - 3: # Not just a character cut at the 4 KB boundary
+            return 'other'
+        text = head[:exc.start].decode('utf-8')
+    if text.lstrip().startswith('{') and ('"cells"' in text or '"nbformat"' in text):
+        return 'notebook'
+    return 'text'
+
+
+def _write_thumbnail(image, thumb_path):
+    # Written under a temporary name and renamed, so readers never see half a PNG
+    temp_path = thumb_path + '.tmp'
+    image.save(temp_path, 'PNG')
+    os.replace(temp_path, thumb_path)
+
+
+def _render_pdf(path, thumb_path, result):
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Page objects inside compressed object streams are not visible here; PyMuPDF below
+        # replaces both values when it is installed
+        result['page_count'] = sum(1 for _ in PDF_PAGE_RE.finditer(data)) or None
+        box = PDF_MEDIA_BOX_RE.search(data)
+        if box:
+            left, bottom, right, top = (float(value) for value in box.groups())
+            result['width'], result['height'] = round(abs(right - left)), round(abs(top - bottom))
+    try:
+        import fitz # PyMuPDF
+    except ImportError:
+        return
+    with fitz.open(path) as pdf:
+        result['page_count'] = pdf.page_count
+        if not pdf.page_count:
+            return
+        page = pdf[0]
+        result['width'], result['height'] = round(page.rect.width), round(page.rect.height)
+        zoom = THUMBNAIL_SIZE / max(page.rect.width, page.rect.height)
+        temp_path = thumb_path + '.tmp'
+        page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(temp_path, output='png')
+        os.replace(temp_path, thumb_path)
+        result['has_thumbnail'] = True
+
+
+def _render_image(path, thumb_path, result):
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    with Image.open(path) as image:
+        result['width'], result['height'] = image.size
+        image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+            image = image.convert('RGB')
+        _write_thumbnail(image, thumb_path)
+    result['has_thumbnail'] = True
+
+
+def _render_docx(path, thumb_path, result):
+    # Word stores the page count it last laid out in the document properties
+    with zipfile.ZipFile(path) as archive:
+        try:
+            properties = archive.read('docProps/app.xml')
+        except KeyError:
+            return
+    match = DOCX_PAGES_RE.search(properties)
+    if match:
+        result['page_count'] = int(match.group(1))
+
+
+def _xml_unescape(text):
+    return text.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&apos;', "'").replace('&amp;', '&')
+
+
+def _text_of_pdf(path):
+    try:
+        import fitz # PyMuPDF
+    except ImportError:
+        return ''
+    parts, length = [], 0
+    with fitz.open(path) as pdf:
+        for page in pdf:
+            parts.append(page.get_text())
+            length += len(parts[-1])
+            if length >= MAX_TEXT_CHARS:
+                break
+    return '\n'.join(parts)
+
+
+def _text_of_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read('word/document.xml').decode('utf-8', 'replace')
+    # Runs of text, with a line break at each paragraph end
+    return _xml_unescape(''.join(match.group(1) if match.group(1) is not None else '\n' for match in DOCX_TEXT_RE.finditer(xml)))
+
+
+def _text_of_notebook(path):
+    with open(path, encoding='utf-8', errors='replace') as handle:
+        notebook = json.load(handle)
+    cells = notebook.get('cells', []) if isinstance(notebook, dict) else []
+    # Markdown and code cells; outputs are left out
+    return '\n\n'.join(
+        ''.join(cell['source']) if isinstance(cell.get('source'), list) else str(cell.get('source', ''))
+        for cell in cells if isinstance(cell, dict)
+    )
+
+
+def _text_of_text(path):
+    with open(path, encoding='utf-8', errors='replace') as handle:
+        return handle.read(MAX_TEXT_CHARS)
+
+
+TEXT_EXTRACTORS = {
+    'pdf': _text_of_pdf,
+    'docx': _text_of_docx,
+    'notebook': _text_of_notebook,
+    'text': _text_of_text,
+}
+
+
+def extract_text(path, kind):
+    """The searchable text of a file of the given kind, at most MAX_TEXT_CHARS; '' if it has none."""
+    extractor = TEXT_EXTRACTORS.get(kind)
+    text = extractor(path) if extractor is not None else ''
+    return text[:MAX_TEXT_CHARS].replace('\x00', '')
+
+
+RENDERERS = {
+    'pdf': _render_pdf,
+    'image': _render_image,
+    'docx': _render_docx,
+}
+
+
+def render_preview(path, thumb_path):
+    """
+    Renders the preview of the file at path, writing a PNG thumbnail to thumb_path when it can.
+    Returns the metadata as a dict of DocumentPreview fields, plus the extracted 'text'.
+    """
+    kind = sniff(path)
+    result = {'kind': kind, 'page_count': None, 'width': None, 'height': None, 'has_thumbnail': False}
+    renderer = RENDERERS.get(kind)
+    if renderer is not None:
+        renderer(path, thumb_path, result)
+    result['text'] = extract_text(path, kind)
+    return result
@@ -0,0 +1,26 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Document
+from employees.fulltext import FullTextIndex
+
+# Full-text search over document titles and contents.
+# Document.content holds the text the render_previews workers extract from each file; the
+# index is employees.fulltext, as for task search. search_documents() only narrows a
+# queryset, so the caller's permission scope stays part of the same query: a match the user
+# may not see is never ranked, counted or returned.
+
+DOCUMENT_INDEX = FullTextIndex(
+    Document,
+    columns=('title', 'content'),
+    weights=(10.0, 1.0),
+    config_setting='DOCUMENT_SEARCH_CONFIG',
+)
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, rebuild=False, **kwargs):
+    DOCUMENT_INDEX.create(using=using, rebuild=rebuild)
+
+
+def search_documents(queryset, text):
+    """Narrows a Document queryset to matches of text, annotated with search_rank and ordered by it."""
+    return DOCUMENT_INDEX.search(queryset, text)
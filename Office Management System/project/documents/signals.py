@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .blobs import release_blob
+from .models import Document
+from .previews import enqueue_previews, share_content
+from .storage import blob_digest
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, **kwargs):
+    # A receiver rather than Document.delete(), so queryset and cascade deletes release too
+    release_blob(instance.file.name, instance.file.storage)
+
+
+@receiver(post_save, sender=Document)
+def queue_preview(sender, instance, **kwargs):
+    # After commit, when the Blob row the preview hangs off is visible to the workers
+    digest = blob_digest(instance.file.name)
+    if digest is None:
+        return
+
+    def queue():
+        if not enqueue_previews([digest]):
+            share_content(instance) # Rendered before: copy the text, or extract it again if none is left
+    transaction.on_commit(queue)
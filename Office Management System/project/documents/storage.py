@@ -0,0 +1,72 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Content-addressed storage for document files.
+# An upload is written to a temporary file while its SHA-256 is computed over the same chunks,
+# then moved to blobs/<aa>/<bb>/<sha256>. Identical content always gets the same name, so a
+# second upload of the same handbook is dropped instead of stored again, and the two-level
+# shard keeps every directory small. Blob rows in documents.blobs count the Documents using
+# each file; the file is deleted when the last of them goes. A blob's rendered preview is
+# kept next to it as <sha256>.thumb.png (see documents.previews).
+
+BLOB_DIR = 'blobs'
+THUMBNAIL_SUFFIX = '.thumb.png'
+BLOB_NAME_RE = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})$')
+
+
+def blob_name(digest):
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def thumbnail_name(name):
+    return name + THUMBNAIL_SUFFIX
+
+
+def blob_digest(name):
+    """The SHA-256 of a blob name, or None for a file outside the blob store."""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content, so the upload name never needs a suffix
+        return name
+
+    def _save(self, name, content):
+        temp_dir = self.path(f"{BLOB_DIR}/tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir) # Same filesystem, so the move is a rename
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            return self.adopt(temp_path, digest.hexdigest())
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def adopt(self, temp_path, digest):
+        """
+        Moves a file whose SHA-256 is already known into the store and returns its name.
+        temp_path must be on the same filesystem, e.g. under blobs/.
+        """
+        name = blob_name(digest)
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(temp_path) # Already stored
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path) # Atomic; a concurrent identical upload writes the same bytes
+        return name
@@ -1,3 +1,319 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from employees.models import User
+from .models import Blob, Document, DocumentPreview
+from .previews import claim_jobs, render_jobs
+from .storage import blob_digest
+from .uploads import part_path
+
+
+class MediaTestCase(TestCase):
+    # Stored files go to a throwaway MEDIA_ROOT
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user('uploader', password='x')
+
+    def upload(self, content, name='report.txt', user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            document = Document(title=name, uploaded_by=user or self.user)
+            document.file = SimpleUploadedFile(name, content)
+            document.save()
+        return document
+
+    def stored(self, document):
+        return document.file.storage.exists(document.file.name)
+
+
+class BlobRefCountTests(MediaTestCase):
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(b'same bytes', 'a.txt')
+        second = self.upload(b'same bytes', 'b.txt')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        self.assertEqual([first.filename(), second.filename()], ['a.txt', 'b.txt'])
+
+    def test_file_is_deleted_with_the_last_document(self):
+        first = self.upload(b'shared')
+        second = self.upload(b'shared')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertTrue(self.stored(second))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(self.stored(second))
+
+    def test_replacing_the_file_releases_the_old_blob(self):
+        document = self.upload(b'version 1')
+        old_name = document.file.name
+        document = Document.objects.get(pk=document.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.file = SimpleUploadedFile('report.txt', b'version 2')
+            document.save()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertNotEqual(document.file.name, old_name)
+        self.assertFalse(document.file.storage.exists(old_name))
+
+    def test_queryset_delete_releases_blobs(self):
+        kept = self.upload(b'shared')
+        self.upload(b'shared')
+        self.upload(b'only copy')
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.exclude(pk=kept.pk).delete()
+        self.assertEqual(list(Blob.objects.values_list('ref_count', flat=True)), [1])
+        self.assertTrue(self.stored(kept))
+
+    def test_cascade_from_the_uploader_releases_blobs(self):
+        other = User.objects.create_user('other', password='x')
+        document = self.upload(b'orphaned', user=other)
+        self.assertTrue(DocumentPreview.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(DocumentPreview.objects.exists())
+        self.assertFalse(self.stored(document))
+
+
+class SharedContentTests(MediaTestCase):
+    def render(self, document, content):
+        # What a finished render_previews job leaves behind
+        DocumentPreview.objects.filter(blob__sha256=blob_digest(document.file.name)).update(status='done', kind='text')
+        Document.objects.filter(file=document.file.name).update(content=content)
+
+    def test_duplicate_upload_copies_the_text(self):
+        first = self.upload(b'quarterly budget')
+        self.render(first, 'quarterly budget')
+        second = self.upload(b'quarterly budget')
+        self.assertEqual(Document.objects.get(pk=second.pk).content, 'quarterly budget')
+        self.assertEqual(DocumentPreview.objects.get().status, 'done')
+
+    def test_duplicate_upload_without_text_to_copy_requeues_the_preview(self):
+        first = self.upload(b'quarterly budget')
+        self.render(first, '')
+        self.upload(b'quarterly budget')
+        self.assertEqual(DocumentPreview.objects.get().status, 'pending')
+
+    def test_reupload_after_the_uploader_was_deleted_is_rendered_again(self):
+        other = User.objects.create_user('leaver', password='x')
+        self.render(self.upload(b'quarterly budget', user=other), 'quarterly budget')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.upload(b'quarterly budget')
+        self.assertEqual(DocumentPreview.objects.get().status, 'pending')
+
+
+class BrokenPool:
+    # Stands in for a ProcessPoolExecutor whose worker was killed
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly.'))
+        return future
+
+
+class PreviewJobTests(TestCase):
+    def setUp(self):
+        for digest in ('a' * 64, 'b' * 64):
+            DocumentPreview.objects.create(blob=Blob.objects.create(sha256=digest, size=1))
+
+    def test_jobs_lost_with_a_broken_pool_are_not_charged(self):
+        jobs = claim_jobs()
+        done, failed, lost = render_jobs(BrokenPool(), Document._meta.get_field('file').storage, jobs)
+        self.assertEqual((done, failed), (0, 0))
+        self.assertCountEqual(lost, jobs)
+        self.assertFalse(DocumentPreview.objects.exclude(status='running').exists())
+
+    def test_a_lone_job_that_breaks_the_pool_is_charged(self):
+        job = claim_jobs(limit=1)
+        done, failed, lost = render_jobs(BrokenPool(), Document._meta.get_field('file').storage, job)
+        self.assertEqual((done, failed, lost), (0, 1, []))
+        preview = DocumentPreview.objects.get(pk=job[0][0])
+        self.assertEqual((preview.status, preview.attempts), ('pending', 1))
+        self.assertTrue(preview.error.startswith('BrokenProcessPool'))
+
+
+class DocumentSearchTests(TestCase):
+    def test_query_without_words_finds_nothing(self):
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        for q in ('"(*', '***'):
+            with self.subTest(q=q):
+                response = self.client.get(reverse('document_search'), {'q': q})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {'results': []})
+
+
+class DocumentDownloadTests(MediaTestCase):
+    CONTENT = b'0123456789'
+
+    def setUp(self):
+        super().setUp()
+        self.document = self.upload(self.CONTENT, 'digits.txt')
+        self.client.force_login(self.user)
+
+    def download(self, **headers):
+        response = self.client.get(reverse('document_download', args=[self.document.pk]), headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.download()
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+        self.assertEqual((response['Content-Length'], response['Accept-Ranges']), ('10', 'bytes'))
+        self.assertIn('attachment; filename="digits.txt"', response['Content-Disposition'])
+
+    def test_single_ranges_are_partial_content(self):
+        for header, body, content_range in (
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-100', b'89', 'bytes 8-9/10'),
+            ('bytes=-50', self.CONTENT, 'bytes 0-9/10'),
+        ):
+            with self.subTest(range=header):
+                response, received = self.download(Range=header)
+                self.assertEqual((response.status_code, received), (206, body))
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+
+    def test_unsatisfiable_ranges_are_416(self):
+        for header in ('bytes=10-', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(range=header):
+                response, _ = self.download(Range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_unsupported_ranges_send_the_whole_file(self):
+        for header in ('bytes=0-1,4-5', 'lines=1-2', 'bytes=-'):
+            with self.subTest(range=header):
+                response, body = self.download(Range=header)
+                self.assertEqual((response.status_code, body), (200, self.CONTENT))
+
+    def test_if_range_resumes_only_the_same_file(self):
+        response, _ = self.download()
+        for if_range in (response['ETag'], response['Last-Modified']):
+            with self.subTest(if_range=if_range):
+                self.assertEqual(self.download(Range='bytes=5-', **{'If-Range': if_range})[0].status_code, 206)
+        stale, body = self.download(Range='bytes=5-', **{'If-Range': '"0-0"'})
+        self.assertEqual((stale.status_code, body), (200, self.CONTENT))
+
+    @override_settings(DOCUMENT_DELIVERY='x-accel-redirect', DOCUMENT_ACCEL_PREFIX='/protected/')
+    def test_front_end_server_delivery_has_no_body(self):
+        response, body = self.download(Range='bytes=2-5')
+        self.assertEqual((response.status_code, body), (200, b''))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.document.file.name)
+
+    def test_private_documents_of_other_departments_are_missing(self):
+        Document.objects.filter(pk=self.document.pk).update(access_level='private', department='Finance')
+        self.client.force_login(User.objects.create_user('outsider', password='x'))
+        self.assertEqual(self.download()[0].status_code, 404)
+
+
+@override_settings(DOCUMENT_UPLOAD_MAX_CHUNK_SIZE=128)
+class ChunkedUploadTests(MediaTestCase):
+    CONTENT = bytes(range(256)) + b'tail' * 11 # 300 bytes, three chunks
+
+    def setUp(self):
+        super().setUp()
+        self.manager = User.objects.create_user('archivist', password='x', role='Manager')
+        self.client.force_login(self.manager)
+
+    def start(self, content=None, **fields):
+        content = self.CONTENT if content is None else content
+        payload = {
+            'title': 'Scan', 'department': 'General', 'access_level': 'public',
+            'filename': 'scan.bin', 'size': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(), **fields,
+        }
+        response = self.client.post(reverse('upload_session_create'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def put(self, token, start, end, content=None):
+        chunk = (self.CONTENT if content is None else content)[start:end + 1]
+        return self.client.put(
+            reverse('upload_session_detail', args=[token]), chunk, content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{end}/{len(self.CONTENT)}'},
+        )
+
+    def offset(self, token):
+        return self.client.get(reverse('upload_session_detail', args=[token])).json()['offset']
+
+    def finalize(self, token):
+        return self.client.post(reverse('upload_session_finalize', args=[token]))
+
+    def test_chunks_resume_from_the_stored_offset(self):
+        token = self.start()
+        self.assertEqual(self.put(token, 0, 127).json()['offset'], 128)
+        # A retried chunk is refused with the offset to resume from
+        response = self.put(token, 0, 127)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 128))
+        self.assertEqual(self.offset(token), 128)
+        self.put(token, 128, 255)
+        self.assertEqual(self.put(token, 256, 299).json()['offset'], 300)
+        response = self.finalize(token)
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.json()['document'])
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.CONTENT)
+        self.assertEqual((document.filename(), Blob.objects.get().ref_count), ('scan.bin', 1))
+        self.assertFalse(os.path.exists(part_path(token)))
+        self.assertEqual(self.finalize(token).status_code, 404)
+
+    def test_bad_chunks_are_refused(self):
+        token = self.start()
+        response = self.client.put(
+            reverse('upload_session_detail', args=[token]), b'abc', content_type='application/octet-stream',
+            headers={'Content-Range': 'bytes 0-9/300'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put(token, 0, 199).status_code, 409) # Larger than a chunk may be
+        self.assertEqual(self.put(token, 0, 310, self.CONTENT + b'x' * 11).status_code, 409)
+        self.assertEqual(self.offset(token), 0)
+
+    def test_incomplete_uploads_are_not_finalized(self):
+        token = self.start()
+        self.put(token, 0, 127)
+        response = self.finalize(token)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('128 of 300', response.json()['error'])
+        self.assertEqual(self.offset(token), 128)
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        token = self.start(sha256='0' * 64)
+        for start in (0, 128, 256):
+            self.put(token, start, min(start + 127, 299))
+        response = self.finalize(token)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Checksum mismatch', response.json()['error'])
+        self.assertFalse(os.path.exists(part_path(token)))
+        self.assertEqual(self.client.get(reverse('upload_session_detail', args=[token])).status_code, 404)
+        self.assertFalse(Document.objects.exists())
+
+    def test_sessions_belong_to_their_starter(self):
+        token = self.start()
+        self.client.force_login(User.objects.create_user('colleague', password='x', role='Manager'))
+        self.assertEqual(self.put(token, 0, 127).status_code, 404)
+        self.assertEqual(self.finalize(token).status_code, 404)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Document, UploadSession
+from .storage import BLOB_DIR
+
+# Chunked, resumable document uploads.
+#   POST   uploads/                   declares title, filename, size and SHA-256; returns a token
+#   PUT    uploads/<token>/           one chunk, placed by its Content-Range start offset
+#   GET    uploads/<token>/           how many bytes are stored, i.e. where to resume
+#   POST   uploads/<token>/finalize/  verifies size and checksum, creates the Document
+#   DELETE uploads/<token>/           abandons the upload
+# Chunks are written straight into a part file under blobs/uploads/ as they are read from the
+# request, so memory holds one block at a time. The part file lives on the blob store's
+# filesystem and is renamed into place at finalize, so nothing is copied. A chunk only moves
+# the session's offset forward with a conditional UPDATE; two clients racing on one session
+# cannot both advance it, and anything they garble is caught by the checksum.
+# Sessions that stop receiving chunks are removed by the sweep_uploads command.
+
+UPLOAD_DIR = f"{BLOB_DIR}/uploads"
+BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+DEFAULT_SESSION_HOURS = 24
+
+
+class UploadError(ValueError):
+    pass
+
+
+def max_chunk_size():
+    return getattr(settings, 'DOCUMENT_UPLOAD_MAX_CHUNK_SIZE', DEFAULT_MAX_CHUNK_SIZE)
+
+
+def session_hours():
+    # Hours without a chunk after which the sweeper removes an upload
+    return getattr(settings, 'DOCUMENT_UPLOAD_SESSION_HOURS', DEFAULT_SESSION_HOURS)
+
+
+def _storage():
+    return Document._meta.get_field('file').storage
+
+
+def part_path(token):
+    return _storage().path(f"{UPLOAD_DIR}/{token}")
+
+
+def session_state(session):
+    return {'id': str(session.token), 'offset': session.received, 'size': session.size, 'chunk_size': max_chunk_size()}
+
+
+def write_chunk(session, offset, length, stream):
+    """
+    Stores length bytes read from stream at offset, which must be where the upload stands.
+    Returns the new offset. A short read (the client went away) keeps what did arrive.
+    """
+    if offset != session.received:
+        raise UploadError(f"Chunk starts at {offset} but the upload is at {session.received}.")
+    if length > max_chunk_size():
+        raise UploadError(f"Chunks may be at most {max_chunk_size()} bytes.")
+    if offset + length > session.size:
+        raise UploadError(f"Chunk ends past the declared size of {session.size} bytes.")
+
+    path = part_path(session.token)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            os.write(fd, block)
+            written += len(block)
+    finally:
+        os.close(fd)
+
+    advanced = UploadSession.objects.filter(pk=session.pk, received=offset).update(
+        received=offset + written, updated_at=timezone.now(),
+    )
+    if not advanced:
+        raise UploadError("The upload was changed by another request; ask for the current offset.")
+    session.received = offset + written
+    return session.received
+
+
+def discard(session):
+    UploadSession.objects.filter(pk=session.pk).delete()
+    try:
+        os.remove(part_path(session.token))
+    except FileNotFoundError:
+        pass
+
+
+def finalize(session):
+    """Checks the assembled file and turns the session into a Document, all or nothing."""
+    if session.received != session.size:
+        raise UploadError(f"Upload incomplete: {session.received} of {session.size} bytes received.")
+    path = part_path(session.token)
+    digest = hashlib.sha256()
+    with open(path, 'r+b') as part:
+        part.truncate(session.size) # Drops bytes past the end left by an abandoned retry
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    if digest.hexdigest() != session.sha256:
+        discard(session)
+        raise UploadError("Checksum mismatch; the upload was discarded, please start again.")
+
+    with transaction.atomic():
+        # Deleting the session first means only one finalize of it can go on to create a Document
+        if not UploadSession.objects.filter(pk=session.pk).delete()[0]:
+            raise UploadError("This upload was already finalized or abandoned.")
+        document = Document(
+            uploaded_by_id=session.user_id, title=session.title, department=session.department,
+            access_level=session.access_level, original_filename=session.filename,
+        )
+        document.file.name = _storage().adopt(path, session.sha256)
+        document.save() # Counts the blob
+    return document
+
+
+def sweep_uploads(hours=None):
+    """
+    Removes upload sessions idle for more than hours (default DOCUMENT_UPLOAD_SESSION_HOURS)
+    and their part files, plus part and temp files no session or upload still owns.
+    Returns (sessions, files) removed.
+    """
+    hours = session_hours() if hours is None else hours
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff).values_list('pk', 'token'))
+    UploadSession.objects.filter(pk__in=[pk for pk, _ in stale]).delete()
+
+    files = 0
+    live = {str(token) for token in UploadSession.objects.values_list('token', flat=True)}
+    # Old temp files are left by uploads interrupted inside ContentAddressedStorage._save
+    for directory, owned in ((UPLOAD_DIR, live), (f"{BLOB_DIR}/tmp", set())):
+        path = _storage().path(directory)
+        if not os.path.isdir(path):
+            continue
+        for entry in os.scandir(path):
+            if entry.name in owned or entry.stat().st_mtime > time.time() - hours * 3600:
+                continue
+            os.remove(entry.path)
+            files += 1
+    return len(stale), files
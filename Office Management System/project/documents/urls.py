@@ -8,4 +8,11 @@ urlpatterns = [
     path('edit/<int:pk>/', views.document_edit, name='document_edit'), # Edit existing document
     path('delete/<int:pk>/', views.document_delete, name='document_delete'), # Delete document
     path('download/<int:pk>/', views.document_download, name='document_download'), # Download document
+    path('preview/<int:pk>/<str:digest>.png', views.document_preview, name='document_preview'), # First-page thumbnail
+    path('search/', views.document_search, name='document_search'), # Ranked full-text search (JSON)
+
+    # Chunked, resumable uploads (JSON)
+    path('uploads/', views.upload_session_create, name='upload_session_create'), # Start an upload
+    path('uploads/<uuid:token>/', views.upload_session_detail, name='upload_session_detail'), # PUT a chunk, GET the offset, DELETE to abandon
+    path('uploads/<uuid:token>/finalize/', views.upload_session_finalize, name='upload_session_finalize'), # Verify and create the Document
 ]
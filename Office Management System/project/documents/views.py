@@ -1,45 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q # For complex queries
-from django.http import FileResponse, Http404
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+import json
+import re
 from django.conf import settings # To access MEDIA_ROOT
 import os # For path manipulation
 
-from .models import Document
-from .forms import DocumentForm
-from employees.models import User, EmployeeProfile # Import User and EmployeeProfile for role/department checks
+from .models import Document, UploadSession
+from .forms import DocumentForm, DocumentSearchForm, UploadSessionForm
+from . import uploads
+from .delivery import serve_file
+from .previews import previews_for
+from .search import search_documents
+from .storage import blob_digest, thumbnail_name
+from employees.permissions import get_permitted_or_404, is_admin, is_manager_or_admin, scope
 
-# Helper functions (copied from employees app for convenience, or you could put them in a common utility file)
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
-
-def is_employee(user):
-    return user.is_authenticated and user.role == 'Employee'
+DOCUMENT_SEARCH_LIMIT = 50
 
 # --- Document Views ---
 
 @login_required
 def document_list(request):
-    # Filter documents based on user's role and department
-    if is_admin(request.user):
-        documents = Document.objects.all().order_by('-uploaded_at')
-    else:
-        # All users can see 'public' documents
-        q_objects = Q(access_level='public')
-
-        # Managers and Employees can also see 'private' documents for their department
-        try:
-            user_profile = request.user.employee_profile
-            user_department = user_profile.department
-            q_objects |= Q(access_level='private', department=user_department)
-        except EmployeeProfile.DoesNotExist:
-            # User might not have an employee profile yet (e.g., newly created admin)
-            pass
-
-        documents = Document.objects.filter(q_objects).order_by('-uploaded_at')
+    # Admin sees everything; others see public documents and their department's private ones
+    # content (the extracted text) is only for search and can be large
+    documents = scope(request, Document.objects.select_related('uploaded_by').defer('content')).order_by('-uploaded_at')
+    documents = previews_for(documents) # Rendered in the background by render_previews
 
     context = {
         'documents': documents,
@@ -65,11 +52,8 @@ def document_upload(request):
 @login_required
 @user_passes_test(is_manager_or_admin) # Only managers/admins can edit documents
 def document_edit(request, pk):
-    document = get_object_or_404(Document, pk=pk)
-
-    # Further permission check: Only the uploader or an Admin can edit
-    if not (document.uploaded_by == request.user or is_admin(request.user)):
-        return redirect('document_list') # Or render a permission denied page
+    # Only the uploader or an Admin can edit; anything else is a 404
+    document = get_permitted_or_404(request, Document, 'edit', pk=pk)
 
     if request.method == 'POST':
         form = DocumentForm(request.POST, request.FILES, instance=document)
@@ -86,10 +70,7 @@ def document_edit(request, pk):
 def document_delete(request, pk):
     document = get_object_or_404(Document, pk=pk)
     if request.method == 'POST':
-        # Delete the file from storage before deleting the database record
-        if document.file:
-            if os.path.exists(document.file.path):
-                os.remove(document.file.path)
+        # Document.delete() releases the stored file; it is removed with the last document using it
         document.delete()
         return redirect('document_list')
     context = {'document': document}
@@ -97,31 +78,113 @@ def document_delete(request, pk):
 
 @login_required
 def document_download(request, pk):
-    document = get_object_or_404(Document, pk=pk)
+    # Same rule as document_list, checked in the query that loads the document:
+    # Admin can download any, others public documents and private ones of their department
+    document = get_permitted_or_404(request, Document, 'view', pk=pk)
 
-    # Permission check for downloading:
-    # Admin can download any.
-    # Manager/Employee can download public documents.
-    # Manager/Employee can download private documents if they are in the same department.
-    can_download = False
-    if is_admin(request.user):
-        can_download = True
-    elif document.access_level == 'public':
-        can_download = True
-    elif document.access_level == 'private':
-        try:
-            user_profile = request.user.employee_profile
-            if user_profile.department == document.department:
-                can_download = True
-        except EmployeeProfile.DoesNotExist:
-            pass # User has no profile, cannot access private docs
-
-    if not can_download:
-        raise Http404("You do not have permission to access this document.")
-
-    # Serve the file
-    file_path = document.file.path
-    if os.path.exists(file_path):
-        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=document.filename())
-    else:
+    # The bytes go out through the front-end server or a Range-capable stream (see delivery.py)
+    response = serve_file(request, document.file.storage, document.file.name, document.filename())
+    if response is None:
         raise Http404("Document file not found.")
+    return response
+
+
+@login_required
+@require_GET
+def document_preview(request, pk, digest):
+    # Same access rule as the download. The URL names the blob, so its thumbnail never changes
+    # and browsers may keep it for a year; a replaced file gets a new URL
+    document = get_permitted_or_404(request, Document, 'view', pk=pk)
+    if blob_digest(document.file.name) != digest:
+        raise Http404("Preview not found.")
+    response = serve_file(request, document.file.storage, thumbnail_name(document.file.name), 'preview.png', as_attachment=False)
+    if response is None:
+        raise Http404("Preview not rendered yet.")
+    # Private: the thumbnail is as confidential as the document
+    patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
+
+# --- Document Search API ---
+
+@login_required
+@require_GET
+def document_search(request):
+    # Ranked full-text search over titles and file contents; the access rule of document_list
+    # is part of the query, so documents the user may not see are never matched
+    form = DocumentSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    documents = scope(request, Document.objects.all())
+    if form.cleaned_data['department']:
+        documents = documents.filter(department=form.cleaned_data['department'])
+    rows = search_documents(documents, form.cleaned_data['q']).values(
+        'id', 'title', 'original_filename', 'file', 'department', 'access_level', 'uploaded_at', 'search_rank',
+    )[:DOCUMENT_SEARCH_LIMIT]
+    results = [
+        {
+            'id': row['id'], 'title': row['title'],
+            'filename': row['original_filename'] or os.path.basename(row['file']),
+            'department': row['department'], 'access_level': row['access_level'],
+            'uploaded_at': row['uploaded_at'], 'rank': round(row['search_rank'], 4),
+        }
+        for row in rows
+    ]
+    return JsonResponse({'results': results})
+
+
+# --- Chunked Upload API ---
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+@login_required
+@user_passes_test(is_manager_or_admin) # Same people as document_upload
+@require_POST
+def upload_session_create(request):
+    # Body: {"title", "department", "access_level", "filename", "size", "sha256"}
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "Send the upload details as a JSON object."}, status=400)
+    form = UploadSessionForm(payload if isinstance(payload, dict) else {})
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    session = form.save(commit=False)
+    session.user = request.user
+    session.save()
+    return JsonResponse(uploads.session_state(session), status=201)
+
+@login_required
+@user_passes_test(is_manager_or_admin)
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_session_detail(request, token):
+    # Sessions belong to whoever started them; anyone else gets a 404
+    session = get_object_or_404(UploadSession, token=token, user=request.user)
+    if request.method == 'DELETE':
+        uploads.discard(session)
+        return HttpResponse(status=204)
+    if request.method == 'PUT':
+        # Content-Range: bytes <first>-<last>/<size>; the body is read in blocks, not at once
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+        if match is None or int(match.group(2)) - int(match.group(1)) + 1 != length:
+            return JsonResponse({'error': "Send each chunk with a Content-Range matching its length."}, status=400)
+        try:
+            uploads.write_chunk(session, int(match.group(1)), length, request)
+        except uploads.UploadError as exc:
+            # 409 carries the current offset so the client can resume from it
+            session.refresh_from_db()
+            return JsonResponse(dict(uploads.session_state(session), error=str(exc)), status=409)
+    return JsonResponse(uploads.session_state(session))
+
+@login_required
+@user_passes_test(is_manager_or_admin)
+@require_POST
+def upload_session_finalize(request, token):
+    session = get_object_or_404(UploadSession, token=token, user=request.user)
+    try:
+        document = uploads.finalize(session)
+    except uploads.UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'document': document.pk, 'title': document.title, 'filename': document.filename()}, status=201)
@@ -1,12 +1,21 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User, EmployeeProfile
+from .admin_utils import ScalableAdminMixin
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
     fieldsets = BaseUserAdmin.fieldsets + (
         (None, {'fields': ('role',)}),
     )
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'role')
+    list_filter = BaseUserAdmin.list_filter + ('role',)
+
+class EmployeeProfileAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'department', 'designation', 'join_date', 'status')
+    list_filter = ('department', 'status')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name', 'department')
+    autocomplete_fields = ('user',)
 
 admin.site.register(User, UserAdmin)
-admin.site.register(EmployeeProfile)
+admin.site.register(EmployeeProfile, EmployeeProfileAdmin)
@@ -0,0 +1,89 @@
+from bisect import bisect_left
+from threading import Lock
+
+from .models import User
+from .versioning import VersionToken
+
+# Process-local prefix index over users for the assignee/approver autocomplete.
+# Each worker keeps one sorted list of lowercased search keys (username, first name, last
+# name and "first last") per role and answers a prefix query with a bisect plus a short walk,
+# so lookups cost the same whatever the headcount and never hit the database. Like the
+# holiday calendar, it reloads when a shared version token changes (see employees.signals).
+
+USER_INDEX_VERSION = VersionToken('employees:user_index:version')
+SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'role', 'is_active')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+_lock = Lock()
+_loaded = {'version': None, 'index': None}
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name} {last_name}".strip()
+
+
+class UserIndex:
+    def __init__(self, users):
+        """users: iterable of (id, username, first_name, last_name, role, is_active)."""
+        self.users = {}
+        entries = {}
+        for user_id, username, first_name, last_name, role, is_active in users:
+            name = _full_name(first_name, last_name)
+            self.users[user_id] = {
+                'id': user_id, 'username': username, 'name': name, 'role': role,
+                'label': f"{username} ({name})" if name else username, 'is_active': is_active,
+            }
+            keys = {username, first_name, last_name, name}
+            entries.setdefault(role, []).extend((key.casefold(), user_id) for key in keys if key)
+        self.by_role = {}
+        for role, pairs in entries.items():
+            pairs.sort()
+            self.by_role[role] = ([key for key, _ in pairs], [user_id for _, user_id in pairs])
+
+    def search(self, prefix, roles=None, limit=DEFAULT_LIMIT, include_inactive=False):
+        """
+        Users with a search key starting with prefix, in order of the matching key.
+        Each role's walk stops after limit users, so short prefixes stay cheap.
+        """
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        matches = []
+        for role in (roles or self.by_role):
+            keys, user_ids = self.by_role.get(role, ((), ()))
+            seen = set()
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix) and len(seen) < limit:
+                user_id = user_ids[i]
+                if user_id not in seen and (include_inactive or self.users[user_id]['is_active']):
+                    seen.add(user_id)
+                    matches.append((keys[i], user_id))
+                i += 1
+        matches.sort()
+        results = {} # user_id -> user, in order of the first matching key
+        for _, user_id in matches:
+            results.setdefault(user_id, self.users[user_id])
+            if len(results) == limit:
+                break
+        return list(results.values())
+
+    def label(self, user_id):
+        user = self.users.get(user_id)
+        return user['label'] if user is not None else ''
+
+
+def get_user_index():
+    version = USER_INDEX_VERSION.current()
+    index = _loaded['index']
+    if index is not None and _loaded['version'] == version:
+        return index
+    with _lock:
+        if _loaded['index'] is None or _loaded['version'] != version:
+            _loaded['index'] = UserIndex(User.objects.values_list('pk', *SEARCH_FIELDS).iterator())
+            _loaded['version'] = version
+        return _loaded['index']
+
+
+def search_users(prefix, roles=None, limit=DEFAULT_LIMIT):
+    return get_user_index().search(prefix, roles=roles, limit=min(limit, MAX_LIMIT))
@@ -0,0 +1,151 @@
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Database full-text indexes shared by the apps' search features (projects.search for tasks,
+# documents.search for document contents). The index lives in the database and is kept
+# current by the database itself, so every write path (save(), update(), bulk_create, raw
+# moves) updates it incrementally:
+#   PostgreSQL: a GIN index over a weighted to_tsvector() expression of the columns;
+#               no extra column, PostgreSQL maintains the index on each write.
+#   SQLite:     an external-content FTS5 table fed by insert/update/delete triggers. No porter
+#               stemming: FTS5 stems prefix terms too, so "pay"* would miss "payroll".
+# Other databases fall back to icontains. Each search word is a prefix match and all words
+# must match; earlier columns weigh more in the rank.
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERMS = 8
+PG_WEIGHTS = 'ABCD' # PostgreSQL has four weight classes, in column order
+
+
+def search_terms(text):
+    """The words of a query, lowercased; anything else is dropped so user input is never query syntax."""
+    return [word.lower() for word in WORD_RE.findall(text or '')][:MAX_TERMS]
+
+
+class FullTextIndex:
+    """
+    The search index over columns of model. weights are the SQLite bm25() weights, one per
+    column; PostgreSQL ranks by column order. config_setting names the setting holding the
+    PostgreSQL text search configuration (default 'english').
+    """
+
+    def __init__(self, model, columns, weights, config_setting):
+        if len(columns) != len(weights) or len(columns) > len(PG_WEIGHTS):
+            raise ValueError(f"Give one weight per column, for at most {len(PG_WEIGHTS)} columns.")
+        self.model = model
+        self.columns = tuple(columns)
+        self.weights = tuple(weights)
+        self.config_setting = config_setting
+        self.table_name = model._meta.db_table
+        self.fts_table = f"{self.table_name}_fts"
+        self.index_name = f"{self.table_name}_search_idx"
+
+    def search_config(self):
+        # It is written into the index definition, so it must be a plain identifier
+        config = getattr(settings, self.config_setting, 'english')
+        if not re.fullmatch(r'\w+', config):
+            raise ValueError(f"Invalid {self.config_setting} '{config}'.")
+        return config
+
+    def _pg_vector(self, connection, qualified=True):
+        table = connection.ops.quote_name(self.table_name)
+        config = self.search_config()
+        parts = []
+        for column, weight in zip(self.columns, PG_WEIGHTS):
+            name = connection.ops.quote_name(column)
+            ref = f"{table}.{name}" if qualified else name
+            parts.append(f"setweight(to_tsvector('{config}', coalesce({ref}, '')), '{weight}')")
+        # Must stay identical to the indexed expression or the planner cannot use the index
+        return ' || '.join(parts)
+
+    def create(self, using=DEFAULT_DB_ALIAS, rebuild=False):
+        """
+        Creates the index if it is missing (safe to call repeatedly, e.g. from post_migrate).
+        With rebuild it is dropped and created again from the table, which also picks up a
+        changed text search configuration.
+        """
+        connection = connections[using]
+        table = connection.ops.quote_name(self.table_name)
+        fts = self.fts_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                if rebuild:
+                    cursor.execute(f"DROP INDEX IF EXISTS {self.index_name}")
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.index_name} ON {table} "
+                    f"USING GIN (({self._pg_vector(connection, qualified=False)}))"
+                )
+            elif connection.vendor == 'sqlite':
+                if rebuild:
+                    for suffix in ('ai', 'ad', 'au'):
+                        cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+                    cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts])
+                existed = cursor.fetchone() is not None
+                columns = ', '.join(self.columns)
+                new_columns = ', '.join(f"new.{column}" for column in self.columns)
+                old_columns = ', '.join(f"old.{column}" for column in self.columns)
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+                    f"content='{self.table_name}', content_rowid='id', tokenize='unicode61', prefix='2 3')"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_columns}); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_columns}); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_columns}); "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_columns}); END"
+                )
+                if not existed:
+                    # Rows written before the table existed are not in the index yet
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    def search(self, queryset, text):
+        """
+        Narrows queryset to rows matching every word of text, annotated with search_rank
+        (higher is better) and ordered by it. A query without words matches nothing.
+        """
+        terms = search_terms(text)
+        if not terms:
+            # Still annotated, so callers can ask for search_rank whatever the query was
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(self.table_name)
+
+        if connection.vendor == 'postgresql':
+            vector = self._pg_vector(connection)
+            tsquery = ' & '.join(f"{term}:*" for term in terms)
+            config = self.search_config()
+            matches = RawSQL(f"({vector}) @@ to_tsquery('{config}', %s)", [tsquery], output_field=BooleanField())
+            rank = RawSQL(f"ts_rank_cd({vector}, to_tsquery('{config}', %s))", [tsquery], output_field=FloatField())
+            return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-pk')
+
+        if connection.vendor == 'sqlite':
+            match = ' '.join(f'"{term}"*' for term in terms) # Quoted prefix terms, implicitly ANDed
+            weights = ', '.join(str(weight) for weight in self.weights)
+            # bm25() only works on the FTS table's own cursor, so the table is joined in; a
+            # correlated subquery would run the MATCH again for every matching row
+            return queryset.extra(
+                tables=[self.fts_table],
+                where=[f"{self.fts_table}.rowid = {table}.id", f"{self.fts_table} MATCH %s"],
+                params=[match],
+                select={'search_rank': f"-bm25({self.fts_table}, {weights})"}, # bm25() is lower for better matches
+            ).order_by('-search_rank', '-pk')
+
+        condition = Q()
+        for term in terms:
+            any_column = Q()
+            for column in self.columns:
+                any_column |= Q(**{f"{column}__icontains": term})
+            condition &= any_column
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField())).order_by('-pk')
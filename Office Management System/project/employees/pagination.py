@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+# Keyset (cursor) pagination helpers shared by the list views.
+# Instead of OFFSET, each page remembers the sort key of its last row and the
+# next page asks for rows strictly after it, so page N costs the same as page 1
+# as long as the ordering is backed by an index.
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _key_field(model, path):
+    # The model field behind a 'user__username' style key, following relations
+    field = None
+    for part in path.split('__'):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+    return field
+
+
+def decode_cursor(cursor, keys, model):
+    """
+    Returns the cursor's values converted to the types of the model fields behind keys, or
+    None for missing or tampered cursors so the view falls back to the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(keys):
+        return None
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        return None # encode_cursor only ever writes scalars
+    try:
+        # Anything that would not survive the ORM's own conversion is rejected here
+        return [
+            None if value is None else _key_field(model, key[0]).to_python(value)
+            for key, value in zip(keys, values)
+        ]
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def _row_value(obj, field):
+    # Follow 'user__username' style lookups through already select_related objects
+    for part in field.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _normalize(keys):
+    # Keys are (field, descending) or (field, descending, nullable)
+    return [(key[0], key[1], key[2] if len(key) > 2 else False) for key in keys]
+
+
+def _equal(field, value):
+    return Q(**{f"{field}__isnull": True}) if value is None else Q(**{field: value})
+
+
+def keyset_filter(keys, values):
+    """
+    Builds the "after this row" condition for a lexicographic ordering.
+    Nullable keys sort their NULLs last, in either direction.
+    """
+    condition = Q()
+    for i, (field, descending, nullable) in enumerate(_normalize(keys)):
+        if values[i] is None:
+            continue # Nothing sorts after NULL in this position; only ties on it can follow
+        step = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[i]})
+        if nullable:
+            step |= Q(**{f"{field}__isnull": True})
+        for j in range(i):
+            step &= _equal(keys[j][0], values[j])
+        condition |= step
+    return condition
+
+
+def keyset_ordering(keys):
+    ordering = []
+    for field, descending, nullable in _normalize(keys):
+        if nullable:
+            # Explicit so the order matches keyset_filter on every database
+            ordering.append(F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True))
+        else:
+            ordering.append(f"-{field}" if descending else field)
+    return ordering
+
+
+def keyset_page(queryset, keys, cursor=None, page_size=50):
+    """
+    Returns (rows, next_cursor) for one page of queryset ordered by keys.
+    The last key must be unique (e.g. pk) unless the earlier keys already are.
+    next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(*keyset_ordering(keys))
+
+    values = decode_cursor(cursor, keys, queryset.model)
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(keys, values))
+
+    # Fetch one extra row to know whether another page exists without a COUNT
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, key[0]) for key in keys])
+    return rows, next_cursor
@@ -0,0 +1,80 @@
+from importlib import import_module
+
+from django.db.models import Q, Subquery
+from django.http import Http404
+
+from .models import EmployeeProfile
+
+# Role checks and object-level permissions shared by every app.
+# Role, department and ownership rules are written as Q objects over the model being fetched,
+# so the permission check is part of the query that loads the rows: lists go through scope()
+# and single objects through get_permitted_or_404(), which treats objects outside the user's
+# scope as missing. Both remember their results on the request, so checking the same object
+# again while handling one request does not query again.
+# The role checks live here; the rule for each model lives in its own app's permissions module.
+
+NOTHING = Q(pk__in=[])
+
+
+def is_admin(user):
+    return user.is_authenticated and user.role == 'Admin'
+
+
+def is_manager_or_admin(user):
+    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
+
+
+def is_employee(user):
+    return user.is_authenticated and user.role == 'Employee'
+
+
+def user_department(user):
+    # A subquery rather than user.employee_profile, so department rules cost no extra query;
+    # users without a profile get NULL, which matches no department
+    return Subquery(EmployeeProfile.objects.filter(user=user.pk).values('department')[:1])
+
+
+def _rules(model):
+    # Each app keeps the rules for its own models in <app>.permissions.PERMISSION_RULES, so
+    # this module needs no feature app; the app's module is imported on first use
+    return import_module(f"{model._meta.app_config.name}.permissions").PERMISSION_RULES
+
+
+def permission_filter(user, model, action='view'):
+    """The Q object selecting the model rows user may access for action ('view', 'edit' or 'delete')."""
+    if not user.is_authenticated:
+        return NOTHING
+    return _rules(model)[model](user, action)
+
+
+def _memo(request):
+    memo = getattr(request, '_permission_memo', None)
+    if memo is None:
+        memo = request._permission_memo = {}
+    return memo
+
+
+def scope(request, queryset, action='view'):
+    """Narrows queryset (or a model's default manager) to the rows request.user may access."""
+    if isinstance(queryset, type):
+        queryset = queryset._default_manager.all()
+    memo = _memo(request)
+    key = ('filter', queryset.model, action)
+    if key not in memo:
+        memo[key] = permission_filter(request.user, queryset.model, action)
+    return queryset.filter(memo[key])
+
+
+def get_permitted_or_404(request, queryset, action='view', **lookup):
+    """
+    Fetches one object with the permission rule in the same query. Raises Http404 both when
+    the object does not exist and when the user may not access it.
+    """
+    queryset = scope(request, queryset, action)
+    memo = _memo(request)
+    key = ('object', queryset.model, action, tuple(sorted(lookup.items())))
+    if key not in memo:
+        memo[key] = queryset.filter(**lookup).first()
+    if memo[key] is None:
+        raise Http404(f"No {queryset.model._meta.verbose_name} matches the given query.")
+    return memo[key]
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import SEARCH_FIELDS, USER_INDEX_VERSION
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, update_fields=None, **kwargs):
+    # Logins save last_login on its own; only changes to searchable fields rebuild the index
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    USER_INDEX_VERSION.rotate_on_commit()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    USER_INDEX_VERSION.rotate_on_commit()
@@ -0,0 +1,9 @@
+import base64
+import json
+
+# Helpers shared by the apps' tests.
+
+
+def raw_cursor(values):
+    # A pagination cursor as a client could hand-craft it, without encode_cursor's conversions
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
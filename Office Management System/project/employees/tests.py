@@ -1,3 +1,178 @@
-from django.test import TestCase
+from datetime import date, datetime, timezone as dt_timezone
 
-# Create your tests here.
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .autocomplete import USER_INDEX_VERSION
+from documents.models import Document
+from projects.models import Project, Task
+from .models import EmployeeProfile, User
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .permissions import get_permitted_or_404, scope
+from .testing import raw_cursor
+
+KEYS = [('date_joined', True), ('pk', False)]
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Pairs of users share a date_joined, so the pk tie-breaker matters
+        for i in range(7):
+            User.objects.create(
+                username=f'user{i}', date_joined=datetime(2025, 1, 1 + i // 2, tzinfo=dt_timezone.utc),
+            )
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(User.objects.order_by('-date_joined', 'pk').values_list('pk', flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(User.objects.all(), KEYS, cursor=cursor, page_size=3)
+            seen.extend(row.pk for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_decoded_values_have_the_field_types(self):
+        user = User.objects.order_by('pk').first()
+        values = decode_cursor(encode_cursor([user.date_joined, user.pk]), KEYS, User)
+        self.assertEqual(values, [user.date_joined, user.pk])
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        first_page, _ = keyset_page(User.objects.all(), KEYS, page_size=3)
+        for cursor in (
+            'not base64!', raw_cursor({'a': 1}), raw_cursor([1]), raw_cursor(['garbage', 'x']),
+            raw_cursor(['2025-01-02T00:00:00+00:00', 'x']), raw_cursor([[], {}]),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor, KEYS, User))
+                rows, _ = keyset_page(User.objects.all(), KEYS, cursor=cursor, page_size=3)
+                self.assertEqual(rows, first_page)
+
+
+class UserAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            role: User.objects.create_user(f'sam_{role.lower()}', password='x', role=role)
+            for role in ('Admin', 'Manager', 'Employee')
+        }
+
+    def setUp(self):
+        USER_INDEX_VERSION.rotate() # The index is process-local and outlives each test's rollback
+
+    def lookup(self, user, **params):
+        self.client.force_login(self.users[user])
+        return self.client.get(reverse('user_autocomplete'), {'q': 'sam', **params})
+
+    def roles_found(self, response):
+        return sorted(user['role'] for user in response.json()['results'])
+
+    def test_employees_may_look_up_assignees(self):
+        response = self.lookup('Employee', role=['Employee', 'Manager'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.roles_found(response), ['Employee', 'Manager'])
+
+    def test_employees_may_not_look_up_admins(self):
+        for roles in (['Admin'], ['Manager', 'Admin']):
+            with self.subTest(roles=roles):
+                self.assertEqual(self.lookup('Employee', role=roles).status_code, 403)
+
+    def test_employees_without_a_role_get_only_assignees(self):
+        self.assertEqual(self.roles_found(self.lookup('Employee')), ['Employee', 'Manager'])
+
+    def test_managers_and_admins_may_look_up_approvers(self):
+        for user in ('Manager', 'Admin'):
+            with self.subTest(user=user):
+                response = self.lookup(user, role=['Admin', 'Manager'])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.roles_found(response), ['Admin', 'Manager'])
+                self.assertEqual(self.roles_found(self.lookup(user)), ['Admin', 'Employee', 'Manager'])
+
+    def test_new_users_are_found_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('samantha', password='x', role='Employee')
+        usernames = [user['username'] for user in self.lookup('Manager', q='samanth').json()['results']]
+        self.assertEqual(usernames, ['samantha'])
+
+    def test_renamed_users_are_found_under_the_new_name(self):
+        self.lookup('Manager') # Loads the index
+        user = self.users['Employee']
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = 'jordan'
+            user.save()
+        self.assertEqual([u['id'] for u in self.lookup('Manager', q='jord').json()['results']], [user.pk])
+
+    def test_logins_keep_the_index(self):
+        version = USER_INDEX_VERSION.current()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.users['Employee']) # Saves only last_login
+        self.assertEqual(USER_INDEX_VERSION.current(), version)
+
+
+class PermissionScopeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(name, password='x', role=role)
+            for name, role in (('admin', 'Admin'), ('manager', 'Manager'), ('hr_clerk', 'Employee'), ('newcomer', 'Employee'))
+        }
+        for name, department in (('manager', 'Finance'), ('hr_clerk', 'HR')):
+            EmployeeProfile.objects.create(
+                user=cls.users[name], department=department, designation='-', join_date=date(2024, 1, 1),
+            )
+        # bulk_create skips the blob bookkeeping; these tests never touch the files
+        Document.objects.bulk_create([
+            Document(title=title, file=f'documents/{title}', uploaded_by=cls.users[uploader], department=department, access_level=access)
+            for title, uploader, department, access in (
+                ('handbook', 'admin', 'General', 'public'),
+                ('salaries', 'admin', 'HR', 'private'),
+                ('budget', 'manager', 'Finance', 'private'),
+                ('forecast', 'manager', 'Finance', 'public'),
+            )
+        ])
+        project = Project.objects.create(name='Launch')
+        Task.objects.create(project=project, title='mine', assigned_to=cls.users['hr_clerk'])
+        Task.objects.create(project=project, title='theirs', assigned_to=cls.users['newcomer'])
+
+    def request(self, name):
+        request = RequestFactory().get('/')
+        request.user = self.users[name]
+        return request
+
+    def titles(self, name, model, action='view'):
+        return sorted(scope(self.request(name), model, action).values_list('title', flat=True))
+
+    def test_documents_follow_department_and_uploader(self):
+        everything = ['budget', 'forecast', 'handbook', 'salaries']
+        self.assertEqual(self.titles('admin', Document), everything)
+        self.assertEqual(self.titles('hr_clerk', Document), ['forecast', 'handbook', 'salaries'])
+        self.assertEqual(self.titles('manager', Document), ['budget', 'forecast', 'handbook'])
+        self.assertEqual(self.titles('newcomer', Document), ['forecast', 'handbook']) # No profile, no department
+        self.assertEqual(self.titles('manager', Document, 'edit'), ['budget', 'forecast'])
+        self.assertEqual(self.titles('hr_clerk', Document, 'edit'), [])
+        self.assertEqual(self.titles('manager', Document, 'delete'), [])
+        self.assertEqual(self.titles('admin', Document, 'delete'), everything)
+
+    def test_tasks_follow_role_and_assignee(self):
+        self.assertEqual(self.titles('hr_clerk', Task), ['mine'])
+        self.assertEqual(self.titles('hr_clerk', Task, 'edit'), ['mine'])
+        self.assertEqual(self.titles('manager', Task), ['mine', 'theirs'])
+        self.assertEqual(self.titles('manager', Task, 'delete'), [])
+        self.assertEqual(self.titles('admin', Task, 'delete'), ['mine', 'theirs'])
+
+    def test_objects_out_of_scope_are_missing(self):
+        theirs = Task.objects.get(title='theirs')
+        self.assertEqual(get_permitted_or_404(self.request('manager'), Task, pk=theirs.pk), theirs)
+        with self.assertRaises(Http404):
+            get_permitted_or_404(self.request('hr_clerk'), Task, pk=theirs.pk)
+        with self.assertRaises(Http404):
+            get_permitted_or_404(self.request('admin'), Task, pk=0)
+
+    def test_repeated_checks_in_one_request_do_not_query_again(self):
+        request = self.request('hr_clerk')
+        task = Task.objects.get(title='mine')
+        get_permitted_or_404(request, Task, 'edit', pk=task.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permitted_or_404(request, Task, 'edit', pk=task.pk), task)
@@ -5,5 +5,6 @@ urlpatterns = [
     path('add/', views.employee_add, name='employee_add'), 
     path('edit/<int:pk>/', views.employee_edit, name='employee_edit'), 
     path('delete/<int:pk>/', views.employee_delete, name='employee_delete'), 
+    path('autocomplete/', views.user_autocomplete, name='user_autocomplete'), 
 ]
 
@@ -0,0 +1,29 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Shared version tokens for the process-local indexes and cached results (the holiday
+# calendar, the leave index, the user autocomplete index, the workload heatmap).
+# Each worker remembers the token its copy was built under and rebuilds once the token in the
+# shared cache differs; a write rotates the token, so every worker reloads on its next lookup.
+
+
+class VersionToken:
+    def __init__(self, key):
+        self.key = key
+
+    def current(self):
+        version = cache.get(self.key)
+        if version is None:
+            # First worker after a cache flush seeds the token; add() keeps a concurrent seed
+            cache.add(self.key, uuid4().hex, None)
+            version = cache.get(self.key)
+        return version
+
+    def rotate(self):
+        cache.set(self.key, uuid4().hex, None)
+
+    def rotate_on_commit(self):
+        # Wait for the commit so other workers cannot reload the old rows under the new version
+        transaction.on_commit(self.rotate)
@@ -1,16 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from .models import User, EmployeeProfile
 from .forms import CustomUserCreationForm, EmployeeProfileForm, CustomUserChangeForm
+from attendance.ledger import balance_for
+from .permissions import is_admin, is_manager_or_admin
+from .autocomplete import DEFAULT_LIMIT, search_users
 
-# Helper function to check if a user is an Admin
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-# Helper function to check if a user is a Manager or Admin
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+# Employees only ever pick assignees (TaskForm offers Employees and Managers); looking up
+# admins, e.g. for approver pickers, is left to managers and admins
+EMPLOYEE_LOOKUP_ROLES = {'Employee', 'Manager'}
 
 # Employee List View (Accessible by Admin and Manager)
 @login_required
@@ -88,6 +90,26 @@ def dashboard(request):
     context = {
         'user_role': user_role,
         'username': request.user.username,
+        'leave_balance': balance_for(request.user),
     }
     return render(request, 'dashboard.html', context)
 
+# Assignee/approver suggestions for the user autocomplete widget; answered from the
+# per-process user index, so it never queries the User table
+@login_required
+@require_GET
+def user_autocomplete(request):
+    allowed = ROLES if is_manager_or_admin(request.user) else EMPLOYEE_LOOKUP_ROLES
+    roles = [role for role in request.GET.getlist('role') if role in ROLES]
+    if not set(roles) <= allowed:
+        return JsonResponse({'error': f"You may not look up users with the role {', '.join(sorted(set(roles) - allowed))}."}, status=403)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    users = search_users(request.GET.get('q', ''), roles=roles or sorted(allowed), limit=max(limit, 1))
+    results = [
+        {key: user[key] for key in ('id', 'username', 'name', 'role', 'label')}
+        for user in users
+    ]
+    return JsonResponse({'results': results})
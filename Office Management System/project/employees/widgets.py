@@ -0,0 +1,36 @@
+from urllib.parse import urlencode
+
+from django import forms
+from django.urls import reverse
+
+from .autocomplete import get_user_index
+
+
+class UserAutocompleteInput(forms.Widget):
+    """
+    Text box with suggestions from the user autocomplete endpoint, for user foreign keys.
+    Unlike a Select it never iterates the field's queryset, so rendering does not depend on
+    headcount; the ModelChoiceField still validates the posted id against its queryset.
+    roles limits the suggestions, e.g. ('Admin', 'Manager') for approvers.
+    """
+    template_name = 'employees/widgets/user_autocomplete.html'
+
+    def __init__(self, roles=None, attrs=None):
+        super().__init__(attrs)
+        self.roles = tuple(roles) if roles else ()
+
+    def id_for_label(self, id_):
+        return f"{id_}_search" if id_ else id_
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        try:
+            label = get_user_index().label(int(value)) if value not in (None, '') else ''
+        except (TypeError, ValueError):
+            label = ''
+        query = urlencode([('role', role) for role in self.roles])
+        context['widget'].update({
+            'label': label,
+            'url': reverse('user_autocomplete') + (f"?{query}" if query else ''),
+        })
+        return context
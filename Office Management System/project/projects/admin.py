@@ -1,16 +1,41 @@
 from django.contrib import admin
-from .models import Project, Task
+from django.db import transaction
+from .models import Project, ProjectStats, Task, TaskReminder
+from .stats import refresh_project_stats
+from employees.admin_utils import ScalableAdminMixin, UserAutocompleteAdminMixin, username_filter
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'start_date', 'end_date')
     search_fields = ('name', 'description')
     list_filter = ('start_date', 'end_date')
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ScalableAdminMixin, UserAutocompleteAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'project', 'assigned_to', 'status', 'deadline', 'priority')
-    list_filter = ('status', 'project', 'assigned_to', 'deadline')
+    list_filter = ('status', 'project', username_filter('assigned_to', 'assignee'), 'deadline')
+    list_select_related = ('project', 'assigned_to')
     search_fields = ('title', 'description', 'project__name', 'assigned_to__username')
-    raw_id_fields = ('assigned_to',) # Use a raw ID field for assigned_to for better performance with many users
+    user_autocomplete_fields = {'assigned_to': ('Employee', 'Manager')} # No <select> of every user
 
+    def delete_queryset(self, request, queryset):
+        # Bulk delete skips Task.delete(), so refresh the affected projects' counters here
+        with transaction.atomic():
+            project_ids = set(queryset.values_list('project_id', flat=True))
+            super().delete_queryset(request, queryset)
+            refresh_project_stats(project_ids)
+
+@admin.register(ProjectStats)
+class ProjectStatsAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('project', 'todo_count', 'in_progress_count', 'done_count', 'overdue_count', 'next_deadline', 'computed_on')
+    list_select_related = ('project',)
+    search_fields = ('project__name',)
+    readonly_fields = ('todo_count', 'in_progress_count', 'done_count', 'overdue_count', 'next_deadline', 'computed_on', 'updated_at') # Maintained by projects.stats
+
+@admin.register(TaskReminder)
+class TaskReminderAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('task', 'user', 'deadline', 'sent_at')
+    list_filter = (username_filter('user', 'assignee'), 'deadline')
+    list_select_related = ('task__project', 'user')
+    search_fields = ('task__title',)
+    readonly_fields = ('task', 'user', 'deadline', 'sent_at') # Written by projects.reminders
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from . import signals # Registers the workload cache invalidation receivers
+        from .search import create_search_index
+        # The search index is raw SQL (a GIN expression index or an FTS5 table with triggers),
+        # so it is created here rather than in a model's Meta
+        post_migrate.connect(create_search_index, sender=self, dispatch_uid='projects_task_search_index')
@@ -0,0 +1,135 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task
+from .stats import refresh_project_stats
+from .workload import WORKLOAD_VERSION
+from employees.models import User
+from employees.permissions import is_manager_or_admin, scope
+
+# Kanban board reads and batched card moves.
+# The board is one values() query over the task_project_status_idx index with only the fields
+# a card shows. A move batch locks its tasks, checks each one against the updated_at version
+# the client last saw, and then writes one UPDATE per distinct target state, so dragging fifty
+# cards into "Done" is a single statement rather than fifty TaskForm round trips.
+
+BOARD_FIELDS = ('id', 'title', 'status', 'priority', 'deadline', 'assigned_to_id', 'assigned_to__username', 'updated_at')
+MOVABLE_FIELDS = ('status', 'priority', 'assigned_to')
+ASSIGNABLE_ROLES = ('Employee', 'Manager') # Same choices as TaskForm.assigned_to
+MAX_MOVES = 500
+
+
+class MoveError(ValueError):
+    pass
+
+
+def version_of(updated_at):
+    # Full microseconds; JsonResponse would cut datetimes to milliseconds and break the comparison
+    return updated_at.isoformat()
+
+
+def board_columns(tasks):
+    """Groups tasks (a Task queryset) into one column per Task.STATUS_CHOICES entry, in that order."""
+    columns = {status: [] for status, _ in Task.STATUS_CHOICES}
+    for row in tasks.values(*BOARD_FIELDS):
+        row['assignee'] = row.pop('assigned_to__username')
+        row['assigned_to'] = row.pop('assigned_to_id')
+        row['updated_at'] = version_of(row['updated_at'])
+        if row['status'] in columns:
+            columns[row['status']].append(row)
+    return [
+        {'status': status, 'label': label, 'tasks': columns[status]}
+        for status, label in Task.STATUS_CHOICES
+    ]
+
+
+def parse_moves(user, moves):
+    """
+    Validates a list of {'id', 'updated_at', and any of 'status', 'priority', 'assigned_to'}.
+    Returns {task_id: (expected_updated_at, {field: value})} or raises MoveError.
+    """
+    if not isinstance(moves, list) or not moves:
+        raise MoveError("'moves' must be a non-empty list.")
+    if len(moves) > MAX_MOVES:
+        raise MoveError(f"At most {MAX_MOVES} moves per request.")
+
+    statuses = {status for status, _ in Task.STATUS_CHOICES}
+    parsed = {}
+    for move in moves:
+        if not isinstance(move, dict) or not isinstance(move.get('id'), int):
+            raise MoveError("Every move needs an integer 'id'.")
+        task_id = move['id']
+        try:
+            expected = parse_datetime(str(move.get('updated_at', '')))
+        except ValueError:
+            expected = None
+        if expected is None or timezone.is_naive(expected):
+            raise MoveError(f"Task {task_id}: 'updated_at' must be the version from the board.")
+        changes = {field: move[field] for field in MOVABLE_FIELDS if field in move}
+        if not changes:
+            raise MoveError(f"Task {task_id}: nothing to change.")
+        if 'status' in changes and changes['status'] not in statuses:
+            raise MoveError(f"Task {task_id}: unknown status '{changes['status']}'.")
+        if 'priority' in changes and (not isinstance(changes['priority'], int) or isinstance(changes['priority'], bool)):
+            raise MoveError(f"Task {task_id}: priority must be an integer.")
+        if 'assigned_to' in changes:
+            if not is_manager_or_admin(user): # Only managers/admins reassign work
+                raise MoveError(f"Task {task_id}: you cannot change the assignee.")
+            if changes['assigned_to'] is not None and not isinstance(changes['assigned_to'], int):
+                raise MoveError(f"Task {task_id}: assigned_to must be a user id or null.")
+        if task_id in parsed:
+            raise MoveError(f"Task {task_id} appears more than once.")
+        parsed[task_id] = (expected, changes)
+
+    assignees = {changes['assigned_to'] for _, changes in parsed.values() if changes.get('assigned_to') is not None}
+    if assignees:
+        found = set(User.objects.filter(pk__in=assignees, role__in=ASSIGNABLE_ROLES).values_list('pk', flat=True))
+        if assignees - found:
+            raise MoveError(f"Unknown or unassignable users: {sorted(assignees - found)}.")
+    return parsed
+
+
+def apply_moves(request, parsed):
+    """
+    Applies moves from parse_moves() that still match their version and that request.user may
+    edit. Returns {'moved': [{'id', 'updated_at'}], 'conflicts': [{'id', 'updated_at'}],
+    'not_found': [ids]}; conflicting tasks are left untouched and report their current version.
+    """
+    result = {'moved': [], 'conflicts': [], 'not_found': []}
+    with transaction.atomic():
+        current = {}
+        projects = {}
+        for task_id, updated_at, project_id in (
+            scope(request, Task.objects.filter(pk__in=parsed.keys()), 'edit')
+            .select_for_update()
+            .order_by() # No ordering needed, and the lock query stays a plain index lookup
+            .values_list('pk', 'updated_at', 'project_id')
+        ):
+            current[task_id] = updated_at
+            projects[task_id] = project_id
+
+        by_target = defaultdict(list)
+        for task_id, (expected, changes) in parsed.items():
+            if task_id not in current:
+                result['not_found'].append(task_id)
+            elif current[task_id] != expected:
+                result['conflicts'].append({'id': task_id, 'updated_at': version_of(current[task_id])})
+            else:
+                target = tuple(sorted((f"{field}_id" if field == 'assigned_to' else field, value)
+                                      for field, value in changes.items()))
+                by_target[target].append(task_id)
+
+        # update() bypasses auto_now, so the new version is set explicitly
+        now = timezone.now()
+        for target, task_ids in by_target.items():
+            Task.objects.filter(pk__in=task_ids).update(updated_at=now, **dict(target))
+            result['moved'].extend({'id': task_id, 'updated_at': version_of(now)} for task_id in task_ids)
+        # Status moves change the project counters; refreshed in the same transaction
+        refresh_project_stats({projects[move['id']] for move in result['moved']})
+        if result['moved']:
+            # update() sends no post_save, so the workload cache is invalidated here
+            WORKLOAD_VERSION.rotate_on_commit()
+    return result
@@ -1,5 +1,6 @@
 from django import forms
 from .models import Project, Task
+from employees.widgets import UserAutocompleteInput
 
 class ProjectForm(forms.ModelForm):
     class Meta:
@@ -26,13 +27,15 @@ class TaskForm(forms.ModelForm):
         widgets = {
             'deadline': forms.DateInput(attrs={'type': 'date'}),
             'comments': forms.Textarea(attrs={'rows': 3}),
+            # Suggestions come from the autocomplete endpoint instead of a <select> of every user
+            'assigned_to': UserAutocompleteInput(roles=('Employee', 'Manager')),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Optionally, limit assigned_to choices to Employees and Managers
+        # Limit assigned_to to Employees and Managers; only used to validate the posted id
         from employees.models import User # Import here to avoid circular dependency at module level
-        self.fields['assigned_to'].queryset = User.objects.filter(role__in=['Employee', 'Manager']).order_by('username')
+        self.fields['assigned_to'].queryset = User.objects.filter(role__in=['Employee', 'Manager'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -43,3 +46,28 @@ class TaskForm(forms.ModelForm):
             self.add_error('deadline', "Task deadline cannot be after the project's end date.")
         return cleaned_data
 
+class TaskFilterForm(forms.Form):
+    status = forms.ChoiceField(choices=(('', 'All statuses'),) + Task.STATUS_CHOICES, required=False)
+    project = forms.ModelChoiceField(queryset=Project.objects.all(), required=False, empty_label='All projects')
+    assignee = forms.CharField(required=False, max_length=150, label='Assignee username')
+    deadline_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    deadline_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        deadline_from = cleaned_data.get('deadline_from')
+        deadline_to = cleaned_data.get('deadline_to')
+
+        if deadline_from and deadline_to and deadline_to < deadline_from:
+            raise forms.ValidationError("End date cannot be before start date.")
+        return cleaned_data
+
+class TaskSearchForm(forms.Form):
+    q = forms.CharField(max_length=200, label='Search')
+    status = forms.ChoiceField(choices=(('', 'All statuses'),) + Task.STATUS_CHOICES, required=False)
+    project = forms.ModelChoiceField(queryset=Project.objects.all(), required=False, empty_label='All projects')
+
+class WorkloadForm(forms.Form):
+    department = forms.CharField(required=False, max_length=100, help_text='Leave empty for everyone.')
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}), help_text='Defaults to this week.')
+    weeks = forms.IntegerField(required=False, min_value=1, max_value=26, initial=8)
@@ -0,0 +1,47 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from employees.pagination import keyset_ordering, keyset_page
+from projects.models import Task
+from projects.views import TASK_KEYS, TASK_PAGE_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Read-only benchmark of the task_list query: walks the keyset pages and compares the "
+        "latency of deep pages with the first one. Latency should stay flat as the table grows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=200, help="Maximum pages to walk.")
+        parser.add_argument('--status', help="Optional status filter, as on the task list.")
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.select_related('project', 'assigned_to')
+        if options['status']:
+            tasks = tasks.filter(status=options['status'])
+
+        timings = []
+        cursor = None
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(options['pages']):
+                started = perf_counter()
+                rows, cursor = keyset_page(tasks, TASK_KEYS, cursor=cursor, page_size=TASK_PAGE_SIZE)
+                timings.append((perf_counter() - started) * 1000)
+                if cursor is None:
+                    break
+
+        total = Task.objects.count()
+        self.stdout.write(f"{total} tasks, {len(timings)} pages of {TASK_PAGE_SIZE}, {len(queries)} queries")
+        if not timings:
+            return
+        first, last = timings[0], timings[-1]
+        ordered = sorted(timings)
+        self.stdout.write(
+            f"first page {first:.2f} ms, last page {last:.2f} ms, "
+            f"median {ordered[len(ordered) // 2]:.2f} ms, worst {ordered[-1]:.2f} ms"
+        )
+        self.stdout.write(f"plan: {tasks.order_by(*keyset_ordering(TASK_KEYS))[:TASK_PAGE_SIZE].explain()}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from projects.transfer import EXPORTERS, TRANSFER_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Export all projects or tasks as CSV or JSONL, in the format import_project_data reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTERS))
+        parser.add_argument('--format', choices=TRANSFER_FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write. Defaults to standard output.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['kind'], options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,45 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.transfer import IMPORTERS, TRANSFER_FORMATS, TransferError, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import projects or tasks from a CSV or JSONL file, e.g. an export of another tracker. "
+        "Rows are validated like the project/task forms; invalid rows are skipped and reported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help="What the file holds.")
+        parser.add_argument('path', help="File with one project or task per row.")
+        parser.add_argument('--format', choices=TRANSFER_FORMATS,
+                            help="File format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--report', help="Write every skipped line and its errors to this CSV file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in TRANSFER_FORMATS:
+            raise CommandError(f"Cannot tell the format of '{path}', pass --format.")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as handle:
+                stats = IMPORTERS[options['kind']](read_rows(handle, fmt), batch_size=options['batch_size'])
+        except (OSError, TransferError) as exc:
+            raise CommandError(str(exc))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as report:
+                writer = csv.writer(report)
+                writer.writerow(['line', 'errors'])
+                writer.writerows(stats['errors'])
+        else:
+            for line_number, message in stats['errors']:
+                self.stderr.write(f"line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} of {stats['rows']} {options['kind']} ({stats['skipped']} skipped)."
+        ))
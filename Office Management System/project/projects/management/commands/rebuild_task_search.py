@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from projects.search import create_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop and recreate the task full-text search index (the PostgreSQL GIN index or the "
+        "SQLite FTS5 table and its triggers) from the current tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        create_search_index(using=using, rebuild=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Task search index rebuilt on '{using}' ({connections[using].vendor})."
+        ))
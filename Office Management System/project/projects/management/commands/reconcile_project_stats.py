@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project, ProjectStats
+from projects.stats import STATS_FIELDS, refresh_project_stats
+
+COMPARED_FIELDS = [field for field in STATS_FIELDS if field not in ('computed_on', 'updated_at')]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every project's task counters from the Task table and report rows that had "
+        "drifted. Also backfills projects that have no ProjectStats row yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        project_ids = list(Project.objects.order_by('pk').values_list('pk', flat=True))
+        checked = drifted = 0
+        for i in range(0, len(project_ids), size):
+            batch = project_ids[i:i + size]
+            before = {
+                row[0]: row[1:]
+                for row in ProjectStats.objects.filter(project_id__in=batch).values_list('project_id', *COMPARED_FIELDS)
+            }
+            refresh_project_stats(batch, batch_size=size)
+            after = ProjectStats.objects.filter(project_id__in=batch).values_list('project_id', *COMPARED_FIELDS)
+            for row in after:
+                if before.get(row[0]) != row[1:]:
+                    drifted += 1
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"Project {row[0]}: {before.get(row[0])} -> {row[1:]}")
+            checked += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {checked} projects; {drifted} rows were missing or out of date."
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from projects.reminders import reminder_days, send_task_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Email each assignee one digest of their open tasks due soon. Tasks already reminded "
+        "about for their current deadline are skipped, so the command is safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Remind about tasks due within this many days. Defaults to TASK_REMINDER_DAYS.")
+        parser.add_argument('--dry-run', action='store_true', help="Count what would be sent without sending.")
+
+    def handle(self, *args, **options):
+        days = reminder_days() if options['days'] is None else options['days']
+        stats = send_task_reminders(days=days, dry_run=options['dry_run'])
+        verb = "Would send" if options['dry_run'] else "Sent"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['assignees']} reminder digests covering {stats['tasks']} tasks due within {days} days."
+        ))
@@ -42,7 +42,92 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['project__name', 'deadline', 'priority', 'title']
+        # No project__name here: ordering on a joined column made every Task query join Project
+        ordering = ['deadline', 'priority', 'title']
+        indexes = [
+            # "My tasks" filtered by status and walked in deadline/priority order
+            models.Index(fields=['assigned_to', 'status', 'deadline', 'priority'], name='task_assignee_status_idx'),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # The unfiltered manager list, paged by (deadline, priority, id)
+            models.Index(fields=['deadline', 'priority', 'id'], name='task_deadline_priority_idx'),
+            # Deadline reminders: a range over deadline with status checked in the index
+            models.Index(fields=['deadline', 'status'], name='task_deadline_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a task moved to another project also refreshes the old project's stats
+        instance._loaded_project_id = instance.__dict__.get('project_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .stats import refresh_project_stats # Imported here to avoid a circular import
+        refresh_project_stats({self.project_id, getattr(self, '_loaded_project_id', None)} - {None})
+        self._loaded_project_id = self.project_id
+
+    def delete(self, *args, **kwargs):
+        project_id = self.project_id
+        result = super().delete(*args, **kwargs)
+        from .stats import refresh_project_stats
+        refresh_project_stats([project_id])
+        return result
 
     def __str__(self):
         return f"{self.title} ({self.project.name})"
+
+class ProjectStats(models.Model):
+    # Denormalized task counters for the project list, kept current by projects.stats
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    todo_count = models.PositiveIntegerField(default=0)
+    in_progress_count = models.PositiveIntegerField(default=0)
+    done_count = models.PositiveIntegerField(default=0)
+    # Open tasks past their deadline, and the earliest deadline still ahead, as of computed_on
+    overdue_count = models.PositiveIntegerField(default=0)
+    next_deadline = models.DateField(null=True, blank=True)
+    computed_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'project stats'
+
+    @property
+    def total_count(self):
+        return self.todo_count + self.in_progress_count + self.done_count
+
+    @property
+    def percent_done(self):
+        return round(100 * self.done_count / self.total_count) if self.total_count else 0
+
+    def __str__(self):
+        return f"{self.project.name}: {self.done_count}/{self.total_count} done"
+
+class TaskReminder(models.Model):
+    # One row per deadline reminder sent, so projects.reminders never sends the same one twice
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='task_reminders'
+    )
+    # The deadline reminded about; a task whose deadline moves gets a new reminder
+    deadline = models.DateField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-sent_at']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'user', 'deadline'], name='task_reminder_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.task.title} - {self.user.username} ({self.deadline})"
@@ -0,0 +1,22 @@
+from django.db.models import Q
+
+from .models import Task
+from employees.permissions import NOTHING, is_admin, is_manager_or_admin
+
+# Object-level permission rules for this app's models, used by employees.permissions
+# (scope() and get_permitted_or_404()). Each rule returns the Q object of the rows a user
+# may access for an action ('view', 'edit' or 'delete').
+
+
+def task_rule(user, action):
+    if action == 'delete':
+        return Q() if is_admin(user) else NOTHING
+    if is_manager_or_admin(user):
+        return Q()
+    # Employees see and update only the tasks assigned to them
+    return Q(assigned_to=user.pk)
+
+
+PERMISSION_RULES = {
+    Task: task_rule,
+}
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Task, TaskReminder
+from employees.models import User
+
+# Deadline reminders.
+# Each run reads only the tasks due inside the reminder window, a range scan over
+# task_deadline_status_idx, and drops the ones already reminded about with an anti-join on
+# TaskReminder's unique (task, user, deadline) index, so a run costs the same whether the
+# table holds a thousand tasks or a million. Each assignee gets one digest of their tasks.
+# A TaskReminder row is written in the same transaction as the digest is sent; repeat runs
+# (or a cron that fires twice) find nothing left to send.
+
+DEFAULT_REMINDER_DAYS = 3
+REMINDER_FIELDS = ('pk', 'title', 'deadline', 'status', 'priority', 'project__name', 'assigned_to_id')
+
+
+def reminder_days():
+    # Tasks due within this many days from today are reminded about
+    return getattr(settings, 'TASK_REMINDER_DAYS', DEFAULT_REMINDER_DAYS)
+
+
+def due_tasks(today, days):
+    """Open, assigned tasks due between today and today + days that have no reminder yet."""
+    already_sent = TaskReminder.objects.filter(
+        task=OuterRef('pk'), user=OuterRef('assigned_to'), deadline=OuterRef('deadline'),
+    )
+    return (
+        Task.objects.filter(deadline__gte=today, deadline__lte=today + timedelta(days=days))
+        .exclude(status='Done')
+        .filter(assigned_to__is_active=True)
+        .exclude(assigned_to__email='')
+        .filter(~Exists(already_sent))
+        # Only the few due tasks are sorted; grouping needs them by assignee
+        .order_by('assigned_to_id', 'deadline', '-priority', 'pk')
+        .values(*REMINDER_FIELDS)
+    )
+
+
+def _digest(user, tasks, today):
+    context = {'user': user, 'tasks': tasks, 'today': today}
+    count = len(tasks)
+    return EmailMessage(
+        subject=f"{count} task{'s' if count != 1 else ''} due soon",
+        body=render_to_string('projects/email/task_reminder.txt', context),
+        to=[user.email],
+    )
+
+
+def _send_digest(connection, user_id, tasks, today):
+    """Records and sends one assignee's digest. Returns the number of tasks in it."""
+    with transaction.atomic():
+        # Locking the assignee keeps two overlapping runs from both sending this digest
+        user = User.objects.select_for_update().filter(pk=user_id).first()
+        if user is None:
+            return 0
+        sent = set(
+            TaskReminder.objects.filter(user=user, task_id__in=[task['pk'] for task in tasks])
+            .values_list('task_id', 'deadline')
+        )
+        tasks = [task for task in tasks if (task['pk'], task['deadline']) not in sent]
+        if not tasks:
+            return 0
+        TaskReminder.objects.bulk_create(
+            [TaskReminder(task_id=task['pk'], user=user, deadline=task['deadline']) for task in tasks]
+        )
+        # Sent last: a mail failure rolls the records back and the next run tries again
+        connection.send_messages([_digest(user, tasks, today)])
+    return len(tasks)
+
+
+def send_task_reminders(today=None, days=None, dry_run=False):
+    """
+    Sends a digest to every assignee with unreminded tasks due within days of today.
+    Returns a dict with 'assignees' and 'tasks' counts. With dry_run nothing is sent or recorded.
+    """
+    today = today or timezone.localdate()
+    days = reminder_days() if days is None else days
+    stats = {'assignees': 0, 'tasks': 0}
+    connection = None if dry_run else get_connection()
+    rows = due_tasks(today, days).iterator()
+    for user_id, tasks in groupby(rows, key=lambda task: task['assigned_to_id']):
+        tasks = list(tasks)
+        sent = len(tasks) if dry_run else _send_digest(connection, user_id, tasks, today)
+        if sent:
+            stats['assignees'] += 1
+            stats['tasks'] += sent
+    return stats
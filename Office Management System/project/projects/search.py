@@ -0,0 +1,25 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Task
+from employees.fulltext import FullTextIndex
+
+# Full-text search over Task title, description and comments, title matches ranking highest.
+# The index itself is employees.fulltext: a GIN expression index on PostgreSQL, an FTS5 table
+# kept by triggers on SQLite. It is created by create_search_index() after migrate (see
+# ProjectsConfig.ready) and can be rebuilt with the rebuild_task_search command.
+
+TASK_INDEX = FullTextIndex(
+    Task,
+    columns=('title', 'description', 'comments'),
+    weights=(10.0, 4.0, 1.0),
+    config_setting='TASK_SEARCH_CONFIG',
+)
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, rebuild=False, **kwargs):
+    TASK_INDEX.create(using=using, rebuild=rebuild)
+
+
+def search_tasks(queryset, text):
+    """Narrows a Task queryset to matches of text, annotated with search_rank and ordered by it."""
+    return TASK_INDEX.search(queryset, text)
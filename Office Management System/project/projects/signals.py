@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Task
+from .workload import WORKLOAD_VERSION
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, **kwargs):
+    WORKLOAD_VERSION.rotate_on_commit()
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import Project, ProjectStats, Task
+
+# Keeps ProjectStats in step with Task.
+# Like the attendance rollups, a change recomputes the whole row of each project it touches
+# (one grouped query over task_project_status_idx) instead of applying +/- deltas that drift
+# when a write is missed. The project rows are locked first, so two concurrent task writes in
+# one project cannot overwrite each other's counts.
+# Overdue tasks and the next deadline also change as days pass without any write, so each row
+# records the day it was computed on; rows whose next deadline has since gone by are
+# recomputed when they are read (see attach_stats).
+
+STATS_FIELDS = [
+    'todo_count', 'in_progress_count', 'done_count', 'overdue_count', 'next_deadline', 'computed_on', 'updated_at',
+]
+STATUS_FIELDS = {'To-Do': 'todo_count', 'In Progress': 'in_progress_count', 'Done': 'done_count'}
+
+
+def _compute(project_ids, today):
+    open_tasks = ~Q(status='Done')
+    counts = {
+        field: Count('pk', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()
+    }
+    rows = (
+        Task.objects.filter(project_id__in=project_ids)
+        .order_by() # Meta.ordering would end up in the GROUP BY
+        .values('project_id')
+        .annotate(
+            overdue_count=Count('pk', filter=open_tasks & Q(deadline__lt=today)),
+            next_deadline=Min('deadline', filter=open_tasks & Q(deadline__gte=today)),
+            **counts,
+        )
+    )
+    return {row.pop('project_id'): row for row in rows}
+
+
+def refresh_project_stats(project_ids, batch_size=1000):
+    """Recomputes the ProjectStats rows of the given Project ids. Returns the number written."""
+    project_ids = sorted(set(project_ids))
+    if not project_ids:
+        return 0
+    today = timezone.localdate()
+    written = 0
+    with transaction.atomic():
+        for i in range(0, len(project_ids), batch_size):
+            # Locking in id order keeps concurrent refreshes from deadlocking; projects that
+            # were deleted meanwhile simply drop out
+            existing = list(
+                Project.objects.select_for_update().filter(pk__in=project_ids[i:i + batch_size])
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            computed = _compute(existing, today)
+            ProjectStats.objects.bulk_create(
+                [
+                    ProjectStats(project_id=project_id, computed_on=today, **computed.get(project_id, {}))
+                    for project_id in existing
+                ],
+                update_conflicts=True,
+                unique_fields=['project'],
+                update_fields=STATS_FIELDS,
+            )
+            written += len(existing)
+    return written
+
+
+def attach_stats(projects):
+    """
+    Sets .progress (a ProjectStats, or None for a project without tasks) on each project.
+    Expects projects loaded with select_related('stats'); only stale rows are queried again.
+    """
+    projects = list(projects)
+    today = timezone.localdate()
+    stale = []
+    for project in projects:
+        stats = getattr(project, 'stats', None)
+        if stats is not None and stats.computed_on < today and stats.next_deadline and stats.next_deadline < today:
+            stale.append(project.pk)
+
+    fresh = {}
+    if stale:
+        refresh_project_stats(stale)
+        fresh = {stats.project_id: stats for stats in ProjectStats.objects.filter(project_id__in=stale)}
+    for project in projects:
+        project.progress = fresh.get(project.pk) or getattr(project, 'stats', None)
+    return projects
@@ -0,0 +1,364 @@
+import json
+from datetime import date, timedelta
+
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from attendance.holidays import CALENDAR_VERSION
+from attendance.leave_index import LEAVE_INDEX_VERSION
+from attendance.models import LeaveRequest, PublicHoliday
+from employees.models import EmployeeProfile, User
+from employees.testing import raw_cursor
+from .board import version_of
+from .models import Project, ProjectStats, Task
+from .reminders import send_task_reminders
+from .stats import attach_stats
+from .transfer import import_tasks, read_rows
+from .workload import WORKLOAD_VERSION, get_workload
+from .views import TASK_PAGE_SIZE
+
+
+class TaskListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='x', role='Manager')
+        project = Project.objects.create(name='Launch')
+        # Some tasks without a deadline, which sort last
+        Task.objects.bulk_create([
+            Task(
+                project=project, title=f'Task {i}', priority=i % 3,
+                deadline=date(2025, 1, 1) + timedelta(days=i // 4) if i % 5 else None,
+            )
+            for i in range(TASK_PAGE_SIZE + 10)
+        ])
+
+    def test_pages_cover_every_task_once(self):
+        self.client.force_login(self.manager)
+        seen, params = [], {}
+        while True:
+            response = self.client.get(reverse('task_list'), params)
+            seen.extend(task.pk for task in response.context['tasks'])
+            if not response.context['next_cursor']:
+                break
+            params = {'cursor': response.context['next_cursor']}
+        self.assertEqual(sorted(seen), sorted(Task.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_tampered_cursor_serves_the_first_page(self):
+        self.client.force_login(self.manager)
+        first_page = list(self.client.get(reverse('task_list')).context['tasks'])
+        for values in (['x', 'x', 'x'], ['2025-01-01', 'high', 1], ['2025-01-01', 1, 'x'], [None, 1, 'x'], [1, 2]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('task_list'), {'cursor': raw_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['tasks']), first_page)
+
+
+class TaskReminderTests(TestCase):
+    def test_digest_is_plain_text(self):
+        user = User.objects.create_user('dev', email='dev@example.com', password='x', first_name='O\'Neil')
+        project = Project.objects.create(name='R&D <core>')
+        Task.objects.create(project=project, assigned_to=user, title='Fix "login" & signup', deadline=date(2025, 1, 2))
+        send_task_reminders(today=date(2025, 1, 1), days=3)
+        self.assertEqual(len(mail.outbox), 1)
+        body = mail.outbox[0].body
+        self.assertIn('Hello O\'Neil', body)
+        self.assertIn('- Fix "login" & signup (R&D <core>)', body)
+        self.assertNotIn('&amp;', body)
+
+
+class ProjectExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('exporter', password='x', role='Manager')
+        project = Project.objects.create(name='Launch')
+        Task.objects.create(project=project, title='Write copy', status='Done')
+        Task.objects.create(project=project, title='Ship it', status='To-Do')
+
+    def export(self, **params):
+        self.client.force_login(self.manager)
+        return self.client.get(reverse('export_project_data', args=['tasks']), params)
+
+    def test_filters_narrow_the_export(self):
+        response = self.export(format='jsonl', status='Done')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Write copy'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'status': 'Bogus'}, {'deadline_from': '2025-02-01', 'deadline_to': '2025-01-01'}):
+            with self.subTest(params=params):
+                response = self.export(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('errors', response.json())
+
+
+class ProjectImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('loader', password='x', role='Manager')
+        User.objects.create_user('dev', password='x', role='Employee')
+        User.objects.create_user('root', password='x', role='Admin')
+        Project.objects.create(name='Launch', end_date=date(2025, 6, 30))
+
+    def upload(self, kind, content, fmt='csv'):
+        self.client.force_login(self.manager)
+        upload = SimpleUploadedFile(f'{kind}.{fmt}', content.encode())
+        return self.client.post(reverse('import_project_data_api', args=[kind]), {'file': upload, 'format': fmt})
+
+    def test_bad_task_rows_are_reported_by_line(self):
+        lines = [
+            'project,title,assigned_to,status,deadline,priority\n',
+            'Launch,Write copy,dev,To-Do,2025-03-01,2\n',
+            'Nowhere,Lost,,,,\n',
+            'Launch,Too late,,,2025-07-01,\n',
+            'Launch,Admin work,root,,,\n',
+            'Launch,,dev,Someday,2025-02-30,high\n',
+            'Launch,Ship it,,Done,,\n',
+        ]
+        stats = import_tasks(read_rows(lines), batch_size=2) # Rows span several batches
+        self.assertEqual((stats['rows'], stats['created'], stats['skipped']), (6, 2, 4))
+        self.assertEqual([line for line, _ in stats['errors']], [3, 4, 5, 6])
+        messages = dict(stats['errors'])
+        self.assertEqual(messages[3], "project: Unknown project 'Nowhere'.")
+        self.assertEqual(messages[4], "deadline: Task deadline cannot be after the project's end date.")
+        self.assertIn("Unknown user 'root'", messages[5])
+        self.assertEqual(len(messages[6].split('; ')), 4) # title, deadline, status and priority
+        self.assertCountEqual(Task.objects.values_list('title', 'assigned_to__username', 'priority'), [
+            ('Write copy', 'dev', 2), ('Ship it', None, 0),
+        ])
+
+    def test_duplicate_projects_are_skipped(self):
+        response = self.upload('projects', 'name,start_date,end_date\nLaunch,,\nBeta,,\nBeta,,\nGamma,2025-02-01,2025-01-01\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(sorted(error['line'] for error in response.json()['errors']), [2, 4, 5])
+        self.assertEqual(sorted(Project.objects.values_list('name', flat=True)), ['Beta', 'Launch'])
+
+    def test_jsonl_lines_that_are_not_objects_are_skipped(self):
+        response = self.upload('tasks', '[1]\n\n{"project": "Launch", "title": "Plan"}\nnot json\n', fmt='jsonl')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'], [
+            {'line': 1, 'message': 'Not a JSON object.'}, {'line': 4, 'message': 'Not a JSON object.'},
+        ])
+        self.assertEqual(self.upload('tasks', '', fmt='xml').status_code, 400)
+
+
+class TaskSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('searcher', password='x', role='Manager')
+        cls.employee = User.objects.create_user('helper', password='x', role='Employee')
+        cls.launch = Project.objects.create(name='Launch')
+        cls.upkeep = Project.objects.create(name='Upkeep')
+        for project, title, description, comments, status, assignee in (
+            (cls.launch, 'Payroll export', 'CSV for the bank', '', 'To-Do', cls.employee),
+            (cls.launch, 'Bank holidays', 'Load the payroll calendar', '', 'Done', None),
+            (cls.upkeep, 'Rotate keys', '', 'blocked on payroll sign-off', 'To-Do', cls.employee),
+            (cls.upkeep, 'Printer', 'Order toner', '', 'To-Do', None),
+        ):
+            Task.objects.create(
+                project=project, title=title, description=description, comments=comments, status=status, assigned_to=assignee,
+            )
+
+    def search(self, user=None, **params):
+        self.client.force_login(user or self.manager)
+        return self.client.get(reverse('task_search'), params)
+
+    def titles(self, user=None, **params):
+        response = self.search(user, **params)
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.json()['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles(q='payroll'), ['Payroll export', 'Bank holidays', 'Rotate keys'])
+        self.assertEqual(self.titles(q='PAY'), ['Payroll export', 'Bank holidays', 'Rotate keys']) # Prefix, any case
+
+    def test_every_word_must_match(self):
+        self.assertCountEqual(self.titles(q='payroll bank'), ['Payroll export', 'Bank holidays'])
+        self.assertEqual(self.titles(q='payroll toner'), [])
+
+    def test_filters_and_scope_narrow_the_results(self):
+        self.assertEqual(self.titles(q='payroll', status='To-Do'), ['Payroll export', 'Rotate keys'])
+        self.assertEqual(self.titles(q='payroll', project=self.upkeep.pk), ['Rotate keys'])
+        self.assertEqual(self.titles(self.employee, q='payroll'), ['Payroll export', 'Rotate keys'])
+        self.assertEqual(self.search(q='payroll', status='Someday').status_code, 400)
+
+    def test_edits_are_searchable_at_once(self):
+        Task.objects.filter(title='Printer').update(comments='payroll printer jammed')
+        self.assertEqual(self.titles(q='jammed'), ['Printer'])
+        Task.objects.filter(title='Printer').delete()
+        self.assertEqual(self.titles(q='jammed'), [])
+
+    def test_query_without_words_finds_nothing(self):
+        self.client.force_login(self.manager)
+        for q in ('"(*', '***', ' - '):
+            with self.subTest(q=q):
+                response = self.client.get(reverse('task_search'), {'q': q})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {'results': []})
+
+
+class TaskMoveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('lead', password='x', role='Manager')
+        cls.employee = User.objects.create_user('dev', password='x', role='Employee')
+        cls.admin = User.objects.create_user('root', password='x', role='Admin')
+        project = Project.objects.create(name='Launch')
+        cls.tasks = [
+            Task.objects.create(project=project, title=f'Card {i}', assigned_to=cls.employee if i < 3 else None)
+            for i in range(5)
+        ]
+
+    def move(self, user, moves):
+        self.client.force_login(user)
+        return self.client.post(reverse('task_move_api'), json.dumps({'moves': moves}), content_type='application/json')
+
+    def card(self, task, **changes):
+        task.refresh_from_db()
+        return {'id': task.pk, 'updated_at': version_of(task.updated_at), **changes}
+
+    def statuses(self):
+        return [task.status for task in Task.objects.order_by('pk')]
+
+    def test_moves_to_one_column_are_one_update(self):
+        moves = [self.card(task, status='Done') for task in self.tasks[:4]] + [self.card(self.tasks[4], priority=2)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(self.manager, moves)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(move['id'] for move in response.json()['moved']), [task.pk for task in self.tasks])
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "projects_task"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.statuses(), ['Done'] * 4 + ['To-Do'])
+        # The returned version is the one the next move must send
+        self.assertEqual(self.move(self.manager, [{**response.json()['moved'][0], 'status': 'In Progress'}]).status_code, 200)
+
+    def test_stale_cards_are_conflicts_and_the_rest_still_move(self):
+        stale = self.card(self.tasks[0], status='Done')
+        Task.objects.filter(pk=self.tasks[0].pk).update(status='In Progress', updated_at=self.tasks[0].updated_at + timedelta(seconds=1))
+        response = self.move(self.manager, [stale, self.card(self.tasks[1], status='Done')])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['conflicts'], [self.card(self.tasks[0])])
+        self.assertEqual(self.statuses()[:2], ['In Progress', 'Done'])
+
+    def test_employees_move_only_their_own_tasks(self):
+        response = self.move(self.employee, [self.card(self.tasks[0], status='Done'), self.card(self.tasks[3], status='Done')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['not_found'], [self.tasks[3].pk])
+        self.assertEqual(self.statuses()[0::3], ['Done', 'To-Do'])
+
+    def test_invalid_batches_change_nothing(self):
+        task = self.tasks[0]
+        for user, moves in (
+            (self.manager, [self.card(task, status='Archived')]),
+            (self.manager, [self.card(task, status='Done'), self.card(task, priority=1)]),
+            (self.manager, [self.card(task, assigned_to=self.admin.pk)]),
+            (self.manager, [{'id': task.pk, 'updated_at': '2025-01-01T00:00:00', 'status': 'Done'}]),
+            (self.manager, [{'id': task.pk, 'status': 'Done'}]),
+            (self.manager, [self.card(task)]),
+            (self.employee, [self.card(task, assigned_to=self.manager.pk)]),
+            (self.manager, []),
+        ):
+            with self.subTest(moves=moves):
+                response = self.move(user, moves)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.statuses(), ['To-Do'] * 5)
+
+
+class ProjectStatsTests(TestCase):
+    COUNTERS = ('todo_count', 'in_progress_count', 'done_count', 'overdue_count', 'next_deadline')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = Project.objects.create(name='First')
+        cls.second = Project.objects.create(name='Second')
+
+    def counters(self, project):
+        stats = ProjectStats.objects.filter(project=project).values_list(*self.COUNTERS).first()
+        return stats and dict(zip(self.COUNTERS, stats))
+
+    def test_counters_follow_task_writes(self):
+        today = timezone.localdate()
+        late = Task.objects.create(project=self.first, title='Late', deadline=today - timedelta(days=1))
+        soon = Task.objects.create(project=self.first, title='Soon', status='In Progress', deadline=today + timedelta(days=2))
+        self.assertEqual(self.counters(self.first), {
+            'todo_count': 1, 'in_progress_count': 1, 'done_count': 0, 'overdue_count': 1, 'next_deadline': soon.deadline,
+        })
+        late.status = 'Done'
+        late.save()
+        self.assertEqual(self.counters(self.first)['done_count'], 1)
+        self.assertEqual(self.counters(self.first)['overdue_count'], 0)
+        # Moving a task to another project refreshes both
+        soon = Task.objects.get(pk=soon.pk)
+        soon.project = self.second
+        soon.save()
+        self.assertEqual(self.counters(self.first)['in_progress_count'], 0)
+        self.assertEqual(self.counters(self.second)['in_progress_count'], 1)
+        soon.delete()
+        self.assertEqual(self.counters(self.second), dict.fromkeys(self.COUNTERS, 0) | {'next_deadline': None})
+
+    def test_rows_whose_deadline_passed_are_recomputed_on_read(self):
+        today = timezone.localdate()
+        Task.objects.create(project=self.first, title='Due', deadline=today)
+        # As if computed yesterday, when the deadline was still ahead
+        ProjectStats.objects.update(computed_on=today - timedelta(days=2), next_deadline=today - timedelta(days=1), overdue_count=0)
+        project = attach_stats(Project.objects.select_related('stats').filter(pk=self.first.pk))[0]
+        self.assertEqual((project.progress.next_deadline, project.progress.computed_on), (today, today))
+
+
+class WorkloadCacheTests(TestCase):
+    MONDAY = date(2025, 1, 6)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('builder', password='x')
+        EmployeeProfile.objects.create(user=cls.user, department='Ops', designation='-', join_date=date(2024, 1, 1))
+        cls.project = Project.objects.create(name='Launch')
+        Task.objects.create(project=cls.project, title='Frame', assigned_to=cls.user, priority=1, deadline=date(2025, 1, 8))
+
+    def setUp(self):
+        # The tokens and the cache outlive each test's rollback
+        for token in (WORKLOAD_VERSION, LEAVE_INDEX_VERSION, CALENDAR_VERSION):
+            token.rotate()
+
+    def row(self):
+        row = get_workload('Ops', self.MONDAY + timedelta(days=2), weeks=2)['rows'][0]
+        return row['load'], row['capacity_days']
+
+    def test_repeated_reads_come_from_the_cache(self):
+        self.assertEqual(self.row(), ([2, 0], [5, 5]))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.row(), ([2, 0], [5, 5]))
+        Task.objects.update(priority=4) # No signal and no token rotation, so still the cached matrix
+        self.assertEqual(self.row(), ([2, 0], [5, 5]))
+
+    def test_task_writes_refresh_the_matrix_after_commit(self):
+        self.row()
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(project=self.project, title='Roof', assigned_to=self.user, deadline=date(2025, 1, 14))
+        self.assertEqual(self.row(), ([2, 1], [5, 5]))
+        self.client.force_login(User.objects.create_user('lead', password='x', role='Manager'))
+        task.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task_move_api'), json.dumps({'moves': [
+                {'id': task.pk, 'updated_at': task.updated_at.isoformat(), 'status': 'Done'},
+            ]}), content_type='application/json')
+        self.assertEqual(self.row(), ([2, 0], [5, 5]))
+
+    def test_leave_and_holidays_refresh_the_capacity(self):
+        self.row()
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(
+                user=self.user, start_date=self.MONDAY, end_date=self.MONDAY + timedelta(days=1), reason='-', status='Approved',
+            )
+        self.assertEqual(self.row(), ([2, 0], [3, 5]))
+        with self.captureOnCommitCallbacks(execute=True):
+            PublicHoliday.objects.create(date=date(2025, 1, 13), name='Founders day')
+        self.assertEqual(self.row(), ([2, 0], [3, 4]))
@@ -0,0 +1,298 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .board import ASSIGNABLE_ROLES
+from .models import Project, Task
+from .stats import refresh_project_stats
+from .workload import WORKLOAD_VERSION
+from attendance.exports import EXPORT_CHUNK_SIZE, Echo
+from attendance.punches import batches, skip_row
+from employees.models import User
+
+# Bulk import and export of projects and tasks (CSV or JSONL), e.g. from another tracker.
+# Rows are checked with the same rules as ProjectForm/TaskForm, but without building a form
+# (and its querysets) per row: project names and usernames are resolved through lookup maps
+# filled with one query per batch, and each batch is written with one bulk_create.
+# Memory depends on the batch size and the number of distinct projects/users, not on the file.
+# Export columns are the import columns, so an export can be imported again elsewhere.
+
+TRANSFER_FORMATS = ('csv', 'jsonl')
+
+# (column, field) pairs; the column is the CSV header / JSON key on both import and export
+PROJECT_COLUMNS = (
+    ('name', 'name'),
+    ('description', 'description'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+)
+
+TASK_COLUMNS = (
+    ('project', 'project__name'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('assigned_to', 'assigned_to__username'),
+    ('status', 'status'),
+    ('deadline', 'deadline'),
+    ('priority', 'priority'),
+    ('comments', 'comments'),
+)
+
+STATUSES = {status for status, _ in Task.STATUS_CHOICES}
+
+
+class TransferError(ValueError):
+    pass
+
+
+def read_rows(lines, fmt='csv'):
+    """
+    Yields (line_number, row) from an iterable of text lines, row being a dict keyed by
+    column, or None for a JSONL line that is not a JSON object.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise TransferError(f"Unknown format '{fmt}', expected one of {', '.join(TRANSFER_FORMATS)}.")
+
+
+def _text(row, column):
+    value = row.get(column)
+    return '' if value is None else str(value).strip()
+
+
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+def _required(row, column, model, field, errors):
+    value = _text(row, column)
+    if not value:
+        errors.append(f"{column}: This field is required.")
+    elif len(value) > _max_length(model, field):
+        errors.append(f"{column}: Ensure this value has at most {_max_length(model, field)} characters.")
+    return value
+
+
+def _date(row, column, errors):
+    value = _text(row, column)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError: # Well formed but impossible, e.g. month 13
+        day = None
+    if day is None:
+        errors.append(f"{column}: Enter a valid date.")
+    return day
+
+
+def clean_project_row(row):
+    """Returns (field values, error messages) for one project row; same rules as ProjectForm."""
+    errors = []
+    values = {
+        'name': _required(row, 'name', Project, 'name', errors),
+        'description': _text(row, 'description') or None,
+        'start_date': _date(row, 'start_date', errors) or timezone.localdate(),
+        'end_date': _date(row, 'end_date', errors),
+    }
+    if values['end_date'] and values['end_date'] < values['start_date']:
+        errors.append("End date cannot be before start date.")
+    return values, errors
+
+
+def clean_task_row(row, projects, users):
+    """
+    Returns (field values, error messages) for one task row; same rules as TaskForm.
+    projects maps name -> (id, end_date) and users maps username -> id for assignable users,
+    with None for names known not to exist.
+    """
+    errors = []
+    values = {
+        'title': _required(row, 'title', Task, 'title', errors),
+        'description': _text(row, 'description') or None,
+        'comments': _text(row, 'comments') or None,
+        'deadline': _date(row, 'deadline', errors),
+        'status': _text(row, 'status') or 'To-Do',
+        'priority': 0,
+        'assigned_to_id': None,
+    }
+
+    project_end_date = None
+    name = _text(row, 'project')
+    if not name:
+        errors.append("project: This field is required.")
+    elif projects.get(name) is None:
+        errors.append(f"project: Unknown project '{name}'.")
+    else:
+        values['project_id'], project_end_date = projects[name]
+
+    username = _text(row, 'assigned_to')
+    if username:
+        values['assigned_to_id'] = users.get(username)
+        if values['assigned_to_id'] is None:
+            errors.append(f"assigned_to: Unknown user '{username}', or not an employee or manager.")
+
+    if values['status'] not in STATUSES:
+        errors.append(f"status: Select a valid choice. {values['status']} is not one of the available choices.")
+    priority = _text(row, 'priority')
+    if priority:
+        try:
+            values['priority'] = int(priority)
+        except ValueError:
+            errors.append("priority: Enter a whole number.")
+
+    if values['deadline'] and project_end_date and values['deadline'] > project_end_date:
+        errors.append("deadline: Task deadline cannot be after the project's end date.")
+    return values, errors
+
+
+def _new_stats():
+    return {'rows': 0, 'created': 0, 'skipped': 0, 'errors': []}
+
+
+def _skip(stats, line_number, messages):
+    skip_row(stats, line_number, '; '.join(messages))
+
+
+def import_projects(rows, batch_size=1000):
+    """
+    Creates projects from (line_number, row) pairs as produced by read_rows. Names that
+    already exist, in the database or earlier in the file, are reported rather than updated.
+    Returns a dict with 'rows', 'created', 'skipped' and 'errors', a list of
+    (line_number, message) for the first skipped rows.
+    """
+    stats = _new_stats()
+    created_names = set()
+    for batch in batches(rows, batch_size):
+        cleaned = []
+        for line_number, row in batch:
+            stats['rows'] += 1
+            if row is None:
+                _skip(stats, line_number, ["Not a JSON object."])
+                continue
+            values, errors = clean_project_row(row)
+            if errors:
+                _skip(stats, line_number, errors)
+            else:
+                cleaned.append((line_number, values))
+
+        existing = set(
+            Project.objects.filter(name__in={values['name'] for _, values in cleaned}).values_list('name', flat=True)
+        )
+        new = []
+        for line_number, values in cleaned:
+            if values['name'] in existing or values['name'] in created_names:
+                _skip(stats, line_number, ["name: Project with this Name already exists."])
+                continue
+            created_names.add(values['name'])
+            new.append(Project(**values))
+
+        if new:
+            Project.objects.bulk_create(new)
+            stats['created'] += len(new)
+    return stats
+
+
+def import_tasks(rows, batch_size=1000):
+    """
+    Creates tasks from (line_number, row) pairs as produced by read_rows; projects are
+    referenced by name and assignees by username. Returns the same dict as import_projects.
+    """
+    projects = {} # name -> (id, end_date), None for misses; bounded by the number of projects
+    users = {} # username -> id, None for misses; bounded by headcount
+    stats = _new_stats()
+    for batch in batches(rows, batch_size):
+        present = [row for _, row in batch if row is not None]
+        names = {_text(row, 'project') for row in present} - projects.keys()
+        if names:
+            projects.update(dict.fromkeys(names)) # Remember misses so they are not looked up again
+            projects.update(
+                (name, (project_id, end_date))
+                for name, project_id, end_date in Project.objects.filter(name__in=names).values_list('name', 'pk', 'end_date')
+            )
+        usernames = {_text(row, 'assigned_to') for row in present} - users.keys()
+        if usernames:
+            users.update(dict.fromkeys(usernames))
+            users.update(
+                User.objects.filter(username__in=usernames, role__in=ASSIGNABLE_ROLES).values_list('username', 'pk')
+            )
+
+        new = []
+        for line_number, row in batch:
+            stats['rows'] += 1
+            if row is None:
+                _skip(stats, line_number, ["Not a JSON object."])
+                continue
+            values, errors = clean_task_row(row, projects, users)
+            if errors:
+                _skip(stats, line_number, errors)
+            else:
+                new.append(Task(**values))
+
+        if not new:
+            continue
+        with transaction.atomic():
+            Task.objects.bulk_create(new)
+            # bulk_create skips Task.save(), so the counters and workload cache are updated here
+            refresh_project_stats({task.project_id for task in new})
+            WORKLOAD_VERSION.rotate_on_commit()
+        stats['created'] += len(new)
+    return stats
+
+
+def project_export_rows(filters=None):
+    return Project.objects.order_by('pk').values_list(*(field for _, field in PROJECT_COLUMNS))
+
+
+def task_export_rows(filters):
+    rows = Task.objects.all()
+    if filters.get('status'):
+        rows = rows.filter(status=filters['status'])
+    if filters.get('project'):
+        rows = rows.filter(project=filters['project'])
+    if filters.get('assignee'):
+        rows = rows.filter(assigned_to__username=filters['assignee'])
+    if filters.get('deadline_from'):
+        rows = rows.filter(deadline__gte=filters['deadline_from'])
+    if filters.get('deadline_to'):
+        rows = rows.filter(deadline__lte=filters['deadline_to'])
+    # Primary key order needs no sort; the joined names come from the project/user primary keys
+    return rows.order_by('pk').values_list(*(field for _, field in TASK_COLUMNS))
+
+
+IMPORTERS = {'projects': import_projects, 'tasks': import_tasks}
+EXPORTERS = {'projects': (PROJECT_COLUMNS, project_export_rows), 'tasks': (TASK_COLUMNS, task_export_rows)}
+
+
+def export_lines(kind, fmt='csv', filters=None):
+    """Yields the export of kind ('projects' or 'tasks') line by line, header first for CSV."""
+    columns, export_rows = EXPORTERS[kind]
+    names = [column for column, _ in columns]
+    rows = export_rows(filters or {}).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'jsonl':
+        encoder = DjangoJSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(names, row))) + '\n'
+    else:
+        raise TransferError(f"Unknown format '{fmt}', expected one of {', '.join(TRANSFER_FORMATS)}.")
@@ -13,4 +13,16 @@ urlpatterns = [
     path('tasks/add/', views.task_add, name='task_add'), # Add new task
     path('tasks/edit/<int:pk>/', views.task_edit, name='task_edit'), # Edit existing task
     path('tasks/delete/<int:pk>/', views.task_delete, name='task_delete'), # Delete task
+    path('tasks/search/', views.task_search, name='task_search'), # Ranked full-text search (JSON)
+
+    # Kanban board API
+    path('<int:pk>/board/', views.task_board, name='task_board'), # Tasks grouped by status (JSON)
+    path('tasks/move/', views.task_move_api, name='task_move_api'), # Batched status/priority/assignee moves
+
+    # Bulk import/export (kind is 'projects' or 'tasks')
+    path('import/<slug:kind>/', views.import_project_data_api, name='import_project_data_api'), # CSV/JSONL upload, JSON error report
+    path('export/<slug:kind>/', views.export_project_data, name='export_project_data'), # Streaming CSV/JSONL
+
+    # Workload heatmap
+    path('workload/', views.workload, name='workload'), # Open task load per assignee per week (HTML or JSON)
 ]
@@ -1,26 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+import json
 from .models import Project, Task
-from .forms import ProjectForm, TaskForm
-from employees.models import User # Import User model for role checks
+from .forms import ProjectForm, TaskForm, TaskFilterForm, TaskSearchForm, WorkloadForm
+from employees.permissions import get_permitted_or_404, is_admin, is_manager_or_admin, scope
+from employees.pagination import keyset_page
+from .board import apply_moves, board_columns, parse_moves
+from .stats import attach_stats
+from .search import search_tasks
+from .workload import DEFAULT_WEEKS, get_workload
+from .transfer import EXPORTERS, IMPORTERS, TRANSFER_FORMATS, TransferError, export_lines, read_rows
 
-# Helper functions (copied from employees app for convenience, or you could put them in a common utility file)
-def is_admin(user):
-    return user.is_authenticated and user.role == 'Admin'
-
-def is_manager_or_admin(user):
-    return user.is_authenticated and (user.role == 'Manager' or user.role == 'Admin')
-
-def is_employee(user):
-    return user.is_authenticated and user.role == 'Employee'
+TASK_PAGE_SIZE = 50
+TASK_SEARCH_LIMIT = 50
+# Matches the task_deadline_priority_idx / task_assignee_status_idx column order; tasks
+# without a deadline come last, id makes the key unique
+TASK_KEYS = [('deadline', False, True), ('priority', False), ('pk', False)]
 
 # --- Project Views ---
 
 @login_required
 @user_passes_test(is_manager_or_admin) # Only managers/admins can manage projects
 def project_list(request):
-    projects = Project.objects.all().order_by('name')
+    # Progress comes from the ProjectStats row joined in, not an aggregate per project
+    projects = attach_stats(Project.objects.select_related('stats').order_by('name'))
     context = {
         'projects': projects,
         'is_manager_or_admin': is_manager_or_admin(request.user)
@@ -69,15 +76,35 @@ def project_delete(request, pk):
 
 @login_required
 def task_list(request):
-    if is_admin(request.user) or is_manager_or_admin(request.user):
-        # Admin/Manager sees all tasks
-        tasks = Task.objects.select_related('project', 'assigned_to').all().order_by('deadline', 'priority')
-    else:
-        # Employee sees only tasks assigned to them
-        tasks = Task.objects.filter(assigned_to=request.user).select_related('project', 'assigned_to').order_by('deadline', 'priority')
+    filter_form = TaskFilterForm(request.GET or None)
+    filters = filter_form.cleaned_data if filter_form.is_valid() else {}
+
+    # Admin/Manager sees all tasks, optionally for one assignee; Employee only their own
+    tasks = scope(request, Task.objects.select_related('project', 'assigned_to'))
+    if filters.get('assignee') and is_manager_or_admin(request.user):
+        tasks = tasks.filter(assigned_to__username=filters['assignee'])
+
+    # Filters run in the database so only the visible page is rendered
+    if filters.get('status'):
+        tasks = tasks.filter(status=filters['status'])
+    if filters.get('project'):
+        tasks = tasks.filter(project=filters['project'])
+    if filters.get('deadline_from'):
+        tasks = tasks.filter(deadline__gte=filters['deadline_from'])
+    if filters.get('deadline_to'):
+        tasks = tasks.filter(deadline__lte=filters['deadline_to'])
 
+    tasks, next_cursor = keyset_page(tasks, TASK_KEYS, cursor=request.GET.get('cursor'), page_size=TASK_PAGE_SIZE)
+
+    # Keep the active filters on the "next page" link
+    query = request.GET.copy()
+    query.pop('cursor', None)
     context = {
         'tasks': tasks,
+        'filter_form': filter_form,
+        'next_cursor': next_cursor,
+        'filter_query': query.urlencode(),
+        'is_paginated': 'cursor' in request.GET,
         'is_manager_or_admin': is_manager_or_admin(request.user)
     }
     return render(request, 'projects/task_list.html', context)
@@ -96,36 +123,16 @@ def task_add(request):
     return render(request, 'projects/task_form.html', context)
 
 @login_required
-@user_passes_test(lambda u: is_manager_or_admin(u) or u.tasks.filter(pk=u.resolver_match.kwargs['pk']).exists()) # Manager/Admin OR assigned employee
 def task_edit(request, pk):
-    task = get_object_or_404(Task, pk=pk)
-
-    # Permission check: Only manager/admin or the assigned employee can edit
-    if not (is_manager_or_admin(request.user) or task.assigned_to == request.user):
-        return redirect('task_list') # Or render a permission denied page
+    # Manager/Admin OR assigned employee; the rule is part of the query that loads the task,
+    # so tasks the user may not edit are a 404
+    task = get_permitted_or_404(request, Task, 'edit', pk=pk)
 
     if request.method == 'POST':
-        # If not admin/manager, restrict status change if task is not assigned to them
-        if not is_manager_or_admin(request.user) and task.assigned_to != request.user:
-            # If an employee is trying to edit a task not assigned to them, only allow specific fields.
-            # For simplicity, we'll just prevent saving for now.
-            form = TaskForm(request.POST, instance=task)
-            if form.is_valid():
-                # Prevent changing assigned_to or project by non-admin/manager
-                if form.has_changed() and ('assigned_to' in form.changed_data or 'project' in form.changed_data):
-                    if not is_admin(request.user): # Only admin can change assigned_to/project
-                        form.add_error(None, "You do not have permission to change the assigned employee or project.")
-                    else:
-                        form.save()
-                        return redirect('task_list')
-                else:
-                    form.save()
-                    return redirect('task_list')
-        else: # Admin/Manager or assigned employee editing their own task
-            form = TaskForm(request.POST, instance=task)
-            if form.is_valid():
-                form.save()
-                return redirect('task_list')
+        form = TaskForm(request.POST, instance=task)
+        if form.is_valid():
+            form.save()
+            return redirect('task_list')
     else:
         form = TaskForm(instance=task)
 
@@ -142,3 +149,152 @@ def task_delete(request, pk):
         return redirect('task_list')
     context = {'task': task}
     return render(request, 'projects/task_confirm_delete.html', context)
+
+
+# --- Task Search API ---
+
+@login_required
+@require_GET
+def task_search(request):
+    # Ranked full-text search; the permission scope and filters run in the same query
+    form = TaskSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    tasks = scope(request, Task.objects.all())
+    if form.cleaned_data['status']:
+        tasks = tasks.filter(status=form.cleaned_data['status'])
+    if form.cleaned_data['project']:
+        tasks = tasks.filter(project=form.cleaned_data['project'])
+    rows = search_tasks(tasks, form.cleaned_data['q']).values(
+        'id', 'title', 'status', 'priority', 'deadline', 'project_id', 'project__name',
+        'assigned_to__username', 'search_rank',
+    )[:TASK_SEARCH_LIMIT]
+    results = [
+        {
+            'id': row['id'], 'title': row['title'], 'status': row['status'], 'priority': row['priority'],
+            'deadline': row['deadline'], 'project': {'id': row['project_id'], 'name': row['project__name']},
+            'assignee': row['assigned_to__username'], 'rank': round(row['search_rank'], 4),
+        }
+        for row in rows
+    ]
+    return JsonResponse({'results': results})
+
+
+# --- Kanban Board API ---
+
+@login_required
+@require_GET
+def task_board(request, pk):
+    # Cards grouped by status; employees only get the cards assigned to them
+    project = get_object_or_404(Project, pk=pk)
+    tasks = scope(request, Task.objects.filter(project=project))
+    return JsonResponse({
+        'project': {'id': project.pk, 'name': project.name},
+        'columns': board_columns(tasks),
+    })
+
+@login_required
+@require_POST
+def task_move_api(request):
+    # Body: {"moves": [{"id": 1, "updated_at": "<version from the board>", "status": "Done"}, ...]}
+    try:
+        payload = json.loads(request.body)
+        parsed = parse_moves(request.user, payload.get('moves') if isinstance(payload, dict) else None)
+    except ValueError as exc: # Malformed JSON or a MoveError
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    result = apply_moves(request, parsed)
+    # Moves that went through are kept; 409 tells the board to reload the conflicting cards
+    return JsonResponse(result, status=409 if result['conflicts'] else 200)
+
+
+# --- Bulk Import/Export ---
+
+@login_required
+@user_passes_test(is_manager_or_admin) # Only managers/admins can load projects and tasks in bulk
+@require_POST
+def import_project_data_api(request, kind):
+    if kind not in IMPORTERS:
+        raise Http404
+    upload = request.FILES.get('file')
+    fmt = request.POST.get('format', 'csv')
+    if upload is None:
+        return JsonResponse({'error': "Upload the file as 'file'."}, status=400)
+    if fmt not in TRANSFER_FORMATS:
+        return JsonResponse({'error': f"Format must be one of {', '.join(TRANSFER_FORMATS)}."}, status=400)
+
+    # Iterating the upload yields lines, so the file is never read into memory at once
+    lines = (line.decode('utf-8-sig') for line in upload)
+    try:
+        stats = IMPORTERS[kind](read_rows(lines, fmt))
+    except (TransferError, UnicodeDecodeError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    stats['errors'] = [{'line': line, 'message': message} for line, message in stats['errors']]
+    return JsonResponse(stats)
+
+@login_required
+@user_passes_test(is_manager_or_admin)
+@require_GET
+def export_project_data(request, kind):
+    # Tasks take the task list filters (status, project, assignee, deadline range)
+    if kind not in EXPORTERS:
+        raise Http404
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in TRANSFER_FORMATS:
+        return JsonResponse({'error': f"Format must be one of {', '.join(TRANSFER_FORMATS)}."}, status=400)
+    filter_form = TaskFilterForm(request.GET or None)
+    if filter_form.is_bound and not filter_form.is_valid():
+        # Never fall back to exporting everything when the requested filter is wrong
+        return JsonResponse({'errors': filter_form.errors.get_json_data()}, status=400)
+    filters = filter_form.cleaned_data if filter_form.is_bound else {}
+
+    response = StreamingHttpResponse(
+        export_lines(kind, fmt, filters), content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+# --- Workload Heatmap ---
+
+def _heat(utilization):
+    # Cell shade for the heatmap; None means no working days that week
+    if utilization is None:
+        return 'off'
+    if utilization <= 0.5:
+        return 'low'
+    if utilization <= 1:
+        return 'ok'
+    if utilization <= 1.5:
+        return 'high'
+    return 'over'
+
+@login_required
+@user_passes_test(is_manager_or_admin) # Only managers/admins can see the team's workload
+@require_GET
+def workload(request):
+    # HTML heatmap, or the same matrix as JSON with ?format=json
+    form = WorkloadForm(request.GET)
+    if not form.is_valid():
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        return render(request, 'projects/workload.html', {'form': form})
+
+    data = get_workload(
+        form.cleaned_data['department'] or None,
+        form.cleaned_data['start'] or timezone.localdate(),
+        form.cleaned_data['weeks'] or DEFAULT_WEEKS,
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+
+    # New dicts for the template; the cached matrix itself is left as it is
+    rows = [
+        dict(row, cells=[
+            {'tasks': tasks, 'load': load, 'capacity': capacity, 'utilization': utilization, 'heat': _heat(utilization)}
+            for tasks, load, capacity, utilization in zip(row['tasks'], row['load'], row['capacity_days'], row['utilization'])
+        ])
+        for row in data['rows']
+    ]
+    return render(request, 'projects/workload.html', {'form': form, 'weeks': data['weeks'], 'rows': rows})
@@ -0,0 +1,118 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Task
+from attendance import holidays, leave_index
+from attendance.workdays import load_calendar
+from employees.models import EmployeeProfile
+from employees.versioning import VersionToken
+
+# Workload heatmap: open task load per assignee per week, against their capacity.
+# One query loads the team's open tasks due up to the last week shown and each task is added
+# to its (assignee, week) cell in a single pass. Capacity per cell is the working days of the
+# week minus approved leave, from the prefix-sum WorkingDayCalendar (O(log n) per cell).
+# Results are cached per team under a key made of the task, leave and holiday version
+# tokens, so a change to any of them makes the next request compute a fresh matrix.
+
+WORKLOAD_VERSION = VersionToken('projects:workload:version')
+OPEN_STATUSES = ('To-Do', 'In Progress')
+DEFAULT_WEEKS = 8
+MAX_WEEKS = 26
+CACHE_TIMEOUT = 600 # Backstop for what no token covers, e.g. someone moving department
+
+
+def task_weight(priority):
+    # Low priority (0) work still counts; every priority step adds one unit
+    return max(priority, 0) + 1
+
+
+def units_per_day():
+    # Weighted task units one person is expected to finish per working day
+    return getattr(settings, 'WORKLOAD_UNITS_PER_DAY', 1)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def compute_workload(department, start, weeks):
+    """
+    Builds the heatmap for the active members of department (everyone if None) over the
+    given number of weeks from the Monday of start. Tasks due before the first week are counted
+    in 'overdue' and tasks without a deadline in 'unscheduled' rather than in a week.
+    """
+    start = week_start(start)
+    end = start + timedelta(days=7 * weeks - 1)
+    week_starts = [start + timedelta(days=7 * week) for week in range(weeks)]
+
+    members = EmployeeProfile.objects.filter(status='active')
+    if department:
+        members = members.filter(department=department)
+    members = list(members.order_by('user__username').values_list('user_id', 'user__username', 'department'))
+    row_of = {user_id: row for row, (user_id, _, _) in enumerate(members)}
+
+    load = [[0] * weeks for _ in members]
+    counts = [[0] * weeks for _ in members]
+    overdue = [0] * len(members)
+    unscheduled = [0] * len(members)
+
+    # The profile join keeps the IN list of a 500-person team out of the query
+    tasks = Task.objects.filter(
+        status__in=OPEN_STATUSES, assigned_to__employee_profile__status='active',
+    ).filter(Q(deadline__lte=end) | Q(deadline__isnull=True))
+    if department:
+        tasks = tasks.filter(assigned_to__employee_profile__department=department)
+    for user_id, deadline, priority in tasks.order_by().values_list('assigned_to_id', 'deadline', 'priority').iterator():
+        row = row_of.get(user_id)
+        if row is None:
+            continue
+        if deadline is None:
+            unscheduled[row] += 1
+        elif deadline < start:
+            overdue[row] += 1
+        else:
+            week = (deadline - start).days // 7
+            load[row][week] += task_weight(priority)
+            counts[row][week] += 1
+
+    calendar = load_calendar(start, end, row_of.keys())
+    per_day = units_per_day()
+    rows = []
+    for row, (user_id, username, member_department) in enumerate(members):
+        capacity = [calendar.working_days(user_id, day, day + timedelta(days=6)) for day in week_starts]
+        rows.append({
+            'user_id': user_id,
+            'username': username,
+            'department': member_department,
+            'tasks': counts[row],
+            'load': load[row],
+            'capacity_days': capacity,
+            # None where there is no capacity at all (on leave the whole week)
+            'utilization': [
+                round(units / (days * per_day), 2) if days else None
+                for units, days in zip(load[row], capacity)
+            ],
+            'overdue': overdue[row],
+            'unscheduled': unscheduled[row],
+        })
+    return {'department': department, 'weeks': week_starts, 'rows': rows}
+
+
+def get_workload(department, start, weeks=DEFAULT_WEEKS):
+    """compute_workload() through the shared cache."""
+    start = week_start(start)
+    team = hashlib.md5((department or '').encode()).hexdigest() # Department names may hold spaces
+    key = ':'.join([
+        'projects:workload', team, start.isoformat(), str(weeks),
+        WORKLOAD_VERSION.current(), leave_index.LEAVE_INDEX_VERSION.current(),
+        holidays.CALENDAR_VERSION.current(),
+    ])
+    workload = cache.get(key)
+    if workload is None:
+        workload = compute_workload(department, start, weeks)
+        cache.set(key, workload, CACHE_TIMEOUT)
+    return workload